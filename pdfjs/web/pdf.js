@@ -2464,6 +2464,8 @@ var PDFPageProxy = (function PDFPageProxyClosure() {
      *                        appendText functions.,
      *   imageLayer(optional): An object that has beginLayout, endLayout and
      *                         appendImage functions.,
+     *   skipImages(optional): Don't paint images, e.g. when only the
+     *                         textLayer is wanted.,
      *   continueCallback(optional): A function that will be called each time
      *                               the rendering is paused.  To continue
      *                               rendering call the function that is the
@@ -2516,6 +2518,7 @@ var PDFPageProxy = (function PDFPageProxyClosure() {
 
           var gfx = new CanvasGraphics(params.canvasContext, this.commonObjs,
             this.objs, params.textLayer, params.imageLayer);
+          gfx.skipImages = !!params.skipImages;
           try {
             this.display(gfx, params.viewport, complete, continueCallback);
           } catch (e) {
@@ -3371,6 +3374,8 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
     this.objs = objs;
     this.textLayer = textLayer;
     this.imageLayer = imageLayer;
+    // Images are not painted if set, text geometry is still computed.
+    this.skipImages = false;
     this.groupStack = [];
     this.processingType3 = null;
     if (canvasCtx) {
@@ -4661,6 +4666,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
     },
 
     paintJpegXObject: function CanvasGraphics_paintJpegXObject(objId, w, h) {
+      if (this.skipImages)
+        return;
+
       var domImage = this.objs.get(objId);
       if (!domImage) {
         error('Dependent image isn\'t ready yet');
@@ -4690,6 +4698,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
 
     paintImageMaskXObject: function CanvasGraphics_paintImageMaskXObject(
                              imgArray, inverseDecode, width, height) {
+      if (this.skipImages)
+        return;
+
       var ctx = this.ctx;
       var glyph = this.processingType3;
 
@@ -4733,6 +4744,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
 
     paintImageMaskXObjectGroup:
       function CanvasGraphics_paintImageMaskXObjectGroup(images) {
+      if (this.skipImages)
+        return;
+
       var ctx = this.ctx;
       var tmpCanvasWidth = 0, tmpCanvasHeight = 0, tmpCanvas, tmpCtx;
       for (var i = 0, ii = images.length; i < ii; i++) {
@@ -4768,6 +4782,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
     },
 
     paintImageXObject: function CanvasGraphics_paintImageXObject(objId) {
+      if (this.skipImages)
+        return;
+
       var imgData = this.objs.get(objId);
       if (!imgData)
         error('Dependent image isn\'t ready yet');
@@ -4777,6 +4794,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
 
     paintInlineImageXObject:
       function CanvasGraphics_paintInlineImageXObject(imgData) {
+      if (this.skipImages)
+        return;
+
       var width = imgData.width;
       var height = imgData.height;
       var ctx = this.ctx;
@@ -4822,6 +4842,9 @@ var CanvasGraphics = (function CanvasGraphicsClosure() {
 
     paintInlineImageXObjectGroup:
       function CanvasGraphics_paintInlineImageXObjectGroup(imgData, map) {
+      if (this.skipImages)
+        return;
+
       var ctx = this.ctx;
       var w = imgData.width;
       var h = imgData.height;
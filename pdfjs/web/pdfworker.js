@@ -0,0 +1,294 @@
+/* -*- Mode: Java; tab-width: 2; indent-tabs-mode: nil; c-basic-offset: 2 -*- */
+/* vim: set shiftwidth=2 tabstop=2 autoindent cindent expandtab: */
+/* globals PDFView, CSS_UNITS, RenderingStates */
+
+'use strict';
+
+// Helpers called by pdfworker's PDFBrowser through WebDriver. Each helper
+// answers a question about the viewer in a single execute_script call.
+var PDFWorker = {
+  TRANSFORM_REGEX:
+    /scale\(([-+]?[0-9]*\.?[0-9]+), ([-+]?[0-9]*\.?[0-9]+)\)/,
+
+  documentLoaded: false,
+  documentLoadedCallbacks: [],
+  textLayerCallbacks: {},
+
+  initialize: function pdfWorkerInitialize() {
+    var self = this;
+
+    // The initial view, which may reset the scale, is set after the
+    // documentload event. A document counts as loaded only after that.
+    var setInitialView = PDFView.setInitialView;
+    PDFView.setInitialView = function pdfWorkerSetInitialView() {
+      setInitialView.apply(PDFView, arguments);
+
+      var callbacks = self.documentLoadedCallbacks;
+      self.documentLoaded = true;
+      self.documentLoadedCallbacks = [];
+      for (var i = 0; i < callbacks.length; i++)
+        callbacks[i](true);
+    };
+
+    document.addEventListener('textlayerrendered', function(evt) {
+      var pageNum = evt.detail.pageNumber;
+      delete PDFView.prefetchedPages[pageNum];
+      var callbacks = self.textLayerCallbacks[pageNum] || [];
+      delete self.textLayerCallbacks[pageNum];
+      for (var i = 0; i < callbacks.length; i++)
+        callbacks[i](true);
+    });
+  },
+
+  /**
+   * Close the current pdf so that another one can be opened by the
+   * fileInput in the same viewer.
+   */
+  closeDocument: function pdfWorkerCloseDocument() {
+    if (PDFView.pdfDocument) {
+      PDFView.pdfDocument.destroy();
+      PDFView.pdfDocument = null;
+    }
+
+    this.documentLoaded = false;
+    this.documentLoadedCallbacks = [];
+    this.textLayerCallbacks = {};
+    PDFView.prefetchedPages = {};
+    document.getElementById('fileInput').value = null;
+  },
+
+  /**
+   * Call back once the pdf being opened has its pages set up.
+   * @param {Function} callback Called with true.
+   */
+  whenDocumentLoaded: function pdfWorkerWhenDocumentLoaded(callback) {
+    if (this.documentLoaded) {
+      callback(true);
+      return;
+    }
+    this.documentLoadedCallbacks.push(callback);
+  },
+
+  /**
+   * Call back once the text layer of a page is completely rendered.
+   * @param {Number} pageNum The page number, starting from 1.
+   * @param {Function} callback Called with true, or with false if there
+   *   is no such page.
+   */
+  whenTextLayerRendered: function pdfWorkerWhenTextLayerRendered(pageNum,
+                                                                 callback) {
+    var pageView = PDFView.pages[pageNum - 1];
+    if (!pageView) {
+      callback(false);
+      return;
+    }
+
+    // The textLayer of the previous drawing is kept until the page is drawn
+    // again, so it only counts if the page is not waiting to be drawn.
+    if (pageView.renderingState !== RenderingStates.INITIAL &&
+        pageView.textLayer && pageView.textLayer.renderingDone) {
+      callback(true);
+      return;
+    }
+
+    var callbacks = this.textLayerCallbacks[pageNum] || [];
+    callbacks.push(callback);
+    this.textLayerCallbacks[pageNum] = callbacks;
+  },
+
+  /**
+   * Scroll to a page and call back once its text layer is rendered.
+   * @param {Number} pageNum The page number, starting from 1.
+   * @param {Function} callback See whenTextLayerRendered().
+   */
+  goToPage: function pdfWorkerGoToPage(pageNum, callback) {
+    PDFView.page = pageNum;
+    this.whenTextLayerRendered(pageNum, callback);
+  },
+
+  /**
+   * Start drawing pages in the background without scrolling to them.
+   *
+   * The viewer pauses every page but the current one, so prefetched pages
+   * are marked to keep being drawn until their text layers are rendered.
+   * @param {Array} pageNums The page numbers, starting from 1.
+   */
+  prefetch: function pdfWorkerPrefetch(pageNums) {
+    var renderHighestPriority = PDFView.renderHighestPriority.bind(PDFView);
+
+    for (var i = 0; i < pageNums.length; i++) {
+      var pageView = PDFView.pages[pageNums[i] - 1];
+      if (!pageView)
+        continue;
+
+      switch (pageView.renderingState) {
+        case RenderingStates.INITIAL:
+          PDFView.prefetchedPages[pageView.id] = true;
+          pageView.draw(renderHighestPriority);
+          break;
+        case RenderingStates.PAUSED:
+          PDFView.prefetchedPages[pageView.id] = true;
+          pageView.resume();
+          break;
+      }
+    }
+  },
+
+  /**
+   * Change the viewer scale and call back once the current page is
+   * rendered again.
+   * @param {String} scale The scale value, e.g. '1.25'.
+   * @param {Function} callback See whenTextLayerRendered().
+   */
+  setScale: function pdfWorkerSetScale(scale, callback) {
+    PDFView.parseScale(scale, true);
+    this.whenTextLayerRendered(PDFView.page, callback);
+  },
+
+  /**
+   * Read the text layer of a rendered page.
+   * @param {Number} pageNum The page number, starting from 1.
+   * @return {Object} null if the page is not rendered, otherwise an object
+   *   with the canvas width and height and a blocks array. Each block is
+   *   [left, top, font-size, data-canvas-width, scale-x, scale-y, text].
+   */
+  getTextLayer: function pdfWorkerGetTextLayer(pageNum) {
+    var pageDiv = document.getElementById('pageContainer' + pageNum);
+    if (!pageDiv)
+      return null;
+
+    var textLayerDiv = pageDiv.querySelector('.textLayer');
+    var canvas = pageDiv.querySelector('canvas');
+    if (!textLayerDiv || !canvas)
+      return null;
+
+    var blocks = [];
+    var textDivs = textLayerDiv.children;
+    for (var i = 0, ii = textDivs.length; i < ii; i++) {
+      var textDiv = textDivs[i];
+      var style = textDiv.style;
+      var transform = style.transform || style.webkitTransform ||
+                      style.MozTransform || '';
+      var match = this.TRANSFORM_REGEX.exec(transform);
+
+      blocks.push([
+        parseFloat(style.left) || 0,
+        parseFloat(style.top) || 0,
+        parseFloat(style.fontSize) || 0,
+        parseFloat(textDiv.dataset.canvasWidth) || 0,
+        match ? parseFloat(match[1]) : 1,
+        match ? parseFloat(match[2]) : 1,
+        textDiv.textContent
+      ]);
+    }
+
+    return {
+      width: canvas.width,
+      height: canvas.height,
+      blocks: blocks
+    };
+  },
+
+  /**
+   * Compute the text layer of a page without painting it.
+   *
+   * The page is rendered into a 1x1 canvas with images skipped, which is
+   * enough for pdf.js to compute the text geometry. The result has the
+   * same layout as getTextLayer().
+   * @param {Number} pageNum The page number, starting from 1.
+   * @param {Number} scale The viewer scale, e.g. 1 for 100%.
+   * @param {Function} callback Called with the result, or with an object
+   *   having an error property if the page can't be rendered.
+   */
+  extractText: function pdfWorkerExtractText(pageNum, scale, callback) {
+    PDFView.getPage(pageNum).then(function(pdfPage) {
+      var viewport = pdfPage.getViewport(scale * CSS_UNITS);
+      var outputScale = PDFView.getOutputScale();
+
+      var canvas = document.createElement('canvas');
+      canvas.width = 1;
+      canvas.height = 1;
+      var ctx = canvas.getContext('2d');
+      ctx._scaleX = outputScale.sx;
+      ctx._scaleY = outputScale.sy;
+      if (outputScale.scaled) {
+        ctx.scale(outputScale.sx, outputScale.sy);
+      }
+
+      var textLayer = new PDFWorkerTextLayer();
+      var renderContext = {
+        canvasContext: ctx,
+        viewport: viewport,
+        textLayer: textLayer,
+        skipImages: true
+      };
+      pdfPage.render(renderContext).then(
+        function pdfWorkerRenderCallback() {
+          pdfPage.getTextContent().then(function(textContent) {
+            callback({
+              width: Math.floor(viewport.width) * outputScale.sx,
+              height: Math.floor(viewport.height) * outputScale.sy,
+              blocks: textLayer.getBlocks(textContent)
+            });
+          });
+        },
+        function pdfWorkerRenderError(error) {
+          callback({error: String(error)});
+        }
+      );
+    });
+  }
+};
+
+// A textLayer for pdf.js render() which only collects the geometry of
+// texts. getBlocks() does what TextLayerBuilder does to its text divs in
+// viewer.js, so both produce the same numbers.
+var PDFWorkerTextLayer = function pdfWorkerTextLayer() {
+  this.geoms = [];
+
+  this.beginLayout = function pdfWorkerTextLayerBeginLayout() {
+    this.geoms = [];
+  };
+
+  this.endLayout = function pdfWorkerTextLayerEndLayout() {
+  };
+
+  this.appendText = function pdfWorkerTextLayerAppendText(geom) {
+    this.geoms.push(geom);
+  };
+
+  this.getBlocks = function pdfWorkerTextLayerGetBlocks(textContent) {
+    var MAX_TEXT_DIVS_TO_RENDER = 100000;
+    var geoms = this.geoms;
+    var bidiTexts = textContent.bidiTexts;
+    var blocks = [];
+
+    if (geoms.length > MAX_TEXT_DIVS_TO_RENDER)
+      return blocks;
+
+    var canvas = document.createElement('canvas');
+    var ctx = canvas.getContext('2d');
+
+    for (var i = 0, ii = Math.min(geoms.length, bidiTexts.length);
+         i < ii; i++) {
+      var geom = geoms[i];
+      var text = bidiTexts[i].str;
+      if (!/\S/.test(text))
+        continue;
+
+      var fontHeight = geom.fontSize * Math.abs(geom.vScale);
+      var canvasWidth = geom.canvasWidth * geom.hScale;
+
+      ctx.font = fontHeight + 'px ' + geom.fontFamily;
+      var width = ctx.measureText(text).width;
+      if (width > 0) {
+        blocks.push([geom.x, geom.y - fontHeight, fontHeight, canvasWidth,
+                     canvasWidth / width, 1, text]);
+      }
+    }
+
+    return blocks;
+  };
+};
+
+PDFWorker.initialize();
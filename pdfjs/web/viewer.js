@@ -965,6 +965,7 @@ var PDFView = {
   pdfDocument: null,
   sidebarOpen: false,
   pageViewScroll: null,
+  prefetchedPages: {},
   thumbnailViewScroll: null,
   isPresentationMode: false,
   previousScale: null,
@@ -2569,7 +2570,9 @@ var PageView = function pageView(container, id, scale,
           return;
         }
 
-        if (PDFView.highestPriorityPage !== 'page' + self.id) {
+        // Pages prefetched by pdfworker are drawn in the background too.
+        if (PDFView.highestPriorityPage !== 'page' + self.id &&
+            !PDFView.prefetchedPages[self.id]) {
           self.renderingState = RenderingStates.PAUSED;
           self.resume = function resumeCallback() {
             self.renderingState = RenderingStates.RUNNING;
@@ -2966,8 +2969,11 @@ var TextLayerBuilder = function textLayerBuilder(textLayerDiv, pageIdx) {
     // No point in rendering so many divs as it'd make the browser unusable
     // even after the divs are rendered
     var MAX_TEXT_DIVS_TO_RENDER = 100000;
-    if (textDivs.length > MAX_TEXT_DIVS_TO_RENDER)
+    if (textDivs.length > MAX_TEXT_DIVS_TO_RENDER) {
+      this.renderingDone = true;
+      this.dispatchRendered();
       return;
+    }
 
     for (var i = 0, ii = textDivs.length; i < ii; i++) {
       var textDiv = textDivs[i];
@@ -2997,6 +3003,15 @@ var TextLayerBuilder = function textLayerBuilder(textLayerDiv, pageIdx) {
     this.updateMatches();
 
     textLayerDiv.appendChild(textLayerFrag);
+    this.dispatchRendered();
+  };
+
+  this.dispatchRendered = function textLayerBuilderDispatchRendered() {
+    var event = document.createEvent('CustomEvent');
+    event.initCustomEvent('textlayerrendered', true, true, {
+      pageNumber: this.pageIdx + 1
+    });
+    this.textLayerDiv.dispatchEvent(event);
   };
 
   this.setupRenderLayoutTimer = function textLayerSetupRenderLayoutTimer() {
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+# standard library imports
+from collections import defaultdict
+from itertools import izip
+from math import floor, hypot
+
+# third party related imports
+
+# local library imports
+
+
+class CrossValidator(object):
+    """Compare the text boxes of two extractions of the same pages
+
+    The boxes of a page, e.g. by pdf.js, are matched one to one with
+    the boxes of a reference page, e.g. by xpdf, which is scaled to the
+    size of the page first. The offset of two boxes is the sum of the
+    distances between their corresponding corners, and boxes farther
+    than max_offset never match.
+
+    Since a matching pair has its top left corners within max_offset,
+    the reference boxes are indexed in a grid of max_offset cells by
+    their top left corners, and each box only looks at the 3x3 cells
+    around it. The candidate pairs are then matched greedily from the
+    smallest offset, so a page takes O(n log n) instead of comparing
+    every pair of boxes.
+
+    Attributes:
+        max_offset: The largest offset of matching boxes.
+        pages: A list of the metrics of every validated page, see
+            validate_page().
+
+    """
+
+    # The largest offset of matching boxes, in units of the page.
+    MAX_OFFSET = 100
+
+    def __init__(self, max_offset=MAX_OFFSET):
+
+        if max_offset <= 0:
+            raise ValueError('max_offset must be positive')
+
+        self.max_offset = max_offset
+        self.pages = []
+
+    @classmethod
+    def _offset(cls, x1, y1, w1, h1, x2, y2, w2, h2):
+        """The sum of the distances between the corners of two boxes."""
+
+        dx0, dy0 = x1 - x2, y1 - y2
+        dx1, dy1 = dx0 + w1 - w2, dy0 + h1 - h2
+
+        return hypot(dx0, dy0) + hypot(dx1, dy0) + \
+               hypot(dx1, dy1) + hypot(dx0, dy1)
+
+    def match(self, blocks, reference, scale_x=1, scale_y=1):
+        """Match text blocks with reference blocks one to one.
+
+        Args:
+            blocks: A TextBlocks.
+            reference: A TextBlocks, whose geometry is multiplied by
+                scale_x and scale_y before matching.
+            scale_x, scale_y: The scale of the reference blocks.
+
+        Returns:
+            A list of (index, reference index, offset) tuples sorted by
+            index.
+
+        """
+
+        cell = float(self.max_offset)
+        max_offset = self.max_offset
+
+        ref_boxes = [(x * scale_x, y * scale_y, w * scale_x, h * scale_y)
+                     for x, y, w, h in izip(reference.x, reference.y,
+                                            reference.w, reference.h)]
+        grid = defaultdict(list)
+        for ref_ix, (x, y, w, h) in enumerate(ref_boxes):
+            grid[int(floor(x / cell)), int(floor(y / cell))].append(ref_ix)
+
+        candidates = []
+        for ix, (x, y, w, h) in enumerate(izip(blocks.x, blocks.y,
+                                               blocks.w, blocks.h)):
+            col, row = int(floor(x / cell)), int(floor(y / cell))
+            for key in ((col + i, row + j) for i in (-1, 0, 1)
+                                           for j in (-1, 0, 1)):
+                for ref_ix in grid.get(key, ()):
+                    offset = self._offset(x, y, w, h, *ref_boxes[ref_ix])
+                    if offset < max_offset:
+                        candidates.append((offset, ix, ref_ix))
+
+        candidates.sort()
+        ret = []
+        matched, ref_matched = set(), set()
+        for offset, ix, ref_ix in candidates:
+            if ix not in matched and ref_ix not in ref_matched:
+                matched.add(ix)
+                ref_matched.add(ref_ix)
+                ret.append((ix, ref_ix, offset))
+
+        ret.sort()
+
+        return ret
+
+    def validate_page(self, page, reference):
+        """Compare a page with the reference page and record the metrics.
+
+        Args:
+            page: A PDFPage.
+            reference: A PDFPage of the same page number, which isn't
+                changed.
+
+        Returns:
+            A dict of
+                page: The page number.
+                boxes: The number of boxes of the page.
+                reference_boxes: The number of boxes of the reference.
+                matched: The number of matched pairs.
+                same_text: The number of matched pairs of the same text
+                    but surrounding whitespace.
+                mean_offset: The mean offset of matched pairs, or None.
+                max_offset: The largest offset of matched pairs, or None.
+                agreement: 2 * matched / (boxes + reference_boxes), 1 if
+                    neither has a box.
+
+        """
+
+        # a page which keeps a list builds a TextBlocks on every access
+        blocks = page.blocks
+        if blocks is None:
+            blocks = []
+        ref_blocks = reference.blocks
+        if ref_blocks is None:
+            ref_blocks = []
+        pairs = []
+        if len(blocks) and len(ref_blocks):
+            scale_x = 1.0 * page.width / reference.width \
+                      if reference.width else 1.0
+            scale_y = 1.0 * page.height / reference.height \
+                      if reference.height else 1.0
+            pairs = self.match(blocks, ref_blocks, scale_x, scale_y)
+
+        offsets = [offset for ix, ref_ix, offset in pairs]
+        same_text = sum(1 for ix, ref_ix, offset in pairs
+                        if (blocks.get_text(ix) or u'').strip() ==
+                           (ref_blocks.get_text(ref_ix) or u'').strip())
+
+        ret = {
+                'page': page.page_num,
+                'boxes': len(blocks),
+                'reference_boxes': len(ref_blocks),
+                'matched': len(pairs),
+                'same_text': same_text,
+                'mean_offset': sum(offsets) / len(offsets) if offsets else None,
+                'max_offset': max(offsets) if offsets else None,
+                'agreement': self._get_agreement(len(pairs), len(blocks),
+                                                 len(ref_blocks)),
+        }
+        self.pages.append(ret)
+
+        return ret
+
+    @classmethod
+    def _get_agreement(cls, matched, boxes, reference_boxes):
+
+        if boxes + reference_boxes == 0:
+            return 1.0
+
+        return 2.0 * matched / (boxes + reference_boxes)
+
+    def get_summary(self):
+        """Aggregate the metrics of all validated pages.
+
+        Returns:
+            A dict of the keys of validate_page() but page, summed over
+            pages or computed over all matched pairs, along with
+                pages: The number of validated pages.
+                min_agreement: The lowest agreement of a page, or None.
+                min_agreement_page: The page number of min_agreement.
+
+        """
+
+        ret = {'pages': len(self.pages)}
+        for key in ('boxes', 'reference_boxes', 'matched', 'same_text'):
+            ret[key] = sum(p[key] for p in self.pages)
+
+        total_offset = sum(p['mean_offset'] * p['matched']
+                           for p in self.pages if p['matched'])
+        max_offsets = [p['max_offset'] for p in self.pages if p['matched']]
+        ret['mean_offset'] = total_offset / ret['matched'] \
+                             if ret['matched'] else None
+        ret['max_offset'] = max(max_offsets) if max_offsets else None
+        ret['agreement'] = self._get_agreement(ret['matched'], ret['boxes'],
+                                               ret['reference_boxes'])
+
+        worst = min(self.pages, key=lambda p: p['agreement']) \
+                if self.pages else None
+        ret['min_agreement'] = worst['agreement'] if worst else None
+        ret['min_agreement_page'] = worst['page'] if worst else None
+
+        return ret
+
+    def __json__(self):
+        """The metrics of every page and of the whole document."""
+
+        return {
+                'pages': sorted(self.pages, key=lambda p: p['page']),
+                'document': self.get_summary(),
+        }
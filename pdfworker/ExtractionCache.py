@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+# standard library imports
+from contextlib import closing
+import hashlib
+import logging as logger
+import os
+import os.path
+
+# third party related imports
+import ujson
+
+# local library imports
+from util import atomic_write
+
+
+class ExtractionCache(object):
+    """Extracted pages cached on local disk
+
+    A page is cached under the hash of (pdf content hash, page number,
+    backend, scale, VERSION), so that a renamed or copied pdf still hits
+    and a modified one never does. Entries are evicted in least recently
+    used order once the cache takes more than max_bytes.
+
+    The cache is enabled by setting DIRNAME, after which get_instance()
+    returns the cache shared by PDFBrowser and PDFPage.create_by_xpdf.
+
+    Attributes:
+        dirname: A string indicating the absolute path of the cache
+            directory.
+        max_bytes: An integer indicating the maximal size of the cache.
+
+    """
+
+    # The cache directory, None to disable caching.
+    DIRNAME = None
+    # The maximal size of the cache in bytes.
+    MAX_BYTES = 1 << 30
+    # Bump it whenever extraction changes, so that old entries miss.
+    VERSION = 1
+    # Eviction removes entries until the cache is this ratio of max_bytes.
+    EVICT_RATIO = 0.9
+
+    ENTRY_EXT = '.json'
+    HASH_CHUNK_SIZE = 1 << 20
+
+    _instance = None
+
+    def __init__(self, dirname, max_bytes=MAX_BYTES):
+
+        self.dirname = os.path.abspath(dirname)
+        self.max_bytes = max_bytes
+        self._file_hashes = {}
+        self._size = None
+
+        if not os.path.isdir(self.dirname):
+            os.makedirs(self.dirname)
+
+    @classmethod
+    def get_instance(cls):
+        """The cache in DIRNAME, or None if caching is disabled."""
+
+        if cls.DIRNAME is None:
+            return None
+
+        instance = cls._instance
+        if instance is None or \
+           instance.dirname != os.path.abspath(cls.DIRNAME) or \
+           instance.max_bytes != cls.MAX_BYTES:
+            instance = cls._instance = ExtractionCache(cls.DIRNAME,
+                                                       cls.MAX_BYTES)
+
+        return instance
+
+    def get_file_hash(self, filename):
+        """SHA-1 of the content of a file.
+
+        A file is read once as long as its size and mtime don't change.
+
+        """
+
+        abs_filename = os.path.abspath(filename)
+        stat = os.stat(abs_filename)
+        memo_key = (abs_filename, stat.st_size, stat.st_mtime)
+
+        file_hash = self._file_hashes.get(memo_key)
+        if file_hash is not None:
+            return file_hash
+
+        sha1 = hashlib.sha1()
+        with closing(open(abs_filename, 'rb')) as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), ''):
+                sha1.update(chunk)
+
+        file_hash = self._file_hashes[memo_key] = sha1.hexdigest()
+
+        return file_hash
+
+    def _get_entry_path(self, filename, page_num, backend, scale):
+        """Path of the entry of a page."""
+
+        key = '\0'.join((self.get_file_hash(filename), str(page_num),
+                         backend, repr(float(scale)), str(self.VERSION)))
+        key = hashlib.sha1(key).hexdigest()
+
+        return os.path.join(self.dirname, key[:2], key + self.ENTRY_EXT)
+
+    def contains(self, filename, page_num, backend, scale=1):
+        """Whether a page is cached, see get()."""
+
+        return os.path.exists(self._get_entry_path(filename, page_num,
+                                                   backend, scale))
+
+    def get(self, filename, page_num, backend, scale=1):
+        """Get a cached page.
+
+        Args:
+            filename: A string indicating the pdf path.
+            page_num: An integer indicating the page number.
+            backend: A string naming how the page is extracted, e.g.
+                'pdfjs' or 'xpdf'.
+            scale: The scale at which the page is extracted.
+
+        Returns:
+            The page deserialized for PDFPage.create_by_json(), or None
+            if it isn't cached.
+
+        """
+
+        path = self._get_entry_path(filename, page_num, backend, scale)
+        try:
+            with closing(open(path, 'rb')) as f:
+                page = ujson.loads(f.read())
+
+            # mtime orders entries for eviction
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+
+        return page
+
+    def put(self, filename, page_num, backend, scale, page):
+        """Cache a PDFPage, see get().
+
+        None pages aren't cached, so that they are extracted again.
+
+        """
+
+        if page is None:
+            return
+
+        path = self._get_entry_path(filename, page_num, backend, scale)
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                # created by another process meanwhile
+                pass
+
+        # an overwritten entry is subtracted from the size
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        data = page.serialize()
+        atomic_write(path, data)
+
+        if self._size is None:
+            self._size = self._get_size()
+        else:
+            self._size += len(data) - old_size
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _iter_entries(self):
+        """Yield (mtime, size, path) of every entry."""
+
+        for root, dirs, files in os.walk(self.dirname):
+            for basename in files:
+                if not basename.endswith(self.ENTRY_EXT):
+                    continue
+
+                path = os.path.join(root, basename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                yield stat.st_mtime, stat.st_size, path
+
+    def _get_size(self):
+        """Total size of the entries in bytes."""
+
+        return sum(size for mtime, size, path in self._iter_entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache is small
+        enough.
+
+        """
+
+        entries = sorted(self._iter_entries())
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * self.EVICT_RATIO
+
+        num_evicted = 0
+        for mtime, entry_size, path in entries:
+            if size <= target:
+                break
+
+            try:
+                os.unlink(path)
+            except OSError:
+                # evicted by another process meanwhile
+                pass
+
+            size -= entry_size
+            num_evicted += 1
+
+        logger.info('Evict %s entries from %s', num_evicted, self.dirname)
+        self._size = size
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+# standard library imports
+from collections import OrderedDict
+from contextlib import closing
+import logging as logger
+import os.path
+
+# third party related imports
+import ujson
+
+# local library imports
+from PDFDocument import PDFDocument
+from PDFDocumentReader import PDFDocumentReader
+from PDFDocumentWriter import PDFDocumentWriter
+from PDFPage import PDFPage
+
+
+class LazyPages(object):
+    """The pages of a LazyPDFDocument, read on access
+
+    It behaves like the list of PDFDocument.pages: it is indexed by page
+    index, and the pages which aren't stored are None.
+
+    """
+
+    def __init__(self, pdf_doc):
+
+        self._pdf_doc = pdf_doc
+
+    def __len__(self):
+
+        return self._pdf_doc.get_num_stored()
+
+    def __getitem__(self, key):
+
+        if isinstance(key, slice):
+            return [self[ix] for ix in xrange(*key.indices(len(self)))]
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('page index out of range')
+
+        return self._pdf_doc.get_page(key)
+
+    def __iter__(self):
+
+        for ix in xrange(len(self)):
+            yield self[ix]
+
+
+class LazyPDFDocument(PDFDocument):
+    """A stored document whose pages are read one by one on access
+
+    Only the header and the page offsets are read when it is opened.
+    A page is read and deserialized when it is accessed, so that
+    looking at one page of a large document doesn't parse the others.
+    Only the last CACHE_SIZE pages read are kept, so that going through
+    all pages doesn't hold the whole document in memory.
+
+    The offsets come from the page table of the binary format, or from
+    the index PDFDocumentWriter.write_index() stores next to an NDJSON
+    document. An NDJSON document without an up-to-date index is scanned
+    once to find its pages. A JSON document has no offsets, so it is
+    read as a whole.
+
+    Attributes:
+        doc_filename: A string indicating the absolute path of the
+            stored document.
+
+    """
+
+    # Number of pages read from the document kept in memory.
+    CACHE_SIZE = 16
+
+    def __init__(self, doc_filename, filename=None):
+        """Open a stored document.
+
+        Args:
+            doc_filename: The path of the stored document.
+            filename: The path of the pdf. Default is the stored
+                basename in the directory of doc_filename.
+
+        Raises:
+            ValueError: doc_filename isn't a stored document.
+
+        """
+
+        self.doc_filename = os.path.abspath(doc_filename)
+        self._f = open(self.doc_filename, 'rb')
+        # pages added, or of a JSON document, which have no offsets
+        self._loaded = {}
+        # pages read from offsets, least recently used first
+        self._cache = OrderedDict()
+        self._offsets = {}
+
+        try:
+            magic = self._f.read(len(PDFDocument.BINARY_MAGIC))
+            self._f.seek(0)
+            if magic == PDFDocument.BINARY_MAGIC:
+                self._binary = True
+                header = self._open_binary()
+            else:
+                self._binary = False
+                header = self._open_json()
+        except:
+            self._f.close()
+            raise
+
+        if filename is None:
+            filename = os.path.join(os.path.dirname(self.doc_filename),
+                                    header['file'])
+        super(LazyPDFDocument, self).__init__(filename)
+        self._num_stored_pages = header.get('page')
+        self.extraction = header.get('extraction')
+
+    def _open_binary(self):
+        """Read the header and the page table of a binary document."""
+
+        header, entries = PDFDocument.read_binary_index(self._f)
+        for page_ix, offset, length in entries:
+            self._offsets[page_ix] = (offset, length)
+
+        return header
+
+    def _open_json(self):
+        """Read the header and the page offsets of a JSON or NDJSON
+        document.
+
+        """
+
+        line = self._f.readline()
+        header = ujson.loads(line)
+        if 'data' in header:
+            # a JSON document, which is read as a whole
+            pdf_doc = PDFDocument.create_by_json(deserialized=header)
+            for page_ix, page_obj in enumerate(pdf_doc.pages):
+                if page_obj is not None:
+                    self._loaded[page_ix] = page_obj
+
+            return header
+
+        self._f.seek(0)
+        header = PDFDocumentReader(self._f).header
+
+        index = self._read_index()
+        if index is None:
+            index = self._scan_index(len(line))
+
+        for page_ix, offset, length in index:
+            self._offsets[page_ix] = (offset, length)
+
+        return header
+
+    def _read_index(self):
+        """Read the page offsets of an NDJSON document from its index.
+
+        Returns:
+            A list of [page index, offset, length], or None if there is
+            no index of the current document.
+
+        """
+
+        index_filename = self.doc_filename + PDFDocumentWriter.INDEX_EXT
+        try:
+            with closing(open(index_filename, 'rb')) as f:
+                index = ujson.loads(f.read())
+        except (IOError, ValueError):
+            return None
+
+        if index.get('version') != PDFDocumentWriter.INDEX_VERSION or \
+           index.get('size') != os.path.getsize(self.doc_filename):
+            logger.info('Ignore outdated index %s', index_filename)
+            return None
+
+        return index['pages']
+
+    def _scan_index(self, offset):
+        """Find the page offsets of an NDJSON document by reading it.
+
+        Args:
+            offset: Where the first page line starts.
+
+        """
+
+        ret = []
+        self._f.seek(offset)
+        for line in iter(self._f.readline, ''):
+            if line.strip():
+                ret.append([ujson.loads(line)['index'], offset, len(line)])
+            offset += len(line)
+
+        return ret
+
+    def close(self):
+        """Close the stored document. Added pages are still available."""
+
+        self._f.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    @property
+    def num_pages(self):
+        """Number of pages, as stored in the document."""
+
+        if self._num_stored_pages is not None:
+            return self._num_stored_pages
+
+        return super(LazyPDFDocument, self).num_pages
+
+    def get_num_stored(self):
+        """The highest stored or added page index plus 1."""
+
+        return max(self._offsets.keys() + self._loaded.keys() + [-1]) + 1
+
+    def get_page(self, page_ix):
+        """Read a page.
+
+        Args:
+            page_ix: The index of the pdf page. (Start from 0)
+
+        Returns:
+            An instance of PDFPage, or None if the page isn't stored.
+
+        """
+
+        if page_ix not in self._offsets:
+            return self._loaded.get(page_ix)
+
+        page_obj = self._cache.pop(page_ix, None)
+        if page_obj is not None:
+            self._cache[page_ix] = page_obj
+            return page_obj
+
+        offset, length = self._offsets[page_ix]
+        self._f.seek(offset)
+        data = self._f.read(length)
+        if len(data) < length:
+            raise ValueError('Truncated page %s in %s' %
+                             (page_ix, self.doc_filename))
+
+        if self._binary:
+            page_obj = PDFPage.create_by_binary(data)
+        else:
+            record = ujson.loads(data)
+            record.pop('index', None)
+            page_obj = PDFPage.create_by_json(deserialized=record)
+
+        self._cache[page_ix] = page_obj
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+        return page_obj
+
+    def add_page(self, page_ix, page_obj):
+        """Add or replace a page, see PDFDocument.add_page()."""
+
+        self._loaded[page_ix] = page_obj
+        self._offsets.pop(page_ix, None)
+        self._cache.pop(page_ix, None)
+
+    @property
+    def pages(self):
+        """A LazyPages, which reads pages on access."""
+
+        return LazyPages(self)
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 
 # standard library imports
+import itertools
 import logging as logger
 import os.path
+import Queue
+import sys
+import threading
+import time
 
 # third party related imports
 from selenium import webdriver
@@ -10,13 +15,16 @@ from selenium.common.exceptions import (NoSuchElementException,
                                         TimeoutException,
                                         WebDriverException)
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.wait import WebDriverWait
 
 # local library imports
+from ExtractionCache import ExtractionCache
+from PDFCheckpoint import PDFCheckpoint
 from PDFDocument import PDFDocument
 from PDFPage import PDFPage
-from util import time_limit, TimeLimitException
+from TimeoutController import TimeoutController
+from util import (call_with_time_limit, get_process_tree_rss,
+                  kill_process_tree, TimeLimitException)
 
 
 class PDFBrowserError(Exception): pass
@@ -32,9 +40,14 @@ class PDFBrowser(object):
         driver: A string either 'firefox' or 'chrome'
         browser: An instance of selenium Firefox.
             been viewed. Due to the memory issue, we have to refresh
-            browser after viewing a number of pages.
+            browser after viewing a number of pages, see RECYCLE_PAGES
+            and RECYCLE_RSS.
         abs_filename: A string inidcating the absolute path of the
             specified pdf file.
+        timeout_ctrl: An instance of TimeoutController, which decides
+            the page timeouts of the current document.
+        text_only: A boolean. If True, the text layer of a page is
+            computed by pdf.js without painting the page.
 
     """
 
@@ -45,12 +58,17 @@ class PDFBrowser(object):
                                  '..', 'chromedriver64')
     CHROME32_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                                  '..', 'chromedriver32')
-    # If loading pdf takes more time than it, raise exception
+    # If loading pdf takes more time than it, raise exception. It is
+    # also the page timeout until render latencies are known.
     GLOBAL_TIMEOUT = 15
     # If rendering a page over this limit, we just give up.
     GIVEUP_TIMEOUT = 60
     # Available scales
     AVAILABLE_SCALES = ('0.5', '0.75', '1', '1.25', '1.5', '2')
+    # Restart the browser after rendering this number of pages.
+    RECYCLE_PAGES = None
+    # Restart the browser if its processes take more memory (in MB).
+    RECYCLE_RSS = None
 
     OUTER_CONTAINER_ID = 'outerContainer'
     # The <input type="file"> to load pdf
@@ -61,13 +79,38 @@ class PDFBrowser(object):
     SCALE_INPUT_ID = 'scaleSelect'
     # The main div contains all pdf page
     VIEWER_ID = 'viewer'
-
-    def __init__(self, filename, driver='firefox'):
+    # Read the text layer of a page, see pdfjs/web/pdfworker.js
+    GET_TEXT_LAYER_SCRIPT = 'return PDFWorker.getTextLayer(arguments[0]);'
+    # Compute the text layer of a page without painting it
+    EXTRACT_TEXT_SCRIPT = ('PDFWorker.extractText(arguments[0], arguments[1], '
+                           'arguments[arguments.length - 1]);')
+    # Wait until the pdf is loaded
+    WAIT_DOCUMENT_SCRIPT = ('PDFWorker.whenDocumentLoaded('
+                            'arguments[arguments.length - 1]);')
+    # Go to a page and wait until its text layer is rendered
+    GO_TO_PAGE_SCRIPT = ('PDFWorker.goToPage(arguments[0], '
+                         'arguments[arguments.length - 1]);')
+    # Set the scale and wait until the current page is rendered again
+    SET_SCALE_SCRIPT = ('PDFWorker.setScale(arguments[0], '
+                        'arguments[arguments.length - 1]);')
+    # Start drawing pages in the background
+    PREFETCH_SCRIPT = 'PDFWorker.prefetch(arguments[0]);'
+    # Close the current pdf before opening another one
+    CLOSE_DOCUMENT_SCRIPT = 'PDFWorker.closeDocument();'
+    # Whether the browser still responds
+    HEALTH_CHECK_SCRIPT = "return typeof PDFWorker !== 'undefined';"
+    HEALTH_CHECK_TIMEOUT = 5
+
+    def __init__(self, filename, driver='firefox', text_only=False):
 
         self.driver = driver
         self.browser = None
         self.abs_filename = os.path.abspath(filename)
-        self.num_retry = 0
+        self.text_only = text_only
+        self.timeout_ctrl = TimeoutController(self.GLOBAL_TIMEOUT,
+                                              max_timeout=self.GIVEUP_TIMEOUT)
+        self.num_rendered = 0
+        self._script_timeout = None
 
         # ensure file exist
         if not os.path.exists(self.abs_filename):
@@ -91,7 +134,7 @@ class PDFBrowser(object):
             except Exception, e:
                 pass
 
-        if self.browser == 'firefox':
+        if self.driver == 'firefox':
             self.browser = webdriver.Firefox()
         else:
             opt = Options()
@@ -108,75 +151,269 @@ class PDFBrowser(object):
                                     chrome_options=opt
                                )
 
+        self.num_rendered = 0
+        self._script_timeout = None
         self._open_pdf()
-        self._set_scale(scale)
+        if not self.text_only:
+            self._set_scale(scale)
 
     def _refresh_browser(self, scale=1):
         """Refresh the current browser."""
 
         self._init_browser(scale)
 
-    def get_page(self, page_ix, scale=1):
-        """Get text information in the specified page.
+    def load(self, filename, scale=1):
+        """Open another pdf.
+
+        If a browser is running, the pdf is swapped in its viewer
+        instead of launching a new browser.
 
         Args:
-            filename:
+            filename: A string, PDF filename.
+            scale: The scale at which pages are rendered.
 
         """
 
+        abs_filename = os.path.abspath(filename)
+        if not os.path.exists(abs_filename):
+            raise PDFBrowserError('%s does not exist' % abs_filename)
+
+        self.abs_filename = abs_filename
+        self.timeout_ctrl.reset()
+
         if self.browser is None:
-            self._init_browser()
+            self._init_browser(scale)
+            return
 
-        page_num = page_ix + 1
+        self._open_pdf(reload_viewer=False)
+        if not self.text_only:
+            self._set_scale(scale)
+
+    def is_alive(self):
+        """Test whether the browser and its viewer still respond."""
+
+        if self.browser is None:
+            return False
 
         try:
-            self._go_to_page(page_num, scale)
+            return self._call_browser(self.HEALTH_CHECK_TIMEOUT,
+                                      self.browser.execute_script,
+                                      self.HEALTH_CHECK_SCRIPT)
+        except Exception:
+            return False
 
-            page_id = 'pageContainer%s' % page_num
-            get_dom_script = "return arguments[0].innerHTML"
+    def _get_browser_pid(self):
+        """Get the process id of the driver which launched the browser."""
 
-            try:
-                with time_limit(self.GLOBAL_TIMEOUT + 1):
-                    # get textLayer
-                    elem = self.browser.find_element_by_id(page_id)
-                    text_elem = elem.find_element_by_class_name('textLayer')
-                    text_dom = self.browser.execute_script(get_dom_script,
-                                                           text_elem)
-                    # get canvas
-                    canvas_elem = elem.find_element_by_tag_name('canvas')
-                    width = int(canvas_elem.get_attribute('width'))
-                    height = int(canvas_elem.get_attribute('height'))
-            except TimeLimitException:
-                raise TimeoutException
-
-        except TimeoutException:
-            logger.error('Render page %s timeout', page_num)
+        for attr in ('service', 'binary'):
+            process = getattr(getattr(self.browser, attr, None),
+                              'process', None)
+            if process is not None:
+                return process.pid
 
-            try:
-                with time_limit(1):
-                    self.browser.quit()
-            except Exception:
-                pass
-            finally:
-                self.browser = None
-                self.num_retry += 1
-                self.GLOBAL_TIMEOUT += 2 ** self.num_retry
+        return None
+
+    def _should_recycle(self):
+        """Test whether the browser should be restarted.
+
+        The browser swells on long documents, it is restarted after
+        RECYCLE_PAGES pages or once it takes more than RECYCLE_RSS MB.
+
+        """
+
+        if self.RECYCLE_PAGES is not None and \
+           self.num_rendered >= self.RECYCLE_PAGES:
+            logger.info('Browser has rendered %s pages, recycle it',
+                        self.num_rendered)
+            return True
+
+        if self.RECYCLE_RSS is not None:
+            pid = self._get_browser_pid()
+            rss = get_process_tree_rss(pid) if pid is not None else 0
+            if rss > self.RECYCLE_RSS * 1024 * 1024:
+                logger.info('Browser takes %s MB, recycle it', rss >> 20)
+                return True
+
+        return False
+
+    def quit(self):
+        """Quit the browser."""
+
+        if self.browser is None:
+            return
+
+        try:
+            self._call_browser(1, self.browser.quit)
+        except Exception:
+            pass
+        finally:
+            self.browser = None
+
+    def _kill_browser(self):
+        """Kill the browser and its driver, which don't respond."""
+
+        pid = self._get_browser_pid()
+        self.browser = None
+        if pid is not None:
+            kill_process_tree(pid)
+
+    def _call_browser(self, seconds, func, *args):
+        """Call a WebDriver method within seconds, see
+        util.call_with_time_limit().
+
+        A browser which doesn't respond in time is killed, which also
+        ends a call still waiting for it in another thread.
+
+        Raises:
+            TimeLimitException: func doesn't return in time.
+
+        """
+
+        try:
+            return call_with_time_limit(seconds, func, *args)
+        except TimeLimitException:
+            logger.warning('Browser takes more than %s seconds, kill it',
+                           seconds)
+            self._kill_browser()
+            raise
+
+    def get_page(self, page_ix, scale=1):
+        """Get text information in the specified page.
+
+        Args:
+            page_ix: The index of the pdf page. (Start from 0)
+            scale: The scale at which the page is rendered.
+
+        Returns:
+            An instance of PDFPage, or None if the page can't be
+            rendered.
+
+        """
+
+        page = self._get_cached_page(page_ix, scale)
+        if page is not None:
+            return page
+
+        page = self._parse_page(page_ix, self._fetch_page(page_ix, scale))
+        self._cache_page(page_ix, scale, page)
+
+        return page
+
+    @property
+    def backend(self):
+        """Name of the extraction backend in ExtractionCache."""
+
+        return 'pdfjs-text' if self.text_only else 'pdfjs'
+
+    def _get_cached_page(self, page_ix, scale):
+        """Get a page from ExtractionCache, or None if it misses."""
+
+        cache = ExtractionCache.get_instance()
+        if cache is None:
+            return None
+
+        page_data = cache.get(self.abs_filename, page_ix + 1, self.backend,
+                              scale)
+        if page_data is None:
+            return None
+
+        return PDFPage.create_by_json(deserialized=page_data)
+
+    def _cache_page(self, page_ix, scale, page):
+        """Put a page in ExtractionCache if it is enabled."""
+
+        cache = ExtractionCache.get_instance()
+        if cache is not None:
+            cache.put(self.abs_filename, page_ix + 1, self.backend, scale,
+                      page)
+
+    def _parse_page(self, page_ix, text_layer):
+        """Create a PDFPage from the text layer read from the browser."""
+
+        if text_layer is None:
+            return None
+
+        return PDFPage.create_by_text_layer(page_ix + 1,
+                                            text_layer['width'],
+                                            text_layer['height'],
+                                            text_layer['blocks'])
+
+    def _fetch_page(self, page_ix, scale=1, prefetch=()):
+        """Read the text layer of a page from the browser.
 
-                if self.GLOBAL_TIMEOUT > self.GIVEUP_TIMEOUT:
+        The page is waited for as long as timeout_ctrl suggests, and is
+        retried in a new browser with a longer timeout if it times out.
+
+        Args:
+            page_ix: The index of the pdf page. (Start from 0)
+            scale: The scale at which the page is rendered.
+            prefetch: Indices of the pages to be drawn in the background
+                once this page is read.
+
+        Returns:
+            A dict of the text layer, or None if the page can't be
+            rendered.
+
+        """
+
+        page_num = page_ix + 1
+
+        for num_retry in itertools.count():
+            if self.browser is None or self._should_recycle():
+                self._init_browser(scale)
+
+            timeout = self.timeout_ctrl.get_timeout(num_retry)
+            start = time.time()
+
+            try:
+                text_layer = self._render_page(page_num, scale, timeout)
+            except PDFBrowserError, e:
+                logger.error(e)
+                return None
+            except TimeoutException:
+                logger.error('Render page %s timeout', page_num)
+
+                self.quit()
+                if not self.timeout_ctrl.can_retry(num_retry + 1):
                     logger.error("Can't render page %s", page_num)
                     return None
 
-                logger.warning('extend timeout to %s seconds',
-                               self.GLOBAL_TIMEOUT)
-                return self.get_page(page_ix, scale)
+                logger.warning('extend timeout to %.1f seconds',
+                               self.timeout_ctrl.get_timeout(num_retry + 1))
+                continue
+
+            self.timeout_ctrl.record(time.time() - start)
+            self.num_rendered += 1
 
-        if self.num_retry != 0:
-            self.GLOBAL_TIMEOUT -= 2 ** self.num_retry
-            self.num_retry = 0
+            if prefetch and not self.text_only:
+                self.browser.execute_script(self.PREFETCH_SCRIPT,
+                                            [ix + 1 for ix in prefetch])
 
-        return PDFPage.create_by_pdfjs(page_num, width, height, text_dom)
+            return text_layer
+
+    def _render_page(self, page_num, scale, timeout):
+        """Render a page and read its text layer.
+
+        Raises:
+            TimeoutException: The page isn't rendered in timeout seconds.
+
+        """
 
-    def run(self, pages=None, scale=1, page_rendered_cb=None):
+        if not self.text_only:
+            self._go_to_page(page_num, timeout)
+
+        try:
+            if self.text_only:
+                return self._call_browser(timeout + 1, self._extract_text,
+                                          page_num, scale, timeout)
+
+            return self._call_browser(timeout + 1, self._get_text_layer,
+                                      page_num)
+        except TimeLimitException:
+            raise TimeoutException
+
+    def run(self, pages=None, scale=1, page_rendered_cb=None,
+            keep_browser=False, depth=0, checkpoint_dir=None):
         """The entry to start parse pdf.
 
         Args:
@@ -184,6 +421,16 @@ class PDFBrowser(object):
             pages: A list containing what pages we want to parse.
             page_rendered_cb: A callable which will be called after
                 a page is rendered.
+            keep_browser: If True, use the pdf already opened by load()
+                and leave the browser running afterwards.
+            depth: An integer. If positive, pages are pipelined: the
+                browser goes on to render at most depth pages ahead
+                while the rendered ones are parsed and passed to
+                page_rendered_cb in another thread.
+            checkpoint_dir: A string. If given, every finished page is
+                stored in this directory, and the pages stored by an
+                interrupted run are restored instead of rendered again.
+                page_rendered_cb isn't called for restored pages.
 
         Returns:
             An instance of PDFDocument.
@@ -192,8 +439,6 @@ class PDFBrowser(object):
 
         ret = PDFDocument(self.abs_filename)
 
-        self._init_browser(scale)
-
         page_cb = lambda x: x
         if callable(page_rendered_cb):
             page_cb = page_rendered_cb
@@ -201,32 +446,137 @@ class PDFBrowser(object):
         if pages is None:
             pages = xrange(ret.num_pages)
 
-        for page_ix in pages:
-            page = self.get_page(page_ix, scale)
+        checkpoint = None
+        if checkpoint_dir is not None:
+            checkpoint = PDFCheckpoint(checkpoint_dir, self.abs_filename,
+                                       scale, self.text_only)
+            restored = checkpoint.restore(ret, pages)
+            pages = [page_ix for page_ix in pages if page_ix not in restored]
+
+        def on_page(page_ix, page):
             ret.add_page(page_ix, page)
+            if checkpoint is not None:
+                checkpoint.save_page(page_ix, page)
             page_cb(page)
 
-        self.browser.quit()
+        # the browser is started by the first page which isn't cached
+        if not keep_browser:
+            self.quit()
+
+        try:
+            if depth > 0:
+                self._run_pipelined(list(pages), scale, on_page, depth)
+            else:
+                for page_ix in pages:
+                    on_page(page_ix, self.get_page(page_ix, scale))
+        finally:
+            if not keep_browser:
+                self.quit()
 
         return ret
 
-    def _open_pdf(self):
+    def _run_pipelined(self, pages, scale, on_page, depth):
+        """Render pages while the previous ones are parsed.
+
+        The browser is driven in the current thread, which hands the
+        text layers over to a consumer thread by a queue holding at most
+        depth pages, so that a slow on_page stalls the browser instead
+        of piling up text layers.
+
+        """
+
+        text_layers = Queue.Queue(depth)
+        errors = []
+
+        def consume():
+            while True:
+                item = text_layers.get()
+                if item is None:
+                    return
+
+                # keep draining so that the producer is never blocked
+                if errors:
+                    continue
+
+                page_ix, text_layer, page = item
+                try:
+                    if page is None:
+                        page = self._parse_page(page_ix, text_layer)
+                        self._cache_page(page_ix, scale, page)
+                    on_page(page_ix, page)
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        consumer = threading.Thread(target=consume)
+        consumer.daemon = True
+        consumer.start()
+
+        try:
+            for i, page_ix in enumerate(pages):
+                if errors:
+                    break
+
+                text_layer = None
+                page = self._get_cached_page(page_ix, scale)
+                if page is None:
+                    prefetch = pages[i + 1:i + 1 + depth]
+                    text_layer = self._fetch_page(page_ix, scale, prefetch)
+                text_layers.put((page_ix, text_layer, page))
+        finally:
+            text_layers.put(None)
+            consumer.join()
+
+        if errors:
+            exc_type, exc_value, exc_tb = errors[0]
+            raise exc_type, exc_value, exc_tb
+
+    def _open_pdf(self, reload_viewer=True):
         """Open the specified pdf."""
 
         # Load page
-        self.browser.get('file://%s' % self.HTML_PATH)
+        if reload_viewer:
+            self.browser.get('file://%s' % self.HTML_PATH)
+        else:
+            self.browser.execute_script(self.CLOSE_DOCUMENT_SCRIPT)
 
         # Load pdf file
         file_input = self.browser.find_element_by_id(self.FILE_INPUT_ID)
         file_input.send_keys(self.abs_filename)
 
-        def _is_in_progress(browser):
+        self._wait_for(self.GLOBAL_TIMEOUT, self.WAIT_DOCUMENT_SCRIPT)
 
-            elem = browser.find_element_by_id(self.OUTER_CONTAINER_ID)
-            return elem.get_attribute('class') == ''
+    def _get_text_layer(self, page_num):
+        """Read the text layer and canvas size of a rendered page.
 
-        wait = WebDriverWait(self.browser, self.GLOBAL_TIMEOUT, 0.1)
-        wait.until(_is_in_progress)
+        The whole text layer is walked inside the browser by
+        pdfworker.js, so that it costs only one WebDriver round trip.
+
+        """
+
+        text_layer = self.browser.execute_script(self.GET_TEXT_LAYER_SCRIPT,
+                                                 page_num)
+        if text_layer is None:
+            raise NoSuchElementException('No text layer in page %s' %
+                                         page_num)
+
+        return text_layer
+
+    def _extract_text(self, page_num, scale=1, timeout=None):
+        """Compute the text layer of a page without painting it.
+
+        Only the text geometry is computed by pdf.js, neither the canvas
+        is painted nor the loadingIcon is waited for.
+
+        """
+
+        text_layer = self._wait_for(timeout or self.GLOBAL_TIMEOUT,
+                                    self.EXTRACT_TEXT_SCRIPT, page_num,
+                                    float(scale))
+        if 'error' in text_layer:
+            raise PDFBrowserError("Can't render page %s: %s" %
+                                  (page_num, text_layer['error']))
+
+        return text_layer
 
     def _get_num_pages(self):
         """Get the total number of page."""
@@ -242,76 +592,53 @@ class PDFBrowser(object):
 
         return int(_isready(self.browser))
 
-    def _go_to_page(self, page_num, scale=1):
+    def _go_to_page(self, page_num, timeout=None):
         """Go to the specified page number."""
 
-        try:
-            with time_limit(self.GLOBAL_TIMEOUT):
-                elem = self.browser.find_element_by_id(self.PAGE_INPUT_ID)
-                self._fill(elem, str(page_num), pass_newline=True)
-        except TimeLimitException:
-            raise TimeoutException
+        timeout = timeout or self.GLOBAL_TIMEOUT
 
         # wait until pdf page is loaded
         try:
-            with time_limit(self.GLOBAL_TIMEOUT + 1):
-                wait = WebDriverWait(self.browser, self.GLOBAL_TIMEOUT, 0.1)
-                wait.until(lambda browser: self._is_page_loaded(browser, page_num))
+            loaded = self._call_browser(timeout + 1, self._wait_for, timeout,
+                                        self.GO_TO_PAGE_SCRIPT, page_num)
         except TimeLimitException:
             msg = 'Rendering page %s takes more than %s seconds' % \
-                  (page_num, self.GLOBAL_TIMEOUT)
+                  (page_num, timeout)
             raise TimeoutException(msg)
 
+        if not loaded:
+            raise PDFBrowserError('page %s does not exist' % page_num)
+
     def _set_scale(self, scale):
         """Set the pdf viewer scale option."""
 
         if str(scale) not in self.AVAILABLE_SCALES:
             raise PDFBrowserError('scale: %s is not supported' % scale)
 
-        elem = self.browser.find_element_by_id(self.SCALE_INPUT_ID)
-        if not self._select(elem, str(scale)):
-            raise PDFBrowserError("can't select option %s" % scale)
-
         # wait until pdf is rendered
-        wait = WebDriverWait(self.browser, self.GLOBAL_TIMEOUT, 0.1)
-        wait.until(self._is_page_loaded)
-
-    def _is_page_loaded(self, browser, page_num=1):
-        """Test whether a given page is loaded."""
-
-        elem = browser.find_element_by_id('pageContainer%s' % page_num)
+        self._wait_for(self.GLOBAL_TIMEOUT, self.SET_SCALE_SCRIPT, str(scale))
 
-        try:
-            elem.find_element_by_class_name('loadingIcon')
-            return False
-        except NoSuchElementException:
-            return True
-
-    def _select(self, select_element, option_value=None, option_text=None):
-        """Select an option by value or text."""
+    def _wait_for(self, timeout, script, *args):
+        """Run a pdfworker.js script which calls back when it is done.
 
-        if option_value is not None:
-            for option in self.browser.find_elements_by_tag_name('option'):
-                if option.get_attribute('value') == option_value:
-                    option.click()
-                    return True
+        The browser itself signals when the viewer is ready, so that we
+        block on one WebDriver call instead of polling the DOM.
 
-        elif option_text is not None:
-            for option in self.browser.find_elements_by_tag_name('option'):
-                if option.text == option_text:
-                    option.click()
-                    return True
+        Args:
+            timeout: How many seconds the callback is waited for.
+            script: The script, its callback is the last argument.
 
-        return False
+        Returns:
+            The value passed to the callback.
 
-    def _fill(self, text_element, value, pass_newline=False):
-        """Fill a text input by the specified value."""
+        Raises:
+            TimeoutException: The callback is not called in time.
 
-        text_element.click()
-        text_element.send_keys(Keys.BACK_SPACE)
-        text_element.clear()
-        text_element.send_keys(value)
+        """
 
-        if pass_newline:
-            text_element.send_keys(Keys.ENTER)
+        # setting the timeout is a round trip too, only do it on change
+        if self._script_timeout != timeout:
+            self.browser.set_script_timeout(timeout)
+            self._script_timeout = timeout
 
+        return self.browser.execute_async_script(script, *args)
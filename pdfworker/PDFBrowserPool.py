@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+# standard library imports
+import logging as logger
+import math
+import multiprocessing
+import multiprocessing.util
+import os.path
+import time
+
+# third party related imports
+
+# local library imports
+from PDFBrowser import PDFBrowser, PDFBrowserError
+from PDFCheckpoint import PDFCheckpoint
+from PDFDocument import PDFDocument
+
+
+# The PDFBrowser owned by the current worker process.
+_worker_browser = None
+
+
+def _init_worker(filename, driver, text_only):
+    """Create the PDFBrowser of a worker process."""
+
+    global _worker_browser
+
+    _worker_browser = PDFBrowser(filename, driver, text_only)
+    multiprocessing.util.Finalize(None, _quit_worker, exitpriority=10)
+
+
+def _quit_worker():
+    """Quit the browser of a worker process before it exits."""
+
+    global _worker_browser
+
+    if _worker_browser is not None and _worker_browser.browser is not None:
+        try:
+            _worker_browser.browser.quit()
+        except Exception:
+            pass
+
+    _worker_browser = None
+
+
+def _render_page(args):
+    """Render a page in the worker process."""
+
+    page_ix, scale = args
+
+    return page_ix, _worker_browser.get_page(page_ix, scale)
+
+
+class PDFBrowserPool(object):
+    """Load pdf in several browsers at the same time
+
+    PDFBrowserPool starts a number of worker processes, each of which
+    owns a PDFBrowser, and shards the requested pages across them.
+
+    Attributes:
+        driver: A string either 'firefox' or 'chrome'
+        abs_filename: A string inidcating the absolute path of the
+            specified pdf file.
+        num_workers: An integer indicating how many browsers are
+            launched.
+        text_only: A boolean passed to every PDFBrowser.
+        pages_per_second: A float indicating the throughput of the
+            last run.
+
+    """
+
+    # Every worker gets about this number of shards, so that a slow
+    # worker doesn't hold the whole document.
+    SHARDS_PER_WORKER = 4
+
+    def __init__(self, filename, driver='firefox', num_workers=None,
+                 text_only=False):
+
+        self.driver = driver
+        self.abs_filename = os.path.abspath(filename)
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.text_only = text_only
+        self.pages_per_second = 0.
+
+        # ensure file exist
+        if not os.path.exists(self.abs_filename):
+            raise PDFBrowserError('%s does not exist' % self.abs_filename)
+
+    def _get_shard_size(self, num_pages):
+        """Number of consecutive pages dispatched to a worker at once."""
+
+        num_shards = self.num_workers * self.SHARDS_PER_WORKER
+
+        return max(1, int(math.ceil(1. * num_pages / num_shards)))
+
+    def run(self, pages=None, scale=1, page_rendered_cb=None,
+            checkpoint_dir=None):
+        """The entry to start parse pdf.
+
+        Args:
+            pages: A list containing what pages we want to parse.
+            scale: The scale at which pages are rendered.
+            page_rendered_cb: A callable which will be called after
+                a page is rendered. Pages come in the order they are
+                finished rather than the page order.
+            checkpoint_dir: A string, see PDFBrowser.run().
+
+        Returns:
+            An instance of PDFDocument.
+
+        """
+
+        ret = PDFDocument(self.abs_filename)
+
+        page_cb = lambda x: x
+        if callable(page_rendered_cb):
+            page_cb = page_rendered_cb
+
+        if pages is None:
+            pages = xrange(ret.num_pages)
+
+        checkpoint = None
+        if checkpoint_dir is not None:
+            checkpoint = PDFCheckpoint(checkpoint_dir, self.abs_filename,
+                                       scale, self.text_only)
+            restored = checkpoint.restore(ret, pages)
+            pages = [page_ix for page_ix in pages if page_ix not in restored]
+
+        tasks = [(page_ix, scale) for page_ix in pages]
+        if len(tasks) == 0:
+            return ret
+
+        num_workers = min(self.num_workers, len(tasks))
+        pool = multiprocessing.Pool(num_workers, _init_worker,
+                                    (self.abs_filename, self.driver,
+                                     self.text_only))
+
+        start = time.time()
+        try:
+            results = pool.imap_unordered(_render_page, tasks,
+                                          self._get_shard_size(len(tasks)))
+            for page_ix, page in results:
+                ret.add_page(page_ix, page)
+                if checkpoint is not None:
+                    checkpoint.save_page(page_ix, page)
+                page_cb(page)
+
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        elapsed = time.time() - start
+        self.pages_per_second = len(tasks) / elapsed if elapsed > 0 else 0.
+        logger.info('Render %s pages by %s browsers in %.2f seconds '
+                    '(%.2f pages/s)', len(tasks), num_workers, elapsed,
+                    self.pages_per_second)
+
+        return ret
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+# standard library imports
+from contextlib import closing
+import logging as logger
+import os
+import os.path
+import re
+
+# third party related imports
+import ujson
+
+# local library imports
+from PDFPage import PDFPage
+from util import atomic_write
+
+
+class PDFCheckpoint(object):
+    """Finished pages of a pdf kept on disk
+
+    PDFCheckpoint stores every finished page in a directory, one JSON
+    file per page, so that an interrupted run can be resumed by only
+    rendering the missing pages. The directory also records which pdf
+    the pages belong to and how they are extracted; pages of anything
+    else are discarded.
+
+    Attributes:
+        dirname: A string indicating the absolute path of the checkpoint
+            directory.
+        abs_filename: A string indicating the absolute path of the pdf.
+        scale: The scale at which pages are rendered.
+        text_only: Whether pages are rendered without painting.
+
+    """
+
+    MANIFEST_FILENAME = 'manifest.json'
+    PAGE_FILENAME = 'page-%05d.json'
+    RE_PAGE_FILENAME = re.compile(r'^page-(\d+)\.json$')
+
+    def __init__(self, dirname, filename, scale=1, text_only=False):
+
+        self.dirname = os.path.abspath(dirname)
+        self.abs_filename = os.path.abspath(filename)
+        self.scale = scale
+        self.text_only = text_only
+
+        if not os.path.isdir(self.dirname):
+            os.makedirs(self.dirname)
+
+        manifest = self._get_manifest()
+        if self._read_manifest() != manifest:
+            self.clear()
+            atomic_write(os.path.join(self.dirname, self.MANIFEST_FILENAME),
+                         ujson.dumps(manifest))
+
+    def _get_manifest(self):
+        """Describe the pdf and how the pages are extracted."""
+
+        stat = os.stat(self.abs_filename)
+
+        return {
+                'file': self.abs_filename,
+                'size': stat.st_size,
+                'mtime': int(stat.st_mtime),
+                'scale': float(self.scale),
+                'text_only': bool(self.text_only),
+        }
+
+    def _read_manifest(self):
+        """Read the stored manifest, or None if there is none."""
+
+        filename = os.path.join(self.dirname, self.MANIFEST_FILENAME)
+        try:
+            with closing(open(filename, 'rb')) as f:
+                return ujson.loads(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def _iter_page_files(self):
+        """Yield (page_ix, filename) of the stored pages."""
+
+        for basename in os.listdir(self.dirname):
+            match_obj = self.RE_PAGE_FILENAME.match(basename)
+            if match_obj is None:
+                continue
+
+            yield int(match_obj.group(1)), os.path.join(self.dirname,
+                                                        basename)
+
+    def clear(self):
+        """Remove the stored pages."""
+
+        for basename in os.listdir(self.dirname):
+            if self.RE_PAGE_FILENAME.match(basename) or \
+               basename == self.MANIFEST_FILENAME or \
+               basename.endswith('.tmp'):
+                os.unlink(os.path.join(self.dirname, basename))
+
+    def save_page(self, page_ix, page_obj):
+        """Store a finished page.
+
+        Args:
+            page_ix: The index of the pdf page. (Start from 0)
+            page_obj: An instance of PDFPage. None is not stored, so
+                that the page is tried again on resume.
+
+        """
+
+        if page_obj is None:
+            return
+
+        filename = os.path.join(self.dirname, self.PAGE_FILENAME % page_ix)
+        atomic_write(filename, page_obj.serialize())
+
+    def load_pages(self):
+        """Read the stored pages.
+
+        Returns:
+            A dict mapping page index to PDFPage.
+
+        """
+
+        ret = {}
+        for page_ix, filename in self._iter_page_files():
+            try:
+                with closing(open(filename, 'rb')) as f:
+                    ret[page_ix] = PDFPage.create_by_json(f.read())
+            except (IOError, ValueError), e:
+                logger.warning('Ignore checkpoint %s: %s', filename, e)
+
+        return ret
+
+    def restore(self, pdf_doc, pages=None):
+        """Add the stored pages to a PDFDocument.
+
+        Args:
+            pdf_doc: An instance of PDFDocument.
+            pages: A list of the wanted page indices, or None for all
+                the stored pages.
+
+        Returns:
+            A set of the restored page indices.
+
+        """
+
+        stored = self.load_pages()
+        if pages is not None:
+            stored = dict((page_ix, stored[page_ix])
+                          for page_ix in pages if page_ix in stored)
+
+        for page_ix in sorted(stored):
+            pdf_doc.add_page(page_ix, stored[page_ix])
+
+        if stored:
+            logger.info('Restore %s pages from %s', len(stored), self.dirname)
+
+        return set(stored)
@@ -1,33 +1,71 @@
 #!/usr/bin/env python
 
 # standard library imports
+from contextlib import closing
+import copy
+import logging as logger
 import os.path
 import re
-import subprocess
+from StringIO import StringIO
+import struct
 import time
 
 # third party related imports
 import ujson
 
 # local library imports
+from PDFPageTree import PDFPageTree, PDFPageTreeError
+from util import check_output
 
 
 class PDFDocument(object):
     """PDF meatadata
 
+    The number of pages and the page boxes are read by PDFPageTree in
+    process, or by pdfinfo if it can't parse the pdf.
+
     Attributes:
         num_pages: An integer indicating total pages in the pdf.
         filename: A string indicating the specified pdf path.
+        page_boxes: A list of the boxes of every page.
+        extraction: None, or a dict of how the pages are extracted, see
+            get_extraction(). Pages of another extraction aren't carried
+            over.
 
     """
 
+    # Whether to read the page tree in process before trying pdfinfo
+    USE_PAGE_TREE = True
+
     RE_PAGES = re.compile(r'Pages:\s*(\d+)')
+    RE_PAGE_BOX = re.compile(r'^Page\s+(\d+)\s+(\w+)Box:\s+(.*)$', re.M)
+    BOX_NAMES = {
+            'Media': 'media',
+            'Crop': 'crop',
+            'Bleed': 'bleed',
+            'Trim': 'trim',
+            'Art': 'art',
+    }
+
+    # The binary format, see serialize_binary()
+    BINARY_MAGIC = 'PDFD'
+    BINARY_VERSION = 2
+    BINARY_HEADER = struct.Struct('<4sHHQIIH')
+    BINARY_OFFSET = struct.Struct('<IQI')
+    # Since version 2, the length and the JSON of extraction follow the
+    # basename.
+    BINARY_HAS_EXTRACTION = 1
+    BINARY_EXTRACTION_LENGTH = struct.Struct('<H')
 
     def __init__(self, filename):
 
         self.__num_pages = None
+        self.__page_boxes = None
+        self.__page_tree = None
+        self.__fingerprints = None
         self.__filename = os.path.abspath(filename)
         self.__pages = []
+        self.extraction = None
 
     @property
     def num_pages(self):
@@ -36,7 +74,12 @@ class PDFDocument(object):
         if self.__num_pages is not None:
             return self.__num_pages
 
-        pdfinfo = subprocess.check_output(['pdfinfo', self.__filename])
+        pages = self._read_page_tree()
+        if pages is not None:
+            self.__num_pages = len(pages)
+            return self.__num_pages
+
+        pdfinfo = check_output(['pdfinfo', self.__filename])
 
         match_obj = self.RE_PAGES.search(pdfinfo)
         if match_obj is None:
@@ -46,6 +89,191 @@ class PDFDocument(object):
 
         return self.__num_pages
 
+    @property
+    def page_boxes(self):
+        """Media box, crop box, bleed box, trim box and art box of every
+        page.
+
+        All pages are read at once, by PDFPageTree or a single pdfinfo
+        call, and cached for the life of the document.
+
+        Returns:
+            A list indexed by page index (start from 0). Each item is a
+            dict from 'media', 'crop', 'bleed', 'trim' and 'art' to
+            [x0, y0, x1, y1] lists.
+
+        """
+
+        if self.__page_boxes is not None:
+            return self.__page_boxes
+
+        pages = self._read_page_tree()
+        if pages is not None:
+            self.__page_boxes = [
+                    dict((name, page[name])
+                         for name in self.BOX_NAMES.itervalues())
+                    for page in pages]
+            return self.__page_boxes
+
+        pdfinfo = check_output(['pdfinfo', '-box',
+                                '-f', '1',
+                                '-l', str(self.num_pages),
+                                self.__filename])
+        self.__page_boxes = self.parse_page_boxes(pdfinfo, self.num_pages)
+
+        return self.__page_boxes
+
+    def _read_page_tree(self):
+        """Read the pages by PDFPageTree.
+
+        Pages aren't fingerprinted here, which hashes their content, so
+        that num_pages and page_boxes stay cheap.
+
+        Returns:
+            PDFPageTree.pages, or None if the pdf can't be parsed or
+            USE_PAGE_TREE is off.
+
+        """
+
+        if not self.USE_PAGE_TREE:
+            return None
+
+        if self.__page_tree is None:
+            try:
+                with closing(PDFPageTree(self.__filename)) as page_tree:
+                    self.__page_tree = page_tree.pages
+            except PDFPageTreeError, e:
+                logger.info('Fall back to pdfinfo: %s', e)
+                self.__page_tree = False
+                # don't parse the pdf again for fingerprints
+                self.__fingerprints = False
+
+        if self.__page_tree is False:
+            return None
+
+        return self.__page_tree
+
+    @property
+    def fingerprints(self):
+        """Fingerprints of every page by PDFPageTree.fingerprints.
+
+        They are computed on first access only, since they hash the
+        content of every page.
+
+        Returns:
+            A list of hex digests indexed by page index, or None if the
+            pdf can't be parsed, in which case no page is known to be
+            unchanged.
+
+        """
+
+        if self.__fingerprints is None:
+            try:
+                with closing(PDFPageTree(self.__filename)) as page_tree:
+                    self.__fingerprints = page_tree.fingerprints
+            except PDFPageTreeError, e:
+                logger.warning("Can't fingerprint pages: %s", e)
+                self.__fingerprints = False
+
+        if self.__fingerprints is False:
+            return None
+
+        return self.__fingerprints
+
+    def get_fingerprint(self, page_ix):
+        """The fingerprint of a page, or None if it is unknown."""
+
+        fingerprints = self.fingerprints
+        if fingerprints is None or not 0 <= page_ix < len(fingerprints):
+            return None
+
+        return fingerprints[page_ix]
+
+    @classmethod
+    def get_extraction(cls, backend, scale=1, layout=False):
+        """Describe how pages are extracted, for extraction.
+
+        Args:
+            backend: 'pdfjs' or 'xpdf'.
+            scale: The scale pages are rendered at.
+            layout: Whether pages have layout.
+
+        """
+
+        return {'backend': backend, 'scale': float(scale),
+                'layout': bool(layout)}
+
+    def carry_over(self, previous, pages=None):
+        """Add the unchanged pages of a previous extraction.
+
+        A page of previous is unchanged if it has the fingerprint of a
+        page of this pdf, wherever the page is, so that pages moved by
+        inserted or removed pages are carried over as well. Pages of
+        the same fingerprint, e.g. blank pages, get copies of one
+        previous page. Only the other pages need to be extracted again.
+        Carried pages are renumbered in place rather than copied.
+
+        Nothing is carried over if previous has another extraction, e.g.
+        another scale or backend, since its pages don't match the ones
+        extracted now.
+
+        Args:
+            previous: A PDFDocument extracted from an earlier version of
+                the pdf, usually a LazyPDFDocument.
+            pages: A list of the wanted page indices, or None for all.
+
+        Returns:
+            A set of the carried page indices.
+
+        """
+
+        if previous.extraction != self.extraction:
+            logger.warning('Carry over no page of another extraction: '
+                           '%s, not %s', previous.extraction,
+                           self.extraction)
+            return set()
+
+        fingerprints = self.fingerprints
+        if fingerprints is None:
+            return set()
+
+        wanted = {}
+        for page_ix in (xrange(len(fingerprints)) if pages is None
+                        else pages):
+            if 0 <= page_ix < len(fingerprints):
+                wanted.setdefault(fingerprints[page_ix], []).append(page_ix)
+
+        ret = set()
+        for page_obj in previous.pages:
+            if page_obj is None or page_obj.fingerprint not in wanted:
+                continue
+
+            for ix, page_ix in enumerate(wanted.pop(page_obj.fingerprint)):
+                if ix > 0:
+                    page_obj = copy.deepcopy(page_obj)
+                page_obj.page_num = page_ix + 1
+                self.add_page(page_ix, page_obj)
+                ret.add(page_ix)
+
+        logger.info('Carry over %s pages', len(ret))
+
+        return ret
+
+    @classmethod
+    def parse_page_boxes(cls, pdfinfo, num_pages):
+        """Parse the output of pdfinfo -box -f 1 -l num_pages."""
+
+        ret = [{} for _ in xrange(num_pages)]
+        for match_obj in cls.RE_PAGE_BOX.finditer(pdfinfo):
+            page_ix = int(match_obj.group(1)) - 1
+            name = cls.BOX_NAMES.get(match_obj.group(2))
+            if name is None or not 0 <= page_ix < num_pages:
+                continue
+
+            ret[page_ix][name] = map(float, match_obj.group(3).split()[:4])
+
+        return ret
+
     @property
     def filename(self):
         """Absolute path of pdf."""
@@ -75,18 +303,203 @@ class PDFDocument(object):
 
         return self.__pages
 
-    def __json__(self):
+    def get_json_header(self):
+        """The document part of __json__(), i.e. all but the pages."""
 
-        return {
+        ret = {
                 'version': int(time.time()),
                 'file': os.path.basename(self.__filename),
                 'page': self.num_pages,
-                'data': map(lambda p: p.__json__(),
-                            filter(lambda p: p is not None, self.__pages)),
         }
+        if self.extraction is not None:
+            ret['extraction'] = self.extraction
+
+        return ret
+
+    def __json__(self):
+
+        ret = self.get_json_header()
+        ret['data'] = map(lambda p: p.__json__(),
+                          filter(lambda p: p is not None, self.pages))
+
+        return ret
 
     def serialize(self):
         """Serialize to JSON"""
 
         return ujson.dumps(self.__json__(), ensure_ascii=False)
 
+    def serialize_binary(self):
+        """Serialize to the binary format.
+
+        A little-endian header of magic, version, flags, timestamp,
+        number of pages, number of page records and length of the
+        basename is followed by the UTF-8 basename, then the uint16
+        length and the JSON of extraction if any, then a table of
+        (page index, offset, length) of every page record, and then the
+        records, each of which is a PDFPage.serialize_binary(). Offsets
+        count from the start of the document, so that a page can be read
+        without reading the others.
+
+        """
+
+        basename = os.path.basename(self.__filename)
+        if isinstance(basename, unicode):
+            basename = basename.encode('utf8')
+
+        flags = 0
+        extraction = ''
+        if self.extraction is not None:
+            flags |= self.BINARY_HAS_EXTRACTION
+            extraction = ujson.dumps(self.extraction)
+            extraction = self.BINARY_EXTRACTION_LENGTH.pack(
+                    len(extraction)) + extraction
+
+        records = [(page_ix, page_obj.serialize_binary())
+                   for page_ix, page_obj in enumerate(self.pages)
+                   if page_obj is not None]
+
+        header = self.BINARY_HEADER.pack(self.BINARY_MAGIC,
+                                         self.BINARY_VERSION, flags,
+                                         int(time.time()), self.num_pages,
+                                         len(records), len(basename))
+
+        offset = (len(header) + len(basename) + len(extraction) +
+                  self.BINARY_OFFSET.size * len(records))
+        table = []
+        for page_ix, record in records:
+            table.append(self.BINARY_OFFSET.pack(page_ix, offset,
+                                                 len(record)))
+            offset += len(record)
+
+        return ''.join([header, basename, extraction] + table +
+                       [record for page_ix, record in records])
+
+    @classmethod
+    def read_binary_index(cls, f):
+        """Read the header and the page table of the binary format.
+
+        Only the start of f is read, so that pages can be read from it
+        afterwards one by one.
+
+        Args:
+            f: A file object at the start of serialize_binary() output.
+
+        Returns:
+            A (header, entries) tuple. header is in the format of
+            get_json_header(), and entries is a list of (page index,
+            offset, length) of the page records.
+
+        Raises:
+            ValueError: f isn't a document in a known version.
+
+        """
+
+        data = f.read(cls.BINARY_HEADER.size)
+        if len(data) < cls.BINARY_HEADER.size:
+            raise ValueError('Truncated PDFDocument')
+
+        (magic, version, flags, timestamp, num_pages, num_records,
+         basename_len) = cls.BINARY_HEADER.unpack(data)
+        if magic != cls.BINARY_MAGIC:
+            raise ValueError('Not a binary PDFDocument')
+        if version > cls.BINARY_VERSION:
+            raise ValueError('Unsupported PDFDocument version %s' % version)
+
+        basename = f.read(basename_len).decode('utf8')
+        extraction = None
+        if flags & cls.BINARY_HAS_EXTRACTION:
+            data = f.read(cls.BINARY_EXTRACTION_LENGTH.size)
+            if len(data) < cls.BINARY_EXTRACTION_LENGTH.size:
+                raise ValueError('Truncated PDFDocument')
+            length, = cls.BINARY_EXTRACTION_LENGTH.unpack(data)
+            extraction = ujson.loads(f.read(length))
+
+        table = f.read(cls.BINARY_OFFSET.size * num_records)
+        if len(table) < cls.BINARY_OFFSET.size * num_records:
+            raise ValueError('Truncated PDFDocument')
+
+        header = {
+                'version': timestamp,
+                'file': basename,
+                'page': num_pages,
+        }
+        if extraction is not None:
+            header['extraction'] = extraction
+        entries = [cls.BINARY_OFFSET.unpack_from(table, offset)
+                   for offset in xrange(0, len(table),
+                                        cls.BINARY_OFFSET.size)]
+
+        return header, entries
+
+    @classmethod
+    def create_by_binary(cls, data, filename=None):
+        """Deserialize what serialize_binary() outputs to PDFDocument.
+
+        Args:
+            data: A string of bytes.
+            filename: The path of the pdf. Default is the stored
+                basename.
+
+        Raises:
+            ValueError: data isn't a document in a known version.
+
+        """
+
+        # PDFPage imports PDFDocument
+        from PDFPage import PDFPage
+
+        header, entries = cls.read_binary_index(StringIO(data))
+
+        ret = PDFDocument(header['file'] if filename is None else filename)
+        ret.__num_pages = header['page']
+        ret.extraction = header.get('extraction')
+
+        for page_ix, offset, length in entries:
+            if offset + length > len(data):
+                raise ValueError('Truncated PDFDocument')
+
+            ret.add_page(page_ix, PDFPage.create_by_binary(data, offset))
+
+        return ret
+
+    @classmethod
+    def create_by_json(cls, serialized=None, deserialized=None,
+                       filename=None):
+        """Deserialize what serialize() outputs to PDFDocument.
+
+        A page is added at the index of its page number minus 1.
+
+        Args:
+            serialized: A JSON string.
+            deserialized: The loaded JSON instead of serialized.
+            filename: The path of the pdf. Default is the stored
+                basename.
+
+        """
+
+        # PDFPage imports PDFDocument
+        from PDFPage import PDFPage
+
+        if deserialized is None:
+            deserialized = ujson.loads(serialized)
+
+        ret = PDFDocument(deserialized.get('file', u'')
+                          if filename is None else filename)
+        ret.__num_pages = deserialized.get('page')
+        ret.extraction = deserialized.get('extraction')
+
+        for page in deserialized.get('data') or []:
+            page_obj = PDFPage.create_by_json(deserialized=page)
+            ret.add_page(max(page_obj.page_num - 1, 0), page_obj)
+
+        return ret
+
+    @classmethod
+    def deserialize(cls, serialized, filename=None):
+        """Deserialize either JSON or the binary format to PDFDocument."""
+
+        if serialized.startswith(cls.BINARY_MAGIC):
+            return cls.create_by_binary(serialized, filename)
+
+        return cls.create_by_json(serialized, filename=filename)
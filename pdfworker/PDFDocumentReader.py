@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# standard library imports
+
+# third party related imports
+import ujson
+
+# local library imports
+from PDFDocument import PDFDocument
+from PDFPage import PDFPage
+
+
+class PDFDocumentReader(object):
+    """Read what PDFDocumentWriter writes page by page
+
+    Attributes:
+        f: The file object read from.
+        header: The header dict of the document, in the format of
+            PDFDocument.get_json_header().
+
+    """
+
+    def __init__(self, f):
+        """Read the header.
+
+        Args:
+            f: A file object opened for reading.
+
+        Raises:
+            ValueError: f doesn't start with a header.
+
+        """
+
+        self.f = f
+
+        line = f.readline()
+        if not line.strip():
+            raise ValueError('Missing NDJSON document header')
+
+        self.header = ujson.loads(line)
+        if 'file' not in self.header or 'data' in self.header:
+            raise ValueError('Not an NDJSON document header')
+
+    def __iter__(self):
+        """Yield (page_ix, PDFPage) of every page in the written order.
+
+        Raises:
+            ValueError: a line isn't a page, e.g. a truncated last line.
+
+        """
+
+        for line in self.f:
+            if not line.strip():
+                continue
+
+            record = ujson.loads(line)
+            page_ix = record.pop('index', None)
+            if page_ix is None:
+                raise ValueError('Page record without index')
+
+            yield page_ix, PDFPage.create_by_json(deserialized=record)
+
+    def read(self, filename=None):
+        """Read all pages into a PDFDocument.
+
+        Args:
+            filename: The path of the pdf. Default is the stored
+                basename.
+
+        """
+
+        ret = PDFDocument.create_by_json(deserialized=self.header,
+                                         filename=filename)
+        for page_ix, page_obj in self:
+            ret.add_page(page_ix, page_obj)
+
+        return ret
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+# standard library imports
+
+# third party related imports
+import ujson
+
+# local library imports
+from util import atomic_write
+
+
+class PDFDocumentWriter(object):
+    """Write a document as NDJSON page by page
+
+    The first line is the header of the document, i.e.
+    PDFDocument.get_json_header(), and every following line is the
+    __json__() of a page with its index in the 'index' key. Nothing but
+    the current page is serialized at a time, so that memory use doesn't
+    grow with the number of pages. PDFDocumentReader reads it back.
+
+    The offset and length of every page line are recorded, so that
+    write_index() can store them next to the document for
+    LazyPDFDocument to seek to a page.
+
+    Attributes:
+        f: The file object written to.
+        written: A set of the indices of the written pages.
+        offsets: A dict mapping the index of a written page to the
+            (offset, length) of its line, counted from where writing
+            started.
+
+    """
+
+    # The extension appended to the document filename for its index
+    INDEX_EXT = '.idx'
+    INDEX_VERSION = 1
+
+    def __init__(self, f, pdf_doc):
+        """Write the header.
+
+        Args:
+            f: A file object opened for writing.
+            pdf_doc: The PDFDocument the pages belong to.
+
+        """
+
+        self.f = f
+        self.written = set()
+        self.offsets = {}
+        self._size = 0
+
+        self._write_line(pdf_doc.get_json_header())
+
+    def _write_line(self, obj):
+        """Write obj as a line and return the offset of the line."""
+
+        line = ujson.dumps(obj, ensure_ascii=False)
+        if isinstance(line, unicode):
+            line = line.encode('utf8')
+
+        offset = self._size
+        self.f.write(line)
+        self.f.write('\n')
+        self._size += len(line) + 1
+
+        return offset
+
+    def write_page(self, page_obj, page_ix=None):
+        """Write a page.
+
+        Args:
+            page_obj: An instance of PDFPage. None is not written.
+            page_ix: The index of the page. (Start from 0) Default is
+                the page number minus 1.
+
+        """
+
+        if page_obj is None:
+            return
+
+        if page_ix is None:
+            page_ix = max(page_obj.page_num - 1, 0)
+
+        record = page_obj.__json__()
+        record['index'] = page_ix
+        offset = self._write_line(record)
+        self.offsets[page_ix] = (offset, self._size - offset)
+        self.written.add(page_ix)
+
+    def write_document(self, pdf_doc):
+        """Write the pages of a PDFDocument which aren't written yet."""
+
+        for page_ix, page_obj in enumerate(pdf_doc.pages):
+            if page_ix not in self.written:
+                self.write_page(page_obj, page_ix)
+
+    def get_index(self):
+        """The index of the written pages.
+
+        Returns:
+            A dict of the index version, the size of the document and
+            the [page index, offset, length] of every page sorted by
+            page index.
+
+        """
+
+        return {
+                'version': self.INDEX_VERSION,
+                'size': self._size,
+                'pages': [[page_ix, offset, length] for page_ix,
+                          (offset, length) in sorted(self.offsets.items())],
+        }
+
+    def write_index(self, filename):
+        """Store get_index() in filename, usually the document filename
+        plus INDEX_EXT.
+
+        """
+
+        atomic_write(filename, ujson.dumps(self.get_index()))
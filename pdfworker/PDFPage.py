@@ -2,19 +2,37 @@
 
 # standard library imports
 from contextlib import closing
+import copy
+import itertools
 import logging as logger
+import math
+import multiprocessing
 import os
 import os.path
 import re
+import struct
 import time
-import subprocess
 import sys
 
 # third party related imports
+from lxml import etree
 from pyquery import PyQuery
 import ujson
 
 # local library imports
+from ExtractionCache import ExtractionCache
+from PDFDocument import PDFDocument
+from TextBlocks import TextBlocks
+from util import coalesce_ranges, open_output, split_ranges
+
+
+def _extract_xpdf_chunk(args):
+    """Extract a range of pages in a worker process."""
+
+    filename, first, last, boxes, layout = args
+
+    return list(PDFPage._iter_xpdf_range(filename, first, last, boxes,
+                                         layout))
 
 
 class PDFPage(object):
@@ -24,18 +42,93 @@ class PDFPage(object):
         page_num: An integer indicating the current page number
         width: The width of the page
         height: The height of the page
-        data: A JSON.
+        data: A list of block dicts of the words on the page, or None.
+        blocks: The same blocks as a TextBlocks, or None.
+        layout: None, or the flows of the page found by pdftotext
+            -bbox-layout. A flow is a list of blocks, and a block is a
+            dict with x, y, w, h and lines. A line is a dict with x, y,
+            w, h and words, where words is the [start, end) range of
+            its words in data.
+        fingerprint: None, or the SHA-1 hex digest of the pdf page by
+            PDFPageTree.fingerprints, which tells whether the page
+            changes in another version of the pdf.
 
     """
 
+    # Levels of text boxes, see get_text_boxes()
+    LEVELS = ('word', 'line', 'block')
+
     RE_TRANSFORM = re.compile(r'scale\(([-+]?[0-9]*\.?[0-9]+), ([-+]?[0-9]*\.?[0-9]+)\)')
+    # Every xpdf job gets about this number of page chunks, so that a
+    # slow chunk doesn't hold the whole document.
+    XPDF_CHUNKS_PER_JOB = 4
+
+    # The binary format, see serialize_binary()
+    BINARY_MAGIC = 'PDFP'
+    BINARY_VERSION = 2
+    BINARY_HEADER = struct.Struct('<4sHHIddII')
+    BINARY_HAS_DATA = 1
+    BINARY_HAS_SCALE = 2
+    BINARY_HAS_LAYOUT = 4
+    # Since version 2, the raw SHA-1 follows the header.
+    BINARY_HAS_FINGERPRINT = 8
+    BINARY_FINGERPRINT_SIZE = 20
 
     def __init__(self):
 
         self.page_num = 0
         self.width = 0
         self.height = 0
-        self.data = None
+        self._data = None
+        self._blocks = None
+        self.layout = None
+        self.fingerprint = None
+
+    @property
+    def data(self):
+        """The blocks as a list of dicts, or None.
+
+        The list is kept and may be changed in place. Pages are
+        extracted and stored by columns, which are converted to the list
+        on first access here.
+
+        """
+
+        if self._data is None and self._blocks is not None:
+            self._data = self._blocks.to_dicts()
+            self._blocks = None
+
+        return self._data
+
+    @data.setter
+    def data(self, value):
+
+        if isinstance(value, TextBlocks):
+            self.blocks = value
+        else:
+            self._data = value
+            self._blocks = None
+
+    @property
+    def blocks(self):
+        """The blocks as a TextBlocks, or None.
+
+        Once data is accessed, or if blocks have keys TextBlocks doesn't
+        store, the list is what the page keeps, and a new TextBlocks is
+        created from it here every time, see TextBlocks.create().
+
+        """
+
+        if self._data is not None:
+            return TextBlocks.create(self._data)
+
+        return self._blocks
+
+    @blocks.setter
+    def blocks(self, value):
+
+        self._blocks = value
+        self._data = None
 
     @classmethod
     def create_by_pdfjs(cls, page_num, width, height, dom_text):
@@ -76,34 +169,181 @@ class PDFPage(object):
             }
 
             # out of bounding box text are removed
-            if  block['x'] + block['w'] <= 0 or block['x'] >= ret.width or \
-                block['y'] + block['h'] <= 0 or block['y'] >= ret.height:
-                    continue
+            if not ret._is_in_bounds(block):
+                continue
 
             ret.data.append(block)
 
         return ret
 
+    @classmethod
+    def create_by_text_layer(cls, page_num, width, height, blocks):
+        """Create a PDFPage by the text layer read from pdfjs viewer.
+
+        Args:
+            page_num: An integer indicating the page number.
+            width: The width of the page canvas.
+            height: The height of the page canvas.
+            blocks: A list of [left, top, font-size, data-canvas-width,
+                scale-x, scale-y, text] lists, one for each text div.
+
+        """
+
+        ret = PDFPage()
+        ret.page_num = page_num
+        ret.width = width
+        ret.height = height
+
+        if len(blocks) == 0:
+            ret.blocks = TextBlocks()
+            return ret
+
+        x, y, h, w, sx, sy, t = zip(*blocks)
+        data = TextBlocks.create_by_columns(x, y, w, h, t, sx, sy)
+
+        # out of bounding box text are removed
+        ret.blocks = data.filter_in_bounds(width, height)
+
+        return ret
+
+    def _is_in_bounds(self, block):
+        """Test whether a text block overlaps this page."""
+
+        return block['x'] + block['w'] > 0 and block['x'] < self.width and \
+               block['y'] + block['h'] > 0 and block['y'] < self.height
+
     def __json__(self):
 
-        return {
+        ret = {
                 'page': self.page_num,
                 'width': self.width,
                 'height': self.height,
-                'data': self.data
+                'data': self._data if self._blocks is None else
+                        self._blocks.to_dicts()
         }
 
+        if self.layout is not None:
+            ret['layout'] = self.layout
+
+        if self.fingerprint is not None:
+            ret['fingerprint'] = self.fingerprint
+
+        return ret
+
+    def _iter_layout_boxes(self):
+        """Yield the block and line dicts of layout."""
+
+        for flow in self.layout or ():
+            for block in flow:
+                yield block
+                for line in block['lines']:
+                    yield line
+
+    def get_text_boxes(self, level='word'):
+        """Get text boxes at a level of the layout.
+
+        Args:
+            level: 'word' for data, or 'line' or 'block' to group the
+                words by layout. Texts of a group are joined by spaces.
+
+        Returns:
+            A list of dicts with x, y, w, h and t, in reading order.
+
+        Raises:
+            ValueError: Unknown level, or the page has no layout.
+
+        """
+
+        if level not in self.LEVELS:
+            raise ValueError('Unknown level %s' % level)
+        if level == 'word':
+            return self.data
+        if self.layout is None:
+            raise ValueError('Page %s has no layout' % self.page_num)
+
+        def _text_box(box, texts):
+            return {'x': box['x'], 'y': box['y'],
+                    'w': box['w'], 'h': box['h'],
+                    't': u' '.join(texts)}
+
+        blocks = self.blocks
+
+        def _line_texts(line):
+            start, end = line['words']
+            return [blocks.get_text(ix) or u'' for ix in xrange(start, end)]
+
+        ret = []
+        for flow in self.layout:
+            for block in flow:
+                if level == 'block':
+                    texts = [u' '.join(_line_texts(line))
+                             for line in block['lines']]
+                    ret.append(_text_box(block, texts))
+                    continue
+
+                for line in block['lines']:
+                    ret.append(_text_box(line, _line_texts(line)))
+
+        return ret
+
     def serialize(self):
         """Serialize to JSON"""
 
         return ujson.dumps(self.__json__(), ensure_ascii=False)
 
+    def serialize_binary(self):
+        """Serialize to the binary format.
+
+        A little-endian header of magic, version, flags, page number,
+        width, height, number of blocks and length of layout is followed
+        by the raw SHA-1 fingerprint if any, the packed TextBlocks and
+        the layout in UTF-8 JSON. Block
+        geometry is packed as float32, which is far more precise than
+        pdf coordinates need.
+
+        """
+
+        flags = 0
+        num_blocks = 0
+        data = ''
+        blocks = self.blocks
+        if blocks is not None:
+            flags |= self.BINARY_HAS_DATA
+            if blocks.has_scale:
+                flags |= self.BINARY_HAS_SCALE
+            num_blocks = len(blocks)
+            data = blocks.to_binary()
+
+        fingerprint = ''
+        if self.fingerprint is not None:
+            flags |= self.BINARY_HAS_FINGERPRINT
+            fingerprint = self.fingerprint.decode('hex')
+
+        layout = ''
+        if self.layout is not None:
+            flags |= self.BINARY_HAS_LAYOUT
+            layout = ujson.dumps(self.layout, ensure_ascii=False)
+            if isinstance(layout, unicode):
+                layout = layout.encode('utf8')
+
+        header = self.BINARY_HEADER.pack(self.BINARY_MAGIC,
+                                         self.BINARY_VERSION, flags,
+                                         self.page_num, self.width,
+                                         self.height, num_blocks,
+                                         len(layout))
+
+        return ''.join((header, fingerprint, data, layout))
+
     def scale(self, scale_x=1, scale_y=1):
         """Scale page."""
 
         self.width *= scale_x
         self.height *= scale_y
-        for bbox in self.data:
+        if self._blocks is not None:
+            self._blocks.scale(scale_x, scale_y)
+
+        for bbox in itertools.chain(self._data or (),
+                                    self._iter_layout_boxes()):
             for attr in ('x', 'w', 'sx'):
                 if attr in bbox:
                     bbox[attr] *= scale_x
@@ -123,49 +363,325 @@ class PDFPage(object):
         ret.page_num = deserialized.get('page', 0)
         ret.width = deserialized.get('width', 0)
         ret.height = deserialized.get('height', 0)
-        ret.data = deserialized.get('data')
+        data = deserialized.get('data')
+        if data is not None and \
+           all(TextBlocks.KEYS.issuperset(block) for block in data):
+            ret.blocks = TextBlocks.create(data)
+        else:
+            # TextBlocks would drop the other keys
+            ret.data = data
+        ret.layout = deserialized.get('layout')
+        ret.fingerprint = deserialized.get('fingerprint')
 
         return ret
 
     @classmethod
-    def create_by_xpdf(cls, filename, pages=None):
-        """Create a bunch of PDFPages by xpdf utility program pdftotext."""
-
-        def _parse_bbox_html(html):
-
-            with closing(open(html, 'rb')) as f:
-                data = f.read().decode('utf8')
-                start = data.find('<doc>')
-                end = data.find('</doc>') + 6
-
-            pages = []
-
-            jq = PyQuery(data[start:end])
-            page_elements = jq('page')
-            for i, pg in enumerate(page_elements):
-                page_obj = {
-                    'width': float(pg.attrib['width']),
-                    'height': float(pg.attrib['height']),
-                    'page': i + 1,
-                    'data': [],
-                }
-
-                word_elements = pg.findall('word')
-                for word in word_elements:
-                    word_attr = word.attrib
-                    min_x = float(word_attr.get('xMin') or word_attr['xmin'])
-                    max_x = float(word_attr.get('xMax') or word_attr['xmax'])
-                    min_y = float(word_attr.get('yMin') or word_attr['ymin'])
-                    max_y = float(word_attr.get('yMax') or word_attr['ymax'])
-                    page_obj['data'].append({
-                        'x': min_x, 'y': min_y,
-                        'w': max_x - min_x, 'h': max_y - min_y,
-                        't': word.text,
-                    })
-
-                pages.append(page_obj)
-
-            return pages
+    def create_by_binary(cls, data, offset=0):
+        """Deserialize what serialize_binary() outputs to PDFPage.
+
+        Args:
+            data: A string of bytes.
+            offset: Where the page starts in data.
+
+        Raises:
+            ValueError: data isn't a page in a known version.
+
+        """
+
+        header_end = offset + cls.BINARY_HEADER.size
+        if header_end > len(data):
+            raise ValueError('Truncated PDFPage')
+
+        (magic, version, flags, page_num, width, height, num_blocks,
+         layout_len) = cls.BINARY_HEADER.unpack(data[offset:header_end])
+        if magic != cls.BINARY_MAGIC:
+            raise ValueError('Not a binary PDFPage')
+        if version > cls.BINARY_VERSION:
+            raise ValueError('Unsupported PDFPage version %s' % version)
+
+        ret = PDFPage()
+        ret.page_num = page_num
+        ret.width = width
+        ret.height = height
+
+        offset = header_end
+        if flags & cls.BINARY_HAS_FINGERPRINT:
+            end = offset + cls.BINARY_FINGERPRINT_SIZE
+            if end > len(data):
+                raise ValueError('Truncated PDFPage')
+            ret.fingerprint = data[offset:end].encode('hex')
+            offset = end
+
+        if flags & cls.BINARY_HAS_DATA:
+            ret.blocks, offset = TextBlocks.create_by_binary(
+                    data, offset, num_blocks,
+                    bool(flags & cls.BINARY_HAS_SCALE))
+
+        if flags & cls.BINARY_HAS_LAYOUT:
+            if offset + layout_len > len(data):
+                raise ValueError('Truncated PDFPage')
+            ret.layout = ujson.loads(data[offset:offset + layout_len])
+
+        return ret
+
+    @classmethod
+    def deserialize(cls, serialized):
+        """Deserialize either JSON or the binary format to PDFPage."""
+
+        if serialized.startswith(cls.BINARY_MAGIC):
+            return cls.create_by_binary(serialized)
+
+        return cls.create_by_json(serialized)
+
+    @classmethod
+    def iter_bbox_pages(cls, source, layout=False):
+        """Parse the output of pdftotext -bbox page by page.
+
+        The XHTML is parsed incrementally and every <page> element is
+        freed once it is converted, so that memory use doesn't grow with
+        the number of pages.
+
+        Args:
+            source: A filename or a file object.
+            layout: If True, source is the output of -bbox-layout, whose
+                flows, blocks and lines are kept in the layout key.
+
+        Yields:
+            A dict in the format of create_by_json() for each page,
+            numbered from 1 in the order of the output.
+
+        """
+
+        def _parse_bbox(elem):
+
+            attr = elem.attrib
+            min_x = float(attr.get('xMin') or attr['xmin'])
+            max_x = float(attr.get('xMax') or attr['xmax'])
+            min_y = float(attr.get('yMin') or attr['ymin'])
+            max_y = float(attr.get('yMax') or attr['ymax'])
+
+            return {'x': min_x, 'y': min_y,
+                    'w': max_x - min_x, 'h': max_y - min_y}
+
+        def _parse_words(parent, data):
+
+            for word in parent.iterchildren('{*}word'):
+                word_obj = _parse_bbox(word)
+                word_obj['t'] = word.text
+                data.append(word_obj)
+
+        context = etree.iterparse(source, events=('end',), tag='{*}page',
+                                  no_network=True)
+        for i, (event, pg) in enumerate(context):
+            page_obj = {
+                'width': float(pg.attrib['width']),
+                'height': float(pg.attrib['height']),
+                'page': i + 1,
+                'data': [],
+            }
+
+            if layout:
+                flows = []
+                for flow in pg.iterchildren('{*}flow'):
+                    blocks = []
+                    for block in flow.iterchildren('{*}block'):
+                        block_obj = _parse_bbox(block)
+                        block_obj['lines'] = []
+                        for line in block.iterchildren('{*}line'):
+                            line_obj = _parse_bbox(line)
+                            start = len(page_obj['data'])
+                            _parse_words(line, page_obj['data'])
+                            line_obj['words'] = [start,
+                                                 len(page_obj['data'])]
+                            block_obj['lines'].append(line_obj)
+                        blocks.append(block_obj)
+                    flows.append(blocks)
+                page_obj['layout'] = flows
+            else:
+                _parse_words(pg, page_obj['data'])
+
+            # free this page and the whitespace before it
+            pg.clear()
+            while pg.getprevious() is not None:
+                del pg.getparent()[0]
+
+            yield page_obj
+
+    @classmethod
+    def create_by_xpdf(cls, filename, pages=None, page_boxes=None, jobs=1,
+                       layout=False):
+        """Create a bunch of PDFPages by xpdf utility program pdftotext.
+
+        Args:
+            filename: A string indicating the pdf path.
+            pages: A list of page numbers (start from 1), or None for
+                all pages.
+            page_boxes: The page_boxes of the PDFDocument of filename.
+                They are read by pdfinfo if not given.
+            jobs: An integer. If more than 1, chunks of pages are
+                extracted by this number of processes at the same time.
+            layout: If True, pdftotext -bbox-layout is used, and the
+                flows, blocks and lines it finds are kept in the layout
+                of every page.
+
+        Returns:
+            A list of PDFPages in the order of pages.
+
+        """
+
+        if pages is None:
+            return list(cls.iter_by_xpdf(filename, None, page_boxes, jobs,
+                                         layout))
+
+        page_dict = {}
+        for pdf_page in cls.iter_by_xpdf(filename, pages, page_boxes, jobs,
+                                         layout):
+            page_dict[pdf_page.page_num] = pdf_page
+
+        ret = []
+        returned = set()
+        for p in pages:
+            if p not in page_dict:
+                raise RuntimeError("Can't extract page %s" % p)
+
+            # PDFPage.scale() works in place, so duplicates are copied
+            if p in returned:
+                ret.append(copy.deepcopy(page_dict[p]))
+            else:
+                ret.append(page_dict[p])
+                returned.add(p)
+
+        return ret
+
+    @classmethod
+    def iter_by_xpdf(cls, filename, pages=None, page_boxes=None, jobs=1,
+                     layout=False):
+        """Generate PDFPages by xpdf utility program pdftotext.
+
+        The requested pages are collapsed into runs of consecutive pages,
+        each of which is extracted by one pdftotext call. Its output is
+        read from a pipe, and pages are parsed and yielded one at a time,
+        so nothing is written beside the pdf.
+
+        With several jobs, the runs are split into chunks which are
+        extracted in a process pool, and merged back in order.
+
+        Pages in ExtractionCache are read from it instead, and extracted
+        pages are put in it. Page numbers out of the document are
+        skipped.
+
+        Args:
+            See create_by_xpdf().
+
+        Yields:
+            PDFPages in the ascending order of page number, each page
+            only once.
+
+        """
+
+        cache = ExtractionCache.get_instance()
+        backend = 'xpdf-layout' if layout else 'xpdf'
+
+        if page_boxes is None:
+            page_boxes = PDFDocument(filename).page_boxes
+
+        if pages is None:
+            page_nums = range(1, len(page_boxes) + 1)
+        else:
+            page_nums = sorted(set(pages))
+            invalid = [p for p in page_nums if not 0 < p <= len(page_boxes)]
+            if invalid:
+                logger.warning('Skip pages out of 1-%s: %s', len(page_boxes),
+                               invalid)
+                page_nums = [p for p in page_nums
+                             if 0 < p <= len(page_boxes)]
+
+        cached_nums = []
+        if cache is not None:
+            cached_nums = [p for p in page_nums
+                           if cache.contains(filename, p, backend)]
+
+        cached_set = set(cached_nums)
+        runs = coalesce_ranges(p for p in page_nums if p not in cached_set)
+
+        def _get_cached(p):
+
+            page_data = cache.get(filename, p, backend)
+            if page_data is not None:
+                return PDFPage.create_by_json(deserialized=page_data)
+
+            # evicted meanwhile
+            return list(cls._iter_xpdf_runs(filename, [(p, p)], page_boxes,
+                                             1, layout))[0]
+
+        # cached pages are read when their turn comes
+        ix = 0
+        for pdf_page in cls._iter_xpdf_runs(filename, runs, page_boxes, jobs,
+                                            layout):
+            while ix < len(cached_nums) and \
+                  cached_nums[ix] < pdf_page.page_num:
+                yield _get_cached(cached_nums[ix])
+                ix += 1
+
+            if cache is not None:
+                cache.put(filename, pdf_page.page_num, backend, 1, pdf_page)
+            yield pdf_page
+
+        for p in cached_nums[ix:]:
+            yield _get_cached(p)
+
+    @classmethod
+    def _iter_xpdf_runs(cls, filename, runs, page_boxes, jobs=1,
+                        layout=False):
+        """Extract runs of pages, see iter_by_xpdf().
+
+        Args:
+            runs: A list of (first, last) page number tuples.
+
+        """
+
+        if jobs <= 1:
+            for first, last in runs:
+                boxes = page_boxes[first - 1:last]
+                for pdf_page in cls._iter_xpdf_range(filename, first, last,
+                                                     boxes, layout):
+                    yield pdf_page
+            return
+
+        num_pages = sum(last - first + 1 for first, last in runs)
+        num_chunks = jobs * cls.XPDF_CHUNKS_PER_JOB
+        chunk_size = max(1, int(math.ceil(1. * num_pages / num_chunks)))
+        tasks = [(filename, first, last, page_boxes[first - 1:last], layout)
+                 for first, last in split_ranges(runs, chunk_size)]
+        if len(tasks) == 0:
+            return
+
+        pool = multiprocessing.Pool(min(jobs, len(tasks)))
+        try:
+            # imap keeps the order of chunks
+            for chunk in pool.imap(_extract_xpdf_chunk, tasks):
+                for pdf_page in chunk:
+                    yield pdf_page
+
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    @classmethod
+    def _iter_xpdf_range(cls, filename, first, last, boxes, layout=False):
+        """Extract pages first to last by one pdftotext call.
+
+        Args:
+            filename: A string indicating the pdf path.
+            first: The first page number.
+            last: The last page number.
+            boxes: The page boxes of pages first to last.
+            layout: Whether to use pdftotext -bbox-layout.
+
+        """
 
         def _fit_crop_box(data, media_box, crop_box):
 
@@ -174,65 +690,50 @@ class PDFPage(object):
             for txt_obj in data['data']:
                 txt_obj['x'] -= crop_box[0]
                 txt_obj['y'] -= crop_box[1]
+            for flow in data.get('layout', ()):
+                for block in flow:
+                    for box in [block] + block['lines']:
+                        box['x'] -= crop_box[0]
+                        box['y'] -= crop_box[1]
+
+        bbox_option = '-bbox-layout' if layout else '-bbox'
+        args = ('pdftotext', '-f', str(first), '-l', str(last),
+                bbox_option, filename, '-')
+        with open_output(args) as output:
+            for page_data in cls.iter_bbox_pages(output, layout):
+                box_dict = boxes[page_data['page'] - 1]
+                page_data['page'] += first - 1
 
-        ret = []
-
-        base, ext = os.path.splitext(filename)
-
-        if pages is None:
-            subprocess.check_call(('pdftotext', '-bbox', filename))
-            data = _parse_bbox_html(base + '.html')
-            for ix, page_data in enumerate(data):
-                box_dict = cls.get_page_box(filename, ix + 1,
-                                            media=True, crop=True)
                 _fit_crop_box(page_data, box_dict['media'], box_dict['crop'])
-                ret.append(PDFPage.create_by_json(deserialized=page_data))
-        else:
-            for p in pages:
-                subprocess.check_call(
-                    ('pdftotext', '-f', str(p), '-l', str(p), '-bbox', filename)
-                )
-                data = _parse_bbox_html(base + '.html')
-                box_dict = cls.get_page_box(filename, p,
-                                            media=True, crop=True)
-                _fit_crop_box(data[0], box_dict['media'], box_dict['crop'])
-                pdf_page = PDFPage.create_by_json(deserialized=data[0])
-                pdf_page.page_num = p
-                ret.append(pdf_page)
-
-        os.unlink(base + '.html')
-
-        return ret
+                yield PDFPage.create_by_json(deserialized=page_data)
 
     @classmethod
     def get_page_box(cls, filename, page_num,
                      media=True, crop=False, bleed=False,
-                     trim=False, art=False):
+                     trim=False, art=False, page_boxes=None):
         """
         Get media box, crop box, bleed box, trim box, art box
         information of the specified PDF page.
 
+        The boxes come from PDFDocument.page_boxes, which reads all
+        pages at once. Pass page_boxes when asking for several pages, so
+        that the pdf is only parsed once.
+
         """
 
-        ret = {}
-
-        pdf_info = subprocess.check_output(('pdfinfo', '-box',
-                                            '-f', str(page_num),
-                                            '-l', str(page_num),
-                                            filename))
-        for line in pdf_info.split('\n'):
-            line = filter(lambda x: x != '', line.split(' '))
-
-            if media and 'MediaBox:' in line:
-                ret['media'] = map(float, line[3:7])
-            if crop and 'CropBox:' in line:
-                ret['crop'] = map(float, line[3:7])
-            if bleed and 'BleedBox:' in line:
-                ret['bleed'] = map(float, line[3:7])
-            if trim and 'TrimBox:' in line:
-                ret['trim'] = map(float, line[3:7])
-            if art and 'ArtBox:' in line:
-                ret['art'] = map(float, line[3:7])
+        if page_boxes is None:
+            page_boxes = PDFDocument(filename).page_boxes
 
-        return ret
+        if not 0 < page_num <= len(page_boxes):
+            return {}
+
+        box_dict = page_boxes[page_num - 1]
+        names = [name for name, wanted in (('media', media),
+                                           ('crop', crop),
+                                           ('bleed', bleed),
+                                           ('trim', trim),
+                                           ('art', art)) if wanted]
+
+        return dict((name, box_dict[name]) for name in names
+                    if name in box_dict)
 
@@ -0,0 +1,790 @@
+#!/usr/bin/env python
+
+# standard library imports
+from collections import namedtuple
+from contextlib import closing
+import hashlib
+import mmap
+import os.path
+import re
+import zlib
+
+# third party related imports
+
+# local library imports
+
+
+class PDFPageTreeError(Exception): pass
+
+
+class PDFName(str):
+    """A PDF name, e.g. 'Type' for /Type"""
+
+
+PDFRef = namedtuple('PDFRef', 'num gen')
+PDFStream = namedtuple('PDFStream', 'dict data')
+
+
+class PDFPageTree(object):
+    """Read the page tree of a pdf in process
+
+    PDFPageTree parses just enough of a pdf to find its pages: the
+    cross-reference tables or streams, the trailer, compressed object
+    streams, and the page tree with its inherited MediaBox, CropBox and
+    Rotate. The file is memory-mapped, and objects are parsed only when
+    they are looked up, so that finding pages doesn't read their
+    content.
+
+    Anything it can't parse raises PDFPageTreeError, after which callers
+    fall back to pdfinfo.
+
+    It also fingerprints pages by what their text depends on, so that
+    the pages changed between two versions of a pdf can be found.
+
+    Attributes:
+        filename: A string indicating the absolute path of the pdf.
+        trailer: The trailer dict of the newest cross-reference section.
+
+    """
+
+    # Errors raised by parsing malformed data
+    PARSE_ERRORS = (AttributeError, IndexError, KeyError, RuntimeError,
+                    TypeError, ValueError, zlib.error)
+
+    # Keys of the page tree inherited by kids
+    INHERITABLE = ('MediaBox', 'CropBox', 'Rotate', 'Resources')
+    # The media box of a page without any, i.e. US letter
+    DEFAULT_MEDIA_BOX = [0., 0., 612., 792.]
+    # Where startxref is looked for from the end of file
+    STARTXREF_WINDOW = 2048
+    # Keys of a page fingerprinted, see fingerprints
+    FINGERPRINT_KEYS = ('Contents', 'Resources', 'MediaBox', 'CropBox',
+                        'Rotate')
+    # Keys left out of fingerprints. Parent leads back to the page tree,
+    # and Length only describes how a stream is stored.
+    FINGERPRINT_SKIPPED_KEYS = ('Parent', 'Length')
+
+    RE_SPACE = re.compile(r'(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*')
+    RE_REF = re.compile(r'(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+R'
+                        r'(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])')
+    RE_NUMBER = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)')
+    RE_NAME = re.compile(r'/([^\x00\t\n\x0c\r ()<>\[\]{}/%]*)')
+    RE_NAME_ESCAPE = re.compile(r'#([0-9A-Fa-f]{2})')
+    RE_KEYWORD = re.compile(r'[A-Za-z]+')
+    RE_HEX_STRING = re.compile(r'<([0-9A-Fa-f\x00\t\n\x0c\r ]*)>')
+    RE_NOT_HEX = re.compile(r'[^0-9A-Fa-f]')
+    RE_STRING_CHARS = re.compile(r'[^()\\]+')
+    RE_OCTAL = re.compile(r'[0-7]{1,3}')
+    RE_OBJ = re.compile(r'(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj')
+    RE_STREAM = re.compile(r'stream(?:\r\n|\n|\r)')
+    RE_ENDSTREAM = re.compile(r'[\x00\t\n\x0c\r ]*endstream')
+    RE_STARTXREF = re.compile(r'startxref[\x00\t\n\x0c\r ]+(\d+)')
+    RE_XREF_SUBSECTION = re.compile(r'(\d+)[\x00\t\n\x0c\r ]+(\d+)')
+    RE_XREF_ENTRY = re.compile(
+            r'(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+([nf])')
+
+    STRING_ESCAPES = {
+            'n': '\n',
+            'r': '\r',
+            't': '\t',
+            'b': '\b',
+            'f': '\f',
+    }
+
+    def __init__(self, filename):
+        """Map the pdf and read its cross-reference sections.
+
+        Raises:
+            PDFPageTreeError: The pdf can't be read or parsed.
+
+        """
+
+        self.filename = os.path.abspath(filename)
+        self._file = None
+        self._buf = None
+        # object number to ('offset', offset), ('stream', stream number,
+        # index in stream), or None for a free object
+        self._xref = {}
+        self._objects = {}
+        self._object_streams = {}
+        self._pages = None
+        self._fingerprints = None
+        # object number to the digest of the object, '' while computing
+        self._digests = {}
+
+        try:
+            self._file = open(self.filename, 'rb')
+            self._buf = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            self.trailer = self._read_xref()
+        except (EnvironmentError, PDFPageTreeError) + self.PARSE_ERRORS, e:
+            self.close()
+            if isinstance(e, PDFPageTreeError):
+                raise
+            raise PDFPageTreeError('Failed to read %s: %r' %
+                                   (self.filename, e))
+
+    def close(self):
+        """Unmap and close the pdf."""
+
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    @classmethod
+    def read_pages(cls, filename):
+        """Read the pages of a pdf, see pages."""
+
+        with closing(PDFPageTree(filename)) as page_tree:
+            return page_tree.pages
+
+    @classmethod
+    def read_fingerprints(cls, filename):
+        """Read the fingerprints of a pdf, see fingerprints."""
+
+        with closing(PDFPageTree(filename)) as page_tree:
+            return page_tree.fingerprints
+
+    @property
+    def num_pages(self):
+        """Number of pages."""
+
+        return len(self.pages)
+
+    @property
+    def pages(self):
+        """Boxes and rotation of every page.
+
+        Returns:
+            A list in page order. Each item is a dict from 'media',
+            'crop', 'bleed', 'trim' and 'art' to [x0, y0, x1, y1] lists
+            like PDFDocument.page_boxes, plus 'rotate', the rotation in
+            degrees. Boxes are normalized and clipped like pdfinfo does.
+
+        Raises:
+            PDFPageTreeError: The page tree can't be parsed.
+
+        """
+
+        if self._pages is None:
+            try:
+                self._pages = [self._get_page_attrs(node, inherited)
+                               for node, inherited in self._iter_page_nodes()]
+            except self.PARSE_ERRORS, e:
+                raise PDFPageTreeError('Failed to read pages of %s: %r' %
+                                       (self.filename, e))
+
+        return self._pages
+
+    @property
+    def fingerprints(self):
+        """Fingerprints of every page.
+
+        A fingerprint is the SHA-1 of the content streams, resources,
+        MediaBox, CropBox and Rotate of a page, following references
+        but ignoring object numbers. Saving a pdf again, or changing
+        other pages, doesn't change the fingerprint of a page. Streams
+        are hashed as stored, without decoding.
+
+        Returns:
+            A list of hex digests in page order.
+
+        Raises:
+            PDFPageTreeError: The page tree can't be parsed.
+
+        """
+
+        if self._fingerprints is None:
+            try:
+                self._fingerprints = [
+                        self._get_fingerprint(node, inherited)
+                        for node, inherited in self._iter_page_nodes()]
+            except self.PARSE_ERRORS, e:
+                raise PDFPageTreeError('Failed to fingerprint pages of '
+                                       '%s: %r' % (self.filename, e))
+
+        return self._fingerprints
+
+    def _get_fingerprint(self, node, inherited):
+        """Fingerprint of a page, see fingerprints."""
+
+        sha1 = hashlib.sha1()
+        for key in self.FINGERPRINT_KEYS:
+            sha1.update(key)
+            self._hash_object(node[key] if key in node
+                              else inherited.get(key), sha1)
+
+        return sha1.hexdigest()
+
+    def _get_digest(self, num):
+        """Digest of an indirect object, computed once.
+
+        A reference back to an object being digested, i.e. a cycle,
+        contributes an empty digest.
+
+        """
+
+        if num not in self._digests:
+            self._digests[num] = ''
+            sha1 = hashlib.sha1()
+            self._hash_object(self.get_object(num), sha1)
+            self._digests[num] = sha1.digest()
+
+        return self._digests[num]
+
+    def _hash_object(self, obj, sha1):
+        """Feed an unambiguous encoding of obj to sha1."""
+
+        if isinstance(obj, PDFRef):
+            sha1.update('r')
+            sha1.update(self._get_digest(obj.num))
+        elif isinstance(obj, PDFStream):
+            sha1.update('S')
+            self._hash_object(obj.dict, sha1)
+            sha1.update('%d;' % len(obj.data))
+            sha1.update(obj.data)
+        elif isinstance(obj, dict):
+            keys = sorted(key for key in obj
+                          if key not in self.FINGERPRINT_SKIPPED_KEYS)
+            sha1.update('d%d;' % len(keys))
+            for key in keys:
+                sha1.update('%d;%s' % (len(key), key))
+                self._hash_object(obj[key], sha1)
+        elif isinstance(obj, list):
+            sha1.update('a%d;' % len(obj))
+            for value in obj:
+                self._hash_object(value, sha1)
+        elif isinstance(obj, PDFName):
+            sha1.update('n%d;%s' % (len(obj), obj))
+        elif isinstance(obj, str):
+            sha1.update('s%d;%s' % (len(obj), obj))
+        elif isinstance(obj, bool):
+            sha1.update('b%d;' % obj)
+        elif obj is None:
+            sha1.update('z;')
+        else:
+            # 1 and 1.0 are the same number
+            sha1.update('f%r;' % float(obj))
+
+    def _iter_page_nodes(self):
+        """Yield (page dict, inherited attributes) in page order."""
+
+        root = self.resolve(self.trailer.get('Root'))
+        if not isinstance(root, dict):
+            raise PDFPageTreeError('Missing document catalog')
+
+        visited = set()
+        stack = [(root.get('Pages'), {})]
+        while stack:
+            ref, inherited = stack.pop()
+            if isinstance(ref, PDFRef):
+                if ref.num in visited:
+                    raise PDFPageTreeError('Cyclic page tree')
+                visited.add(ref.num)
+
+            node = self.resolve(ref)
+            if not isinstance(node, dict):
+                raise PDFPageTreeError('Bad page tree node %r' % (ref,))
+
+            kids = self.resolve(node.get('Kids'))
+            if node.get('Type') == 'Page' or \
+               (kids is None and node.get('Type') != 'Pages'):
+                yield node, inherited
+                continue
+
+            if not isinstance(kids, list):
+                raise PDFPageTreeError('Bad kids of %r' % (ref,))
+
+            attrs = dict(inherited)
+            for key in self.INHERITABLE:
+                if key in node:
+                    attrs[key] = node[key]
+
+            stack.extend((kid, attrs) for kid in reversed(kids))
+
+    def _get_page_attrs(self, node, inherited):
+        """Boxes and rotation of a page, see pages."""
+
+        def _get(key):
+            return node[key] if key in node else inherited.get(key)
+
+        media = self._get_rect(_get('MediaBox')) or \
+                list(self.DEFAULT_MEDIA_BOX)
+        crop = self._clip_rect(self._get_rect(_get('CropBox')) or media,
+                               media)
+        ret = {
+                'media': media,
+                'crop': crop,
+        }
+        for name in ('bleed', 'trim', 'art'):
+            box = self._get_rect(node.get(name.capitalize() + 'Box'))
+            ret[name] = self._clip_rect(box or crop, crop)
+
+        rotate = self.resolve(_get('Rotate'))
+        ret['rotate'] = int(rotate) % 360 if isinstance(
+                rotate, (int, long, float)) else 0
+
+        return ret
+
+    def _get_rect(self, value):
+        """Normalize a rectangle, or None if value isn't one."""
+
+        value = self.resolve(value)
+        if not isinstance(value, list) or len(value) != 4:
+            return None
+
+        value = map(self.resolve, value)
+        if not all(isinstance(v, (int, long, float)) for v in value):
+            return None
+
+        x0, y0, x1, y1 = map(float, value)
+
+        return [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)]
+
+    @classmethod
+    def _clip_rect(cls, rect, bound):
+        """Move every side of rect into bound."""
+
+        clamp = lambda v, lo, hi: min(max(v, lo), hi)
+
+        return [clamp(rect[0], bound[0], bound[2]),
+                clamp(rect[1], bound[1], bound[3]),
+                clamp(rect[2], bound[0], bound[2]),
+                clamp(rect[3], bound[1], bound[3])]
+
+    def resolve(self, obj):
+        """Look up obj if it is a PDFRef."""
+
+        for _ in xrange(32):
+            if not isinstance(obj, PDFRef):
+                return obj
+            obj = self.get_object(obj.num)
+
+        raise PDFPageTreeError('Too deep references')
+
+    def get_object(self, num):
+        """Look up an object by its number, None if there is none."""
+
+        if num in self._objects:
+            return self._objects[num]
+
+        entry = self._xref.get(num)
+        if entry is None:
+            obj = None
+        elif entry[0] == 'offset':
+            obj = self._parse_indirect(self._buf, entry[1], num)
+        else:
+            obj = self._get_compressed(entry[1], entry[2], num)
+
+        self._objects[num] = obj
+
+        return obj
+
+    def _get_compressed(self, stream_num, ix, num):
+        """Look up an object in an object stream."""
+
+        if stream_num not in self._object_streams:
+            stream = self.get_object(stream_num)
+            if not isinstance(stream, PDFStream):
+                raise PDFPageTreeError('Missing object stream %s' %
+                                       stream_num)
+
+            data = self._decode(stream)
+            first = self.resolve(stream.dict.get('First'))
+            offsets = []
+            pos = 0
+            for _ in xrange(self.resolve(stream.dict.get('N'))):
+                obj_num, pos = self._parse(data, pos)
+                offset, pos = self._parse(data, pos)
+                offsets.append((obj_num, first + offset))
+
+            self._object_streams[stream_num] = (data, offsets)
+
+        data, offsets = self._object_streams[stream_num]
+        if not 0 <= ix < len(offsets) or offsets[ix][0] != num:
+            # the index is only a hint
+            ix = [obj_num for obj_num, offset in offsets].index(num)
+
+        return self._parse(data, offsets[ix][1])[0]
+
+    def _read_xref(self):
+        """Read every cross-reference section, newest first.
+
+        Returns:
+            The trailer dict of the newest section.
+
+        """
+
+        buf = self._buf
+        pos = buf.rfind('startxref', max(0, len(buf) - self.STARTXREF_WINDOW))
+        match_obj = self.RE_STARTXREF.match(buf, pos) if pos >= 0 else None
+        if match_obj is None:
+            raise PDFPageTreeError('Missing startxref')
+
+        trailer = None
+        visited = set()
+        offsets = [int(match_obj.group(1))]
+        while offsets:
+            offset = offsets.pop(0)
+            if offset in visited:
+                continue
+            visited.add(offset)
+
+            section_trailer = self._read_xref_section(offset)
+            if trailer is None:
+                trailer = section_trailer
+
+            # entries of a hybrid file's xref stream come before Prev's
+            offsets[:0] = [self.resolve(section_trailer[key])
+                           for key in ('XRefStm', 'Prev')
+                           if key in section_trailer]
+
+        if 'Root' not in trailer:
+            raise PDFPageTreeError('Missing Root in trailer')
+
+        return trailer
+
+    def _read_xref_section(self, offset):
+        """Read a cross-reference table or stream at offset.
+
+        Entries already read from newer sections are kept.
+
+        Returns:
+            The trailer dict, or the dict of the stream.
+
+        """
+
+        buf = self._buf
+        pos = self.RE_SPACE.match(buf, offset).end()
+        if buf[pos:pos + 4] == 'xref':
+            return self._read_xref_table(pos + 4)
+
+        stream = self._parse_indirect(buf, pos)
+        if not isinstance(stream, PDFStream) or \
+           stream.dict.get('Type') != 'XRef':
+            raise PDFPageTreeError('No cross-reference at %s' % offset)
+
+        self._read_xref_stream(stream)
+
+        return stream.dict
+
+    def _read_xref_table(self, pos):
+        """Read the subsections and trailer of an xref table."""
+
+        buf = self._buf
+        while True:
+            pos = self.RE_SPACE.match(buf, pos).end()
+            if buf[pos:pos + 7] == 'trailer':
+                trailer, pos = self._parse(buf, pos + 7)
+                if not isinstance(trailer, dict):
+                    raise PDFPageTreeError('Bad trailer')
+                return trailer
+
+            match_obj = self.RE_XREF_SUBSECTION.match(buf, pos)
+            if match_obj is None:
+                raise PDFPageTreeError('Bad xref subsection at %s' % pos)
+
+            start, count = int(match_obj.group(1)), int(match_obj.group(2))
+            pos = match_obj.end()
+            for num in xrange(start, start + count):
+                match_obj = self.RE_XREF_ENTRY.match(
+                        buf, self.RE_SPACE.match(buf, pos).end())
+                if match_obj is None:
+                    raise PDFPageTreeError('Bad xref entry at %s' % pos)
+
+                pos = match_obj.end()
+                if num not in self._xref:
+                    in_use = match_obj.group(3) == 'n'
+                    self._xref[num] = (('offset', int(match_obj.group(1)))
+                                       if in_use else None)
+
+    def _read_xref_stream(self, stream):
+        """Read the entries of an xref stream."""
+
+        widths = map(self.resolve, self.resolve(stream.dict['W']))
+        if len(widths) != 3:
+            raise PDFPageTreeError('Bad xref stream widths')
+
+        index = map(self.resolve, self.resolve(stream.dict.get('Index')) or
+                                  [0, self.resolve(stream.dict['Size'])])
+        data = self._decode(stream)
+        row_size = sum(widths)
+        bounds = [(sum(widths[:ix]), sum(widths[:ix + 1])) for ix in
+                  xrange(3)]
+
+        pos = 0
+        for start, count in zip(index[::2], index[1::2]):
+            for num in xrange(start, start + count):
+                row = data[pos:pos + row_size]
+                if len(row) < row_size:
+                    raise PDFPageTreeError('Truncated xref stream')
+                pos += row_size
+
+                fields = [int(row[lo:hi].encode('hex') or '0', 16)
+                          for lo, hi in bounds]
+                if widths[0] == 0:
+                    fields[0] = 1
+
+                if num in self._xref:
+                    continue
+
+                if fields[0] == 1:
+                    self._xref[num] = ('offset', fields[1])
+                elif fields[0] == 2:
+                    self._xref[num] = ('stream', fields[1], fields[2])
+                else:
+                    self._xref[num] = None
+
+    def _decode(self, stream):
+        """Decode the data of a stream, only FlateDecode is supported."""
+
+        filters = self.resolve(stream.dict.get('Filter'))
+        params = self.resolve(stream.dict.get('DecodeParms'))
+        if filters is None:
+            filters = []
+        elif not isinstance(filters, list):
+            filters, params = [filters], [params]
+        if not isinstance(params, list):
+            params = [params] * len(filters)
+
+        data = stream.data
+        for filter_name, param in zip(filters, params):
+            filter_name = self.resolve(filter_name)
+            if filter_name not in ('FlateDecode', 'Fl'):
+                raise PDFPageTreeError('Unsupported filter %s' % filter_name)
+
+            # a decompressobj tolerates trailing garbage
+            data = zlib.decompressobj().decompress(data)
+
+            param = self.resolve(param) or {}
+            predictor = self.resolve(param.get('Predictor', 1))
+            if predictor >= 10:
+                data = self._undo_png_predictor(
+                        data,
+                        self.resolve(param.get('Columns', 1)),
+                        self.resolve(param.get('Colors', 1)),
+                        self.resolve(param.get('BitsPerComponent', 8)))
+            elif predictor != 1:
+                raise PDFPageTreeError('Unsupported predictor %s' %
+                                       predictor)
+
+        return data
+
+    @classmethod
+    def _undo_png_predictor(cls, data, columns, colors, bits):
+        """Undo the PNG predictors of rows, each prefixed by its type."""
+
+        pixel_size = max(1, colors * bits // 8)
+        row_size = (colors * bits * columns + 7) // 8
+
+        ret = []
+        prev = bytearray(row_size)
+        for pos in xrange(0, len(data) - row_size, row_size + 1):
+            predictor = ord(data[pos])
+            row = bytearray(data[pos + 1:pos + 1 + row_size])
+            for ix in xrange(row_size):
+                left = row[ix - pixel_size] if ix >= pixel_size else 0
+                up = prev[ix]
+                if predictor == 1:
+                    row[ix] = (row[ix] + left) & 0xff
+                elif predictor == 2:
+                    row[ix] = (row[ix] + up) & 0xff
+                elif predictor == 3:
+                    row[ix] = (row[ix] + (left + up) // 2) & 0xff
+                elif predictor == 4:
+                    up_left = prev[ix - pixel_size] \
+                              if ix >= pixel_size else 0
+                    estimate = left + up - up_left
+                    dists = (abs(estimate - left), abs(estimate - up),
+                             abs(estimate - up_left))
+                    if dists[0] <= dists[1] and dists[0] <= dists[2]:
+                        row[ix] = (row[ix] + left) & 0xff
+                    elif dists[1] <= dists[2]:
+                        row[ix] = (row[ix] + up) & 0xff
+                    else:
+                        row[ix] = (row[ix] + up_left) & 0xff
+                elif predictor != 0:
+                    raise PDFPageTreeError('Bad PNG predictor %s' %
+                                           predictor)
+
+            ret.append(str(row))
+            prev = row
+
+        return ''.join(ret)
+
+    def _parse_indirect(self, buf, pos, num=None):
+        """Parse the indirect object at pos.
+
+        Args:
+            buf: The mapped pdf.
+            pos: The offset of the object.
+            num: The expected object number, or None.
+
+        Returns:
+            The object, or a PDFStream for a stream.
+
+        """
+
+        match_obj = self.RE_OBJ.match(buf, self.RE_SPACE.match(buf,
+                                                               pos).end())
+        if match_obj is None:
+            raise PDFPageTreeError('No object at %s' % pos)
+        if num is not None and int(match_obj.group(1)) != num:
+            raise PDFPageTreeError('Object %s is not at %s' % (num, pos))
+
+        obj, pos = self._parse(buf, match_obj.end())
+        if not isinstance(obj, dict):
+            return obj
+
+        match_obj = self.RE_STREAM.match(buf,
+                                         self.RE_SPACE.match(buf, pos).end())
+        if match_obj is None:
+            return obj
+
+        start = match_obj.end()
+        length = self.resolve(obj.get('Length'))
+        if isinstance(length, (int, long)) and \
+           self.RE_ENDSTREAM.match(buf, start + length):
+            end = start + length
+        else:
+            # a wrong Length, so look for endstream instead
+            end = buf.find('endstream', start)
+            if end < 0:
+                raise PDFPageTreeError('Missing endstream at %s' % start)
+            while end > start and buf[end - 1] in '\r\n':
+                end -= 1
+
+        return PDFStream(obj, buf[start:end])
+
+    def _parse(self, buf, pos):
+        """Parse a direct object at pos.
+
+        Returns:
+            An (object, end offset) tuple. Dicts are dicts keyed by
+            PDFName, arrays are lists, names are PDFName, strings are
+            str, references are PDFRef, and null is None.
+
+        """
+
+        pos = self.RE_SPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            raise PDFPageTreeError('Unexpected end of data')
+
+        char = buf[pos]
+        if char == '/':
+            match_obj = self.RE_NAME.match(buf, pos)
+            name = self.RE_NAME_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)),
+                                           match_obj.group(1))
+            return PDFName(name), match_obj.end()
+
+        if char == '<' and buf[pos + 1:pos + 2] == '<':
+            ret = {}
+            pos += 2
+            while True:
+                pos = self.RE_SPACE.match(buf, pos).end()
+                if buf[pos:pos + 2] == '>>':
+                    return ret, pos + 2
+
+                key, pos = self._parse(buf, pos)
+                if not isinstance(key, PDFName):
+                    raise PDFPageTreeError('Bad dict key at %s' % pos)
+                ret[key], pos = self._parse(buf, pos)
+
+        if char == '<':
+            match_obj = self.RE_HEX_STRING.match(buf, pos)
+            if match_obj is None:
+                raise PDFPageTreeError('Bad hex string at %s' % pos)
+
+            digits = self.RE_NOT_HEX.sub('', match_obj.group(1))
+            if len(digits) % 2:
+                digits += '0'
+            return digits.decode('hex'), match_obj.end()
+
+        if char == '[':
+            ret = []
+            pos += 1
+            while True:
+                pos = self.RE_SPACE.match(buf, pos).end()
+                if buf[pos:pos + 1] == ']':
+                    return ret, pos + 1
+
+                value, pos = self._parse(buf, pos)
+                ret.append(value)
+
+        if char == '(':
+            return self._parse_literal_string(buf, pos + 1)
+
+        match_obj = self.RE_REF.match(buf, pos)
+        if match_obj is not None:
+            return (PDFRef(int(match_obj.group(1)), int(match_obj.group(2))),
+                    match_obj.end())
+
+        match_obj = self.RE_NUMBER.match(buf, pos)
+        if match_obj is not None:
+            text = match_obj.group(0)
+            value = float(text) if '.' in text else int(text)
+            return value, match_obj.end()
+
+        match_obj = self.RE_KEYWORD.match(buf, pos)
+        if match_obj is not None:
+            keyword = match_obj.group(0)
+            if keyword in ('true', 'false', 'null'):
+                value = {'true': True, 'false': False}.get(keyword)
+                return value, match_obj.end()
+
+        raise PDFPageTreeError('Unexpected %r at %s' % (buf[pos:pos + 16],
+                                                         pos))
+
+    def _parse_literal_string(self, buf, pos):
+        """Parse a literal string from pos, just after its '('."""
+
+        chars = []
+        depth = 1
+        while True:
+            match_obj = self.RE_STRING_CHARS.match(buf, pos)
+            if match_obj is not None:
+                chars.append(match_obj.group(0))
+                pos = match_obj.end()
+
+            char = buf[pos:pos + 1]
+            if char == '':
+                raise PDFPageTreeError('Unterminated string')
+            pos += 1
+
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0:
+                    return ''.join(chars), pos
+            else:
+                # a backslash
+                char = buf[pos:pos + 1]
+                match_obj = self.RE_OCTAL.match(buf, pos)
+                if match_obj is not None:
+                    chars.append(chr(int(match_obj.group(0), 8) & 0xff))
+                    pos = match_obj.end()
+                    continue
+
+                pos += 1
+                if char == '\r':
+                    # a line continuation
+                    if buf[pos:pos + 1] == '\n':
+                        pos += 1
+                elif char != '\n':
+                    chars.append(self.STRING_ESCAPES.get(char, char))
+                continue
+
+            chars.append(char)
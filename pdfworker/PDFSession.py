@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# standard library imports
+import logging as logger
+
+# third party related imports
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# local library imports
+from PDFBrowser import PDFBrowser
+
+
+class PDFSession(object):
+    """Extract many pdfs in one browser
+
+    PDFSession keeps a PDFBrowser running between documents, only the
+    pdf in its viewer is swapped. A new browser is launched only when
+    the running one stops responding or has opened max_documents pdfs.
+
+    >>> with PDFSession('chrome') as session:
+            for filename in filenames:
+                pdf_doc = session.run(filename)
+    >>>
+
+    Attributes:
+        driver: A string either 'firefox' or 'chrome'
+        text_only: A boolean passed to the PDFBrowser.
+        max_documents: An integer indicating how many pdfs a browser
+            opens before it is recycled. None means no limit.
+        num_documents: An integer indicating how many pdfs the current
+            browser has opened.
+        pdf_browser: An instance of PDFBrowser, or None before the
+            first pdf is opened.
+
+    """
+
+    def __init__(self, driver='firefox', text_only=False, max_documents=None):
+
+        self.driver = driver
+        self.text_only = text_only
+        self.max_documents = max_documents
+        self.num_documents = 0
+        self.pdf_browser = None
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    def close(self):
+        """Quit the browser."""
+
+        if self.pdf_browser is not None:
+            self.pdf_browser.quit()
+
+        self.num_documents = 0
+
+    def _should_recycle(self):
+        """Test whether the running browser should be replaced."""
+
+        if self.pdf_browser.browser is None:
+            return False
+
+        if self.max_documents is not None and \
+           self.num_documents >= self.max_documents:
+            logger.info('Browser has opened %s pdfs, recycle it',
+                        self.num_documents)
+            return True
+
+        if not self.pdf_browser.is_alive():
+            logger.warning('Browser does not respond, recycle it')
+            return True
+
+        return False
+
+    def _load(self, filename, scale=1):
+        """Open a pdf in the running browser."""
+
+        if self.pdf_browser is None:
+            self.pdf_browser = PDFBrowser(filename, self.driver,
+                                          self.text_only)
+        elif self._should_recycle():
+            self.close()
+
+        if self.pdf_browser.browser is None:
+            self.num_documents = 0
+
+        try:
+            self.pdf_browser.load(filename, scale)
+        except (TimeoutException, WebDriverException):
+            logger.warning("Can't open %s in the running browser, "
+                           "launch a new one", filename)
+            self.close()
+            self.pdf_browser.load(filename, scale)
+
+        self.num_documents += 1
+
+    def run(self, filename, pages=None, scale=1, page_rendered_cb=None,
+            depth=0):
+        """Parse a pdf in the running browser.
+
+        Args:
+            filename: A string, PDF filename.
+            pages: A list containing what pages we want to parse.
+            scale: The scale at which pages are rendered.
+            page_rendered_cb: A callable which will be called after
+                a page is rendered.
+            depth: How many pages are rendered ahead, see
+                PDFBrowser.run().
+
+        Returns:
+            An instance of PDFDocument.
+
+        """
+
+        self._load(filename, scale)
+
+        return self.pdf_browser.run(pages, scale, page_rendered_cb,
+                                    keep_browser=True, depth=depth)
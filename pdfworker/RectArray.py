@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+# standard library imports
+from array import array
+from itertools import izip
+
+# third party related imports
+
+# local library imports
+from Rectangle import Rectangle, TextRectangle
+from TextBlocks import TextBlocks
+
+
+class RectArray(object):
+    """A collection of rectangles stored by columns
+
+    The geometry of all rectangles is kept in one float array per
+    attribute, like TextBlocks, and the bulk operations run over the
+    arrays without creating a Rectangle for every box. They give the
+    same results as the Rectangle methods of the same names, for
+    rectangles of positive width and height.
+
+    Indexing and iterating still give Rectangles, or TextRectangles if
+    there are texts, built on demand.
+
+    Attributes:
+        x, y, w, h: Arrays of the left, top, width and height of
+            rectangles.
+        t: A list of the texts of rectangles, or None.
+
+    """
+
+    def __init__(self, x=(), y=(), w=(), h=(), t=None):
+        """Create by sequences of each attribute.
+
+        Args:
+            x, y, w, h: Sequences of numbers of the same length.
+            t: A sequence of texts of the same length, or None.
+
+        """
+
+        self.x = array('d', x)
+        self.y = array('d', y)
+        self.w = array('d', w)
+        self.h = array('d', h)
+        self.t = None if t is None else list(t)
+
+        lengths = set(map(len, (self.x, self.y, self.w, self.h)))
+        if self.t is not None:
+            lengths.add(len(self.t))
+        if len(lengths) > 1:
+            raise ValueError('Columns of different lengths')
+
+    @classmethod
+    def create(cls, rects):
+        """Create by Rectangles, which keep their texts if all of them
+        are TextRectangles.
+
+        """
+
+        rects = list(rects)
+        texts = None
+        if rects and all(isinstance(r, TextRectangle) for r in rects):
+            texts = [r.t for r in rects]
+
+        return RectArray([r.x for r in rects], [r.y for r in rects],
+                         [r.w for r in rects], [r.h for r in rects], texts)
+
+    @classmethod
+    def create_by_blocks(cls, blocks):
+        """Create by text blocks, e.g. PDFPage.blocks.
+
+        Args:
+            blocks: A TextBlocks or a list of block dicts.
+
+        """
+
+        blocks = TextBlocks.create(blocks)
+
+        return RectArray(blocks.x, blocks.y, blocks.w, blocks.h,
+                         [blocks.get_text(ix) for ix in xrange(len(blocks))])
+
+    def to_blocks(self):
+        """Convert to a TextBlocks, which may be set as PDFPage.blocks.
+
+        Rectangles without texts get empty ones.
+
+        """
+
+        texts = self.t if self.t is not None else [u''] * len(self)
+
+        return TextBlocks.create_by_columns(self.x, self.y, self.w, self.h,
+                                            texts)
+
+    def __len__(self):
+
+        return len(self.x)
+
+    def __getitem__(self, key):
+
+        if isinstance(key, slice):
+            return self.take(xrange(*key.indices(len(self))))
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('RectArray index out of range')
+
+        if self.t is not None:
+            return TextRectangle(self.x[key], self.y[key], self.w[key],
+                                 self.h[key], self.t[key])
+
+        return Rectangle(self.x[key], self.y[key], self.w[key], self.h[key])
+
+    def __iter__(self):
+
+        for ix in xrange(len(self)):
+            yield self[ix]
+
+    def __repr__(self):
+
+        return 'RectArray(%s)' % list(self)
+
+    def take(self, indices):
+        """Create a RectArray of the rectangles at indices."""
+
+        indices = list(indices)
+        texts = None
+        if self.t is not None:
+            texts = [self.t[ix] for ix in indices]
+
+        return RectArray([self.x[ix] for ix in indices],
+                         [self.y[ix] for ix in indices],
+                         [self.w[ix] for ix in indices],
+                         [self.h[ix] for ix in indices], texts)
+
+    @property
+    def area(self):
+        """An array of the area of every rectangle."""
+
+        return array('d', [w * h for w, h in izip(self.w, self.h)])
+
+    def union(self, indices=None):
+        """The bounding rectangle of a subset of rectangles.
+
+        Args:
+            indices: The indices of the rectangles. Default is all.
+
+        Returns:
+            A Rectangle.
+
+        Raises:
+            ValueError: There is no rectangle.
+
+        """
+
+        if indices is None:
+            x, y, w, h = self.x, self.y, self.w, self.h
+        else:
+            indices = list(indices)
+            x = [self.x[ix] for ix in indices]
+            y = [self.y[ix] for ix in indices]
+            w = [self.w[ix] for ix in indices]
+            h = [self.h[ix] for ix in indices]
+
+        if not len(x):
+            raise ValueError('Union of no rectangle')
+
+        min_x, min_y = min(x), min(y)
+        max_x = max([x1 + w1 for x1, w1 in izip(x, w)])
+        max_y = max([y1 + h1 for y1, h1 in izip(y, h)])
+
+        return Rectangle(min_x, min_y, max_x - min_x, max_y - min_y)
+
+    @classmethod
+    def _line_distances(cls, begin, end, begins, lengths):
+        """Distances between a line and lines, see Rectangle.x_distance."""
+
+        return array('d', [begin - (b + l) if begin > b + l else
+                           b - end if end < b else 0.
+                           for b, l in izip(begins, lengths)])
+
+    def x_distance(self, rect):
+        """An array of the x_distance of every rectangle to rect."""
+
+        return self._line_distances(rect.x, rect.x + rect.w, self.x, self.w)
+
+    def y_distance(self, rect):
+        """An array of the y_distance of every rectangle to rect."""
+
+        return self._line_distances(rect.y, rect.y + rect.h, self.y, self.h)
+
+    def distance(self, rect):
+        """An array of the distance of every rectangle to rect.
+
+        As Rectangle.distance(), it is the square of the closest
+        distance between corners, or 0 if rectangles overlap.
+
+        """
+
+        x1, y1 = rect.x, rect.y
+        x2, y2 = x1 + rect.w, y1 + rect.h
+
+        ret = array('d')
+        for x, y, w, h in izip(self.x, self.y, self.w, self.h):
+            xe, ye = x + w, y + h
+            if max(x, x1) < min(xe, x2) and max(y, y1) < min(ye, y2):
+                ret.append(0.)
+                continue
+
+            dx = min(abs(x - x1), abs(x - x2), abs(xe - x1), abs(xe - x2))
+            dy = min(abs(y - y1), abs(y - y2), abs(ye - y1), abs(ye - y2))
+            ret.append(dx * dx + dy * dy)
+
+        return ret
+
+    def distance_matrix(self, other=None):
+        """Pairwise distances, see distance().
+
+        Args:
+            other: A RectArray. Default is self.
+
+        Returns:
+            A list of arrays, whose [i][j] is the distance between the
+            i-th rectangle of self and the j-th one of other.
+
+        """
+
+        other = self if other is None else other
+
+        return [other.distance(rect) for rect in self._iter_rects()]
+
+    def x_distance_matrix(self, other=None):
+        """Pairwise x_distance, see distance_matrix()."""
+
+        other = self if other is None else other
+
+        return [other.x_distance(rect) for rect in self._iter_rects()]
+
+    def y_distance_matrix(self, other=None):
+        """Pairwise y_distance, see distance_matrix()."""
+
+        other = self if other is None else other
+
+        return [other.y_distance(rect) for rect in self._iter_rects()]
+
+    def _iter_rects(self):
+        """Rectangles without texts, for the bulk operations."""
+
+        for x, y, w, h in izip(self.x, self.y, self.w, self.h):
+            yield Rectangle(x, y, w, h)
+
+    def intersect_pairs(self):
+        """All pairs of overlapping rectangles.
+
+        The rectangles are swept from left to right, so that only the
+        ones overlapping on the x-axis are tested.
+
+        Returns:
+            A sorted list of (i, j) where i < j, for every pair whose
+            Rectangle.intersect() isn't None.
+
+        """
+
+        x, y, w, h = self.x, self.y, self.w, self.h
+        order = sorted(xrange(len(self)), key=x.__getitem__)
+
+        ret = []
+        for k, i in enumerate(order):
+            x_end = x[i] + w[i]
+            y_begin, y_end = y[i], y[i] + h[i]
+            for m in xrange(k + 1, len(order)):
+                j = order[m]
+                if x[j] >= x_end:
+                    break
+                if max(y[j], y_begin) < min(y[j] + h[j], y_end):
+                    ret.append((i, j) if i < j else (j, i))
+
+        ret.sort()
+
+        return ret
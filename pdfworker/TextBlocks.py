@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+
+# standard library imports
+from array import array
+from itertools import izip
+import sys
+
+# third party related imports
+
+# local library imports
+
+
+class TextBlocks(object):
+    """Text blocks of a page stored by columns
+
+    Instead of a dict for each text block, the geometry of all blocks is
+    kept in one float array per attribute, and their texts in one UTF-8
+    buffer with offsets. Indexing and iterating still give dicts like
+    {'x': 1., 'y': 2., 'w': 3., 'h': 4., 't': u'foo'}, but they are
+    built on demand, so changing them doesn't change the blocks.
+    PDFPage.data gives them as a list for code which changes blocks.
+
+    Attributes:
+        x, y, w, h: Arrays of the left, top, width and height of blocks.
+        sx, sy: Arrays of the horizontal and vertical scale of blocks,
+            or None if the blocks have no scale, e.g. by xpdf.
+
+    """
+
+    GEOMETRY = ('x', 'y', 'w', 'h')
+    SCALES = ('sx', 'sy')
+    # Keys of a block dict which are stored.
+    KEYS = frozenset(GEOMETRY + SCALES + ('t',))
+
+    # Array types of the binary format, which is little-endian.
+    BINARY_FLOAT = 'f'
+    BINARY_OFFSET = 'I'
+    # Set in the end offset of a None text, which is stored as an empty
+    # one. It fits in BINARY_OFFSET.
+    NONE_TEXT = 1 << 31
+
+    def __init__(self, has_scale=False):
+
+        self.x = array('d')
+        self.y = array('d')
+        self.w = array('d')
+        self.h = array('d')
+        self.sx = array('d') if has_scale else None
+        self.sy = array('d') if has_scale else None
+        self._text = bytearray()
+        self._offsets = array('L', [0])
+
+    @property
+    def has_scale(self):
+        """Whether blocks have sx and sy."""
+
+        return self.sx is not None
+
+    @property
+    def _columns(self):
+        """Names of the float columns in use."""
+
+        if self.has_scale:
+            return self.GEOMETRY + self.SCALES
+
+        return self.GEOMETRY
+
+    @classmethod
+    def create(cls, blocks):
+        """Create by a list of block dicts.
+
+        A TextBlocks is returned as it is. Keys other than KEYS are
+        dropped, and numbers become floats.
+
+        Raises:
+            ValueError: A block lacks x, y, w or h.
+
+        """
+
+        if isinstance(blocks, TextBlocks):
+            return blocks
+
+        ret = TextBlocks()
+        for block in blocks:
+            ret.append(block)
+
+        return ret
+
+    @classmethod
+    def create_by_columns(cls, x, y, w, h, t, sx=None, sy=None):
+        """Create by sequences of each attribute.
+
+        Args:
+            x, y, w, h: Sequences of numbers of the same length.
+            t: A sequence of texts of the same length.
+            sx, sy: Sequences of scales, or None if there is no scale.
+
+        """
+
+        ret = TextBlocks(sx is not None)
+        ret.x.extend(map(float, x))
+        ret.y.extend(map(float, y))
+        ret.w.extend(map(float, w))
+        ret.h.extend(map(float, h))
+        if ret.has_scale:
+            ret.sx.extend(map(float, sx))
+            ret.sy.extend(map(float, sy))
+
+        for text in t:
+            ret._append_text(text)
+
+        return ret
+
+    def _append_text(self, text):
+
+        if text:
+            if isinstance(text, unicode):
+                text = text.encode('utf8')
+            self._text.extend(text)
+
+        end = len(self._text)
+        self._offsets.append(end | self.NONE_TEXT if text is None else end)
+
+    def append(self, block):
+        """Append a block dict, see create()."""
+
+        missing = [attr for attr in self.GEOMETRY if attr not in block]
+        if missing:
+            raise ValueError('Block without %s: %r' %
+                             (', '.join(missing), block))
+
+        if not self.has_scale and ('sx' in block or 'sy' in block):
+            self.sx = array('d', [1.]) * len(self)
+            self.sy = array('d', [1.]) * len(self)
+
+        for attr in self.GEOMETRY:
+            getattr(self, attr).append(block[attr])
+        if self.has_scale:
+            self.sx.append(block.get('sx', 1))
+            self.sy.append(block.get('sy', 1))
+
+        self._append_text(block.get('t'))
+
+    def __len__(self):
+
+        return len(self.x)
+
+    def get_text(self, ix):
+        """The text of the ix-th block, which may be None."""
+
+        start, end = self._get_text_range(ix)
+        if self._offsets[ix + 1] & self.NONE_TEXT:
+            return None
+
+        return self._text[start:end].decode('utf8')
+
+    def _get_text_range(self, ix):
+        """The [start, end) of the ix-th text in _text."""
+
+        mask = self.NONE_TEXT - 1
+
+        return self._offsets[ix] & mask, self._offsets[ix + 1] & mask
+
+    def __getitem__(self, key):
+
+        if isinstance(key, slice):
+            return self._take(xrange(*key.indices(len(self))))
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('TextBlocks index out of range')
+
+        ret = dict((attr, getattr(self, attr)[key])
+                   for attr in self._columns)
+        ret['t'] = self.get_text(key)
+
+        return ret
+
+    def __iter__(self):
+
+        for ix in xrange(len(self)):
+            yield self[ix]
+
+    def __eq__(self, other):
+
+        if isinstance(other, (TextBlocks, list, tuple)):
+            return self.to_dicts() == list(other)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+
+        ret = self.__eq__(other)
+        if ret is NotImplemented:
+            return ret
+
+        return not ret
+
+    def __repr__(self):
+
+        return 'TextBlocks(%s)' % self.to_dicts()
+
+    def _take(self, indices):
+        """Create a TextBlocks of the blocks at indices."""
+
+        ret = TextBlocks(self.has_scale)
+        for attr in self._columns:
+            column = getattr(self, attr)
+            getattr(ret, attr).extend(column[ix] for ix in indices)
+
+        for ix in indices:
+            start, end = self._get_text_range(ix)
+            ret._text.extend(self._text[start:end])
+            end = len(ret._text)
+            if self._offsets[ix + 1] & self.NONE_TEXT:
+                end |= self.NONE_TEXT
+            ret._offsets.append(end)
+
+        return ret
+
+    def to_dicts(self):
+        """Convert to a list of block dicts."""
+
+        return list(self)
+
+    def scale(self, scale_x=1, scale_y=1):
+        """Scale the geometry of all blocks in place."""
+
+        mul_x = float(scale_x).__mul__
+        mul_y = float(scale_y).__mul__
+        for attr in self._columns:
+            mul = mul_x if attr in ('x', 'w', 'sx') else mul_y
+            setattr(self, attr, array('d', map(mul, getattr(self, attr))))
+
+    def filter_in_bounds(self, width, height):
+        """Create a TextBlocks of the blocks overlapping the page.
+
+        Args:
+            width: The width of the page.
+            height: The height of the page.
+
+        """
+
+        indices = [ix for ix, (x, y, w, h) in
+                   enumerate(izip(self.x, self.y, self.w, self.h))
+                   if x + w > 0 and x < width and y + h > 0 and y < height]
+        if len(indices) == len(self):
+            return self
+
+        return self._take(indices)
+
+    @classmethod
+    def _to_little_endian(cls, arr):
+
+        if sys.byteorder != 'little':
+            arr = array(arr.typecode, arr)
+            arr.byteswap()
+
+        return arr.tostring()
+
+    @classmethod
+    def _from_little_endian(cls, typecode, data, offset, length):
+        """Read length items of typecode from data at offset.
+
+        Returns:
+            An (array, end offset) tuple.
+
+        """
+
+        arr = array(typecode)
+        end = offset + arr.itemsize * length
+        if end > len(data):
+            raise ValueError('Truncated TextBlocks')
+
+        arr.fromstring(data[offset:end])
+        if sys.byteorder != 'little':
+            arr.byteswap()
+
+        return arr, end
+
+    def to_binary(self):
+        """Pack into bytes.
+
+        The float32 columns come first, then len(self) + 1 uint32
+        offsets of texts, with NONE_TEXT set for None texts, then the
+        UTF-8 texts.
+
+        """
+
+        parts = [self._to_little_endian(array(self.BINARY_FLOAT,
+                                              getattr(self, attr)))
+                 for attr in self._columns]
+        parts.append(self._to_little_endian(array(self.BINARY_OFFSET,
+                                                  self._offsets)))
+        parts.append(str(self._text))
+
+        return ''.join(parts)
+
+    @classmethod
+    def create_by_binary(cls, data, offset, length, has_scale):
+        """Unpack what to_binary() packs.
+
+        Args:
+            data: A string of bytes.
+            offset: Where the packed blocks start in data.
+            length: The number of blocks.
+            has_scale: Whether sx and sy are packed.
+
+        Returns:
+            A (TextBlocks, end offset) tuple.
+
+        Raises:
+            ValueError: data is truncated.
+
+        """
+
+        ret = TextBlocks(has_scale)
+        for attr in ret._columns:
+            column, offset = cls._from_little_endian(cls.BINARY_FLOAT, data,
+                                                     offset, length)
+            setattr(ret, attr, array('d', column))
+
+        offsets, offset = cls._from_little_endian(cls.BINARY_OFFSET, data,
+                                                  offset, length + 1)
+        ret._offsets = array('L', offsets)
+
+        end = offset + (offsets[-1] & (cls.NONE_TEXT - 1))
+        if end > len(data):
+            raise ValueError('Truncated TextBlocks')
+        ret._text = bytearray(data[offset:end])
+
+        return ret, end
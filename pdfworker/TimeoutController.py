@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# standard library imports
+from collections import deque
+import math
+
+# third party related imports
+
+# local library imports
+
+
+class TimeoutController(object):
+    """Decide how long to wait for a page to be rendered
+
+    TimeoutController keeps the render latencies of the latest pages of
+    a document. The timeout of a page is a high percentile of them times
+    a safety factor, so that one slow page doesn't inflate the waits for
+    the following pages. Every retry of a page doubles its timeout,
+    until max_timeout or max_retries is reached.
+
+    Attributes:
+        initial_timeout: The timeout used before enough latencies are
+            recorded.
+        min_timeout: The timeout is never shorter than it.
+        max_timeout: The timeout is never longer than it.
+        percentile: A float in [0, 1], which percentile of the
+            latencies the timeout is based on.
+        factor: The percentile latency is multiplied by it.
+        window: How many latest latencies are kept.
+        max_retries: How many times a page is retried.
+        min_samples: How many latencies are needed before they are
+            trusted more than initial_timeout.
+
+    """
+
+    def __init__(self, initial_timeout=15, min_timeout=2, max_timeout=60,
+                 percentile=0.95, factor=3., window=50, max_retries=3,
+                 min_samples=5):
+
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.factor = factor
+        self.max_retries = max_retries
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies = deque(maxlen=window)
+
+    def __len__(self):
+        """Number of recorded latencies."""
+
+        return len(self._latencies)
+
+    def reset(self):
+        """Forget the recorded latencies, e.g. for another document."""
+
+        self._latencies.clear()
+
+    def record(self, seconds):
+        """Record how long a page took to render."""
+
+        self._latencies.append(seconds)
+
+    def get_percentile(self):
+        """The percentile of the recorded latencies.
+
+        Returns:
+            A float, or None if no latency is recorded.
+
+        """
+
+        if len(self._latencies) == 0:
+            return None
+
+        latencies = sorted(self._latencies)
+        ix = int(math.ceil(self.percentile * len(latencies))) - 1
+
+        return latencies[max(ix, 0)]
+
+    def get_timeout(self, num_retry=0):
+        """The timeout of a page.
+
+        Args:
+            num_retry: An integer indicating how many times the page
+                has timed out.
+
+        Returns:
+            A float of seconds.
+
+        """
+
+        if len(self._latencies) < self.min_samples:
+            timeout = self.initial_timeout
+        else:
+            timeout = self.get_percentile() * self.factor
+
+        timeout = max(timeout, self.min_timeout) * 2 ** num_retry
+
+        return float(min(timeout, self.max_timeout))
+
+    def can_retry(self, num_retry):
+        """Whether a page may be tried again.
+
+        Args:
+            num_retry: An integer indicating how many times the page
+                has timed out.
+
+        """
+
+        if num_retry > self.max_retries:
+            return False
+
+        # the last try has already waited as long as possible
+        return self.get_timeout(num_retry - 1) < self.max_timeout
@@ -0,0 +1,138 @@
+#!/usr/bin/env
+
+# standard library imports
+import random
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..CrossValidator import CrossValidator
+from ..PDFPage import PDFPage
+from ..TextBlocks import TextBlocks
+
+
+def create_page(page_num, width, height, boxes):
+
+    ret = PDFPage()
+    ret.page_num = page_num
+    ret.width = width
+    ret.height = height
+    ret.data = [{'x': x, 'y': y, 'w': w, 'h': h, 't': t}
+                for x, y, w, h, t in boxes]
+
+    return ret
+
+
+def match_all_pairs(blocks, reference, max_offset):
+    """Match by comparing every pair of boxes."""
+
+    candidates = []
+    for ix, box in enumerate(blocks):
+        for ref_ix, ref_box in enumerate(reference):
+            offset = CrossValidator._offset(
+                    box['x'], box['y'], box['w'], box['h'],
+                    ref_box['x'], ref_box['y'], ref_box['w'], ref_box['h'])
+            if offset < max_offset:
+                candidates.append((offset, ix, ref_ix))
+
+    ret = []
+    matched, ref_matched = set(), set()
+    for offset, ix, ref_ix in sorted(candidates):
+        if ix not in matched and ref_ix not in ref_matched:
+            matched.add(ix)
+            ref_matched.add(ref_ix)
+            ret.append((ix, ref_ix, offset))
+
+    return sorted(ret)
+
+
+class TestCrossValidator(object):
+
+    def test_match(self):
+
+        validator = CrossValidator(10)
+        blocks = TextBlocks.create_by_columns([0, 100, 200], [0, 0, 0],
+                                              [10, 10, 10], [5, 5, 5],
+                                              ['a', 'b', 'c'])
+        reference = TextBlocks.create_by_columns([1, 0.5, 100, 300],
+                                                 [0, 0, 0, 0],
+                                                 [10, 10, 10, 10],
+                                                 [5, 5, 5, 5],
+                                                 ['a', 'a', 'b', 'c'])
+
+        # the nearest box wins, and a box matches once at most
+        assert(validator.match(blocks, reference) ==
+               [(0, 1, 2.0), (1, 2, 0.0)])
+
+        # reference geometry is scaled
+        reference.x[2] = 50
+        reference.w[2] = 5
+        assert(validator.match(blocks, reference, 2, 1) == [(1, 2, 0.0)])
+
+        with pytest.raises(ValueError):
+            CrossValidator(0)
+
+    def test_match_all_pairs(self):
+
+        rand = random.Random(42)
+        boxes = lambda n: TextBlocks.create_by_columns(
+                [rand.uniform(-50, 600) for i in xrange(n)],
+                [rand.uniform(-50, 800) for i in xrange(n)],
+                [rand.uniform(1, 80) for i in xrange(n)],
+                [rand.uniform(1, 20) for i in xrange(n)],
+                [u''] * n)
+
+        for max_offset in (10, 100, 1000):
+            blocks, reference = boxes(300), boxes(200)
+            assert(CrossValidator(max_offset).match(blocks, reference) ==
+                   match_all_pairs(blocks, reference, max_offset))
+
+    def test_validate(self):
+
+        validator = CrossValidator()
+        page = create_page(1, 612, 792, [(10, 20, 30, 10, u'foo'),
+                                         (10, 40, 30, 10, u'bar'),
+                                         (300, 300, 30, 10, u'baz')])
+        reference = create_page(1, 306, 396, [(5, 10, 15, 5, u'foo '),
+                                              (6, 20, 15, 5, u'bah')])
+        reference_data = reference.blocks.to_dicts()
+
+        result = validator.validate_page(page, reference)
+        assert(result == {
+                'page': 1,
+                'boxes': 3,
+                'reference_boxes': 2,
+                'matched': 2,
+                'same_text': 1,
+                'mean_offset': 4.0,
+                'max_offset': 8.0,
+                'agreement': 0.8,
+        })
+        assert(reference.blocks == reference_data)
+
+        empty = create_page(2, 612, 792, [])
+        assert(validator.validate_page(empty, empty)['agreement'] == 1)
+        missing = create_page(3, 612, 792, [(0, 0, 10, 10, u'a')])
+        result = validator.validate_page(missing, empty)
+        assert(result['agreement'] == 0)
+        assert(result['mean_offset'] is None)
+
+        summary = validator.get_summary()
+        assert(summary == {
+                'pages': 3,
+                'boxes': 4,
+                'reference_boxes': 2,
+                'matched': 2,
+                'same_text': 1,
+                'mean_offset': 4.0,
+                'max_offset': 8.0,
+                'agreement': 2.0 / 3,
+                'min_agreement': 0,
+                'min_agreement_page': 3,
+        })
+
+        report = validator.__json__()
+        assert([p['page'] for p in report['pages']] == [1, 2, 3])
+        assert(report['document'] == summary)
+        assert(CrossValidator().get_summary()['min_agreement'] is None)
@@ -0,0 +1,133 @@
+#!/usr/bin/env
+
+# standard library imports
+import os
+import time
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..ExtractionCache import ExtractionCache
+from ..PDFPage import PDFPage
+
+
+def create_page(page_num, text=u'text'):
+
+    page = PDFPage()
+    page.page_num = page_num
+    page.width = 100
+    page.height = 200
+    page.data = [{'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': text}]
+
+    return page
+
+
+class TestExtractionCache(object):
+
+    @pytest.fixture
+    def pdf_file(self, tmpdir):
+
+        pdf_file = tmpdir.join('foo.pdf')
+        pdf_file.write('%PDF-1.4 foo')
+
+        return str(pdf_file)
+
+    def test_get_put(self, tmpdir, pdf_file):
+
+        cache = ExtractionCache(str(tmpdir.join('cache')))
+        assert(cache.get(pdf_file, 1, 'xpdf') is None)
+
+        cache.put(pdf_file, 1, 'xpdf', 1, create_page(1))
+        cache.put(pdf_file, 2, 'xpdf', 1, None)
+
+        assert(cache.contains(pdf_file, 1, 'xpdf'))
+        assert(not cache.contains(pdf_file, 2, 'xpdf'))
+
+        page = PDFPage.create_by_json(deserialized=cache.get(pdf_file, 1,
+                                                             'xpdf'))
+        assert(page.__json__() == create_page(1).__json__())
+
+    def test_key(self, tmpdir, pdf_file):
+
+        cache = ExtractionCache(str(tmpdir.join('cache')))
+        cache.put(pdf_file, 1, 'pdfjs', 1, create_page(1))
+
+        assert(cache.get(pdf_file, 2, 'pdfjs') is None)
+        assert(cache.get(pdf_file, 1, 'pdfjs-text') is None)
+        assert(cache.get(pdf_file, 1, 'pdfjs', 1.5) is None)
+
+        # another file with the same content hits
+        copied = tmpdir.join('bar.pdf')
+        copied.write('%PDF-1.4 foo')
+        assert(cache.get(str(copied), 1, 'pdfjs') is not None)
+
+        # a modified file misses
+        copied.write('%PDF-1.4 bar')
+        assert(cache.get(str(copied), 1, 'pdfjs') is None)
+
+    def test_evict(self, tmpdir, pdf_file):
+
+        size = len(create_page(1).serialize())
+        cache = ExtractionCache(str(tmpdir.join('cache')), size * 3)
+
+        for page_num in xrange(1, 4):
+            cache.put(pdf_file, page_num, 'xpdf', 1, create_page(page_num))
+            # mtime orders entries
+            time.sleep(0.01)
+
+        # page 1 is used recently
+        assert(cache.get(pdf_file, 1, 'xpdf') is not None)
+        cache.put(pdf_file, 4, 'xpdf', 1, create_page(4))
+
+        assert(cache.contains(pdf_file, 1, 'xpdf'))
+        assert(not cache.contains(pdf_file, 2, 'xpdf'))
+        assert(cache.contains(pdf_file, 4, 'xpdf'))
+
+    def test_overwrite(self, tmpdir, pdf_file):
+
+        size = len(create_page(1).serialize())
+        cache = ExtractionCache(str(tmpdir.join('cache')), size * 2)
+
+        cache.put(pdf_file, 1, 'xpdf', 1, create_page(1))
+        cache.put(pdf_file, 2, 'xpdf', 1, create_page(2))
+        for i in xrange(3):
+            cache.put(pdf_file, 2, 'xpdf', 1, create_page(2))
+
+        assert(cache._size == size * 2)
+        assert(cache.contains(pdf_file, 1, 'xpdf'))
+
+    def test_get_instance(self, tmpdir):
+
+        assert(ExtractionCache.get_instance() is None)
+
+        ExtractionCache.DIRNAME = str(tmpdir)
+        try:
+            cache = ExtractionCache.get_instance()
+            assert(cache.dirname == str(tmpdir))
+            assert(ExtractionCache.get_instance() is cache)
+        finally:
+            ExtractionCache.DIRNAME = None
+
+    def test_iter_by_xpdf(self, tmpdir, pdf_file, monkeypatch):
+
+        extracted = []
+        def iter_xpdf_runs(filename, runs, page_boxes, jobs=1, layout=False):
+            for first, last in runs:
+                for page_num in xrange(first, last + 1):
+                    extracted.append(page_num)
+                    yield create_page(page_num)
+
+        monkeypatch.setattr(PDFPage, '_iter_xpdf_runs',
+                            staticmethod(iter_xpdf_runs))
+        monkeypatch.setattr(ExtractionCache, 'DIRNAME', str(tmpdir))
+
+        boxes = [{}] * 6
+        pages = PDFPage.create_by_xpdf(pdf_file, [2, 3, 5], boxes)
+        assert([page.page_num for page in pages] == [2, 3, 5])
+        assert(extracted == [2, 3, 5])
+
+        del extracted[:]
+        pages = PDFPage.create_by_xpdf(pdf_file, None, boxes)
+        assert([page.page_num for page in pages] == [1, 2, 3, 4, 5, 6])
+        assert(extracted == [1, 4, 6])
@@ -0,0 +1,123 @@
+#!/usr/bin/env
+
+# standard library imports
+from contextlib import closing
+import os.path
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..LazyPDFDocument import LazyPDFDocument
+from ..PDFDocument import PDFDocument
+from ..PDFDocumentWriter import PDFDocumentWriter
+from ..PDFPage import PDFPage
+
+
+def create_document():
+
+    ret = PDFDocument('foo.pdf')
+    ret._PDFDocument__num_pages = 5
+    for page_ix in (0, 1, 3):
+        page = PDFPage()
+        page.page_num = page_ix + 1
+        page.width = 612
+        page.height = 792
+        page.data = [{'x': 10, 'y': 20, 'w': 30, 'h': 10,
+                      't': u'page%d' % page_ix}]
+        ret.add_page(page_ix, page)
+
+    return ret
+
+
+def write_ndjson(filename, pdf_doc, index=True):
+
+    with closing(open(filename, 'wb')) as f:
+        writer = PDFDocumentWriter(f, pdf_doc)
+        writer.write_document(pdf_doc)
+
+    if index:
+        writer.write_index(filename + PDFDocumentWriter.INDEX_EXT)
+
+
+class TestLazyPDFDocument(object):
+
+    def check_document(self, filename):
+
+        pdf_doc = create_document()
+        with LazyPDFDocument(filename) as lazy_doc:
+            assert(lazy_doc.num_pages == 5)
+            assert(lazy_doc.filename ==
+                   os.path.join(os.path.dirname(filename), 'foo.pdf'))
+            assert(len(lazy_doc.pages) == 4)
+
+            page = lazy_doc.pages[3]
+            assert(page.__json__() == pdf_doc.pages[3].__json__())
+            assert(lazy_doc.pages[2] is None)
+            assert(lazy_doc.get_page(3) is page)
+
+            assert([p and p.page_num for p in lazy_doc.pages] ==
+                   [1, 2, None, 4])
+            assert(lazy_doc.__json__()['data'] == pdf_doc.__json__()['data'])
+
+    def test_binary(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.bin'))
+        with closing(open(filename, 'wb')) as f:
+            f.write(create_document().serialize_binary())
+
+        self.check_document(filename)
+
+    def test_ndjson(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.ndjson'))
+        write_ndjson(filename, create_document())
+
+        with LazyPDFDocument(filename) as lazy_doc:
+            lazy_doc.get_page(1)
+            assert(lazy_doc._cache.keys() == [1])
+
+            # only the last CACHE_SIZE pages are kept
+            lazy_doc.CACHE_SIZE = 2
+            page = lazy_doc.get_page(3)
+            lazy_doc.get_page(0)
+            lazy_doc.get_page(1)
+            assert(lazy_doc._cache.keys() == [0, 1])
+            assert(lazy_doc.get_page(3) is not page)
+            assert(lazy_doc.get_page(3).__json__() == page.__json__())
+
+        self.check_document(filename)
+
+    def test_ndjson_without_index(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.ndjson'))
+        write_ndjson(filename, create_document(), index=False)
+        self.check_document(filename)
+
+        # an index of another document is ignored
+        other_doc = create_document()
+        other_doc.add_page(4, other_doc.pages[0])
+        write_ndjson(filename + '.other', other_doc)
+        os.rename(filename + '.other' + PDFDocumentWriter.INDEX_EXT,
+                  filename + PDFDocumentWriter.INDEX_EXT)
+        self.check_document(filename)
+
+    def test_json(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.json'))
+        with closing(open(filename, 'wb')) as f:
+            f.write(create_document().serialize())
+
+        self.check_document(filename)
+
+    def test_add_page(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.ndjson'))
+        write_ndjson(filename, create_document())
+
+        with LazyPDFDocument(filename) as lazy_doc:
+            lazy_doc.add_page(1, None)
+            lazy_doc.add_page(6, PDFPage())
+
+            assert(lazy_doc.pages[1] is None)
+            assert(len(lazy_doc.pages) == 7)
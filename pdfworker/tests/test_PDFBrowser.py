@@ -0,0 +1,58 @@
+#!/usr/bin/env
+
+# standard library imports
+import threading
+import time
+
+# third party related imports
+import pytest
+
+# local library imports
+from .. import PDFBrowser as PDFBrowserModule
+from ..PDFBrowser import PDFBrowser
+
+
+class HungBrowser(object):
+    """A WebDriver whose calls never return."""
+
+    class service(object):
+        class process(object):
+            pid = 12345
+
+    def __init__(self):
+
+        self.released = threading.Event()
+
+    def execute_script(self, script, *args):
+
+        self.released.wait()
+
+
+class TestPDFBrowser(object):
+
+    def test_hung_browser_in_thread(self, tmpdir, monkeypatch):
+
+        killed = []
+        monkeypatch.setattr(PDFBrowserModule, 'kill_process_tree',
+                            killed.append)
+
+        filename = tmpdir.join('foo.pdf')
+        filename.write('')
+        pdf_browser = PDFBrowser(str(filename))
+        pdf_browser.HEALTH_CHECK_TIMEOUT = 0.1
+        browser = pdf_browser.browser = HungBrowser()
+
+        result = []
+        def run():
+            start = time.time()
+            result.append(pdf_browser.is_alive())
+            result.append(time.time() - start < 1)
+
+        t = threading.Thread(target=run)
+        t.start()
+        t.join(5)
+        browser.released.set()
+
+        assert(result == [False, True])
+        assert(killed == [12345])
+        assert(pdf_browser.browser is None)
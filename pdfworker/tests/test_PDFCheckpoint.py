@@ -0,0 +1,99 @@
+#!/usr/bin/env
+
+# standard library imports
+import os
+import time
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFCheckpoint import PDFCheckpoint
+from ..PDFDocument import PDFDocument
+from ..PDFPage import PDFPage
+
+
+def create_page(page_num):
+
+    page = PDFPage()
+    page.page_num = page_num
+    page.width = 100
+    page.height = 200
+    page.data = [{'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': u'text'}]
+
+    return page
+
+
+class TestPDFCheckpoint(object):
+
+    @pytest.fixture
+    def pdf_file(self, tmpdir):
+
+        pdf_file = tmpdir.join('foo.pdf')
+        pdf_file.write('%PDF-1.4')
+
+        return str(pdf_file)
+
+    def test_resume(self, tmpdir, pdf_file):
+
+        dirname = str(tmpdir.join('checkpoint'))
+        checkpoint = PDFCheckpoint(dirname, pdf_file)
+        checkpoint.save_page(0, create_page(1))
+        checkpoint.save_page(2, create_page(3))
+        checkpoint.save_page(3, None)
+
+        pdf_doc = PDFDocument(pdf_file)
+        checkpoint = PDFCheckpoint(dirname, pdf_file)
+        assert(checkpoint.restore(pdf_doc) == set([0, 2]))
+
+        pages = pdf_doc.pages
+        assert(len(pages) == 3)
+        assert(pages[1] is None)
+        assert(pages[2].page_num == 3)
+        assert(pages[2].data == create_page(3).data)
+
+    def test_restore_wanted_pages(self, tmpdir, pdf_file):
+
+        checkpoint = PDFCheckpoint(str(tmpdir), pdf_file)
+        checkpoint.save_page(0, create_page(1))
+        checkpoint.save_page(1, create_page(2))
+
+        pdf_doc = PDFDocument(pdf_file)
+        assert(checkpoint.restore(pdf_doc, [1, 5]) == set([1]))
+        assert(pdf_doc.pages[0] is None)
+
+    def test_discard_other_run(self, tmpdir, pdf_file):
+
+        dirname = str(tmpdir.join('checkpoint'))
+        checkpoint = PDFCheckpoint(dirname, pdf_file)
+        checkpoint.save_page(0, create_page(1))
+
+        # another scale
+        checkpoint = PDFCheckpoint(dirname, pdf_file, scale=2)
+        assert(checkpoint.load_pages() == {})
+
+        checkpoint.save_page(0, create_page(1))
+        assert(len(PDFCheckpoint(dirname, pdf_file, 2).load_pages()) == 1)
+
+        # the pdf is modified
+        with open(pdf_file, 'ab') as f:
+            f.write('%%EOF')
+        assert(PDFCheckpoint(dirname, pdf_file, 2).load_pages() == {})
+
+        # another kind of pages
+        checkpoint = PDFCheckpoint(dirname, pdf_file)
+        checkpoint.save_page(0, create_page(1))
+        for kwargs in ({'text_only': True}, {}):
+            checkpoint = PDFCheckpoint(dirname, pdf_file, **kwargs)
+            assert(checkpoint.load_pages() == {})
+            checkpoint.save_page(0, create_page(1))
+            assert(len(PDFCheckpoint(dirname, pdf_file,
+                                     **kwargs).load_pages()) == 1)
+
+    def test_ignore_leftover(self, tmpdir, pdf_file):
+
+        checkpoint = PDFCheckpoint(str(tmpdir), pdf_file)
+        tmpdir.join('page-00000.json').write('{"page": 1, "da')
+        tmpdir.join('tmpabc.tmp').write('{}')
+
+        assert(checkpoint.load_pages() == {})
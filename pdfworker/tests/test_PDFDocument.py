@@ -0,0 +1,188 @@
+#!/usr/bin/env
+
+# standard library imports
+import os.path
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFDocument import PDFDocument
+from ..PDFPage import PDFPage
+from ..PDFPageTree import PDFPageTree
+from .test_PDFPageTree import OBJECTS, build_pdf, write
+
+
+PDFINFO_BOX = '''\
+Producer:       pdfTeX-1.40.3
+Pages:          2
+Page    1 size: 612 x 792 pts (letter)
+Page    1 rot:  0
+Page    1 MediaBox:     0.00     0.00   612.00   792.00
+Page    1 CropBox:     10.00    20.00   600.00   780.00
+Page    1 BleedBox:     0.00     0.00   612.00   792.00
+Page    1 TrimBox:      0.00     0.00   612.00   792.00
+Page    1 ArtBox:       0.00     0.00   612.00   792.00
+Page    2 size: 792 x 612 pts (letter)
+Page    2 rot:  90
+Page    2 MediaBox:     0.00     0.00   792.00   612.00
+Page    2 CropBox:      0.00     0.00   792.00   612.00
+Page    2 BleedBox:     0.00     0.00   792.00   612.00
+Page    2 TrimBox:      0.00     0.00   792.00   612.00
+Page    2 ArtBox:       0.00     0.00   792.00   612.00
+File size:      1000 bytes
+PDF version:    1.4
+'''
+
+
+class TestPDFDocument(object):
+
+    def test_parse_page_boxes(self):
+
+        page_boxes = PDFDocument.parse_page_boxes(PDFINFO_BOX, 2)
+
+        assert(len(page_boxes) == 2)
+        assert(sorted(page_boxes[0]) ==
+               ['art', 'bleed', 'crop', 'media', 'trim'])
+        assert(page_boxes[0]['media'] == [0, 0, 612, 792])
+        assert(page_boxes[0]['crop'] == [10, 20, 600, 780])
+        assert(page_boxes[1]['crop'] == [0, 0, 792, 612])
+
+    def test_parse_missing_pages(self):
+
+        page_boxes = PDFDocument.parse_page_boxes(PDFINFO_BOX, 3)
+
+        assert(len(page_boxes) == 3)
+        assert(page_boxes[2] == {})
+
+        page_boxes = PDFDocument.parse_page_boxes(PDFINFO_BOX, 1)
+        assert(len(page_boxes) == 1)
+        assert(page_boxes[0]['crop'] == [10, 20, 600, 780])
+
+    def test_binary(self):
+
+        page = PDFPage()
+        page.page_num = 3
+        page.width = 612
+        page.height = 792
+        page.data = [{'x': 10, 'y': 20, 'w': 30, 'h': 10, 't': u'\u4e2d'}]
+
+        pdf_doc = PDFDocument('foo.pdf')
+        pdf_doc._PDFDocument__num_pages = 4
+        pdf_doc.add_page(2, page)
+
+        for serialized in (pdf_doc.serialize_binary(), pdf_doc.serialize()):
+            unpacked = PDFDocument.deserialize(serialized)
+
+            assert(unpacked.extraction is None)
+            assert(unpacked.num_pages == 4)
+            assert(os.path.basename(unpacked.filename) == 'foo.pdf')
+            assert(unpacked.pages[:2] == [None, None])
+            assert(unpacked.pages[2].__json__() == page.__json__())
+
+        pdf_doc.extraction = PDFDocument.get_extraction('pdfjs', 2)
+        for serialized in (pdf_doc.serialize_binary(), pdf_doc.serialize()):
+            unpacked = PDFDocument.deserialize(serialized)
+
+            assert(unpacked.extraction == pdf_doc.extraction)
+            assert(unpacked.pages[2].__json__() == page.__json__())
+
+        with pytest.raises(ValueError):
+            PDFDocument.create_by_binary(pdf_doc.serialize_binary()[:-1])
+
+    def test_page_tree(self, tmpdir, monkeypatch):
+
+        def _check_output(args):
+            raise AssertionError('pdfinfo is run')
+
+        monkeypatch.setattr(PDFDocument.__module__ + '.check_output',
+                            _check_output)
+        pdf_doc = PDFDocument(write(tmpdir, build_pdf(OBJECTS)[0]))
+
+        assert(pdf_doc.num_pages == 3)
+        assert(sorted(pdf_doc.page_boxes[0]) ==
+               ['art', 'bleed', 'crop', 'media', 'trim'])
+        assert(pdf_doc.page_boxes[0]['crop'] == [10, 20, 600, 792])
+        assert(pdf_doc.page_boxes[1]['media'] == [0, 0, 792, 612])
+
+        box = PDFPage.get_page_box(pdf_doc.filename, 2, crop=True)
+        assert(box == {'media': [0, 0, 792, 612], 'crop': [0, 0, 792, 612]})
+        assert(PDFPage.get_page_box(pdf_doc.filename, 4) == {})
+
+    def test_read_once(self, tmpdir, monkeypatch):
+
+        page_trees = []
+        def _page_tree(filename):
+            page_trees.append(PDFPageTree(filename))
+            return page_trees[-1]
+
+        monkeypatch.setattr(PDFDocument.__module__ + '.PDFPageTree',
+                            _page_tree)
+        pdf_doc = PDFDocument(write(tmpdir, build_pdf(OBJECTS)[0]))
+
+        assert(pdf_doc.num_pages == 3)
+        for page_num in xrange(1, 4):
+            box = PDFPage.get_page_box(pdf_doc.filename, page_num,
+                                       page_boxes=pdf_doc.page_boxes)
+            assert(box['media'] == pdf_doc.page_boxes[page_num - 1]['media'])
+
+        # boxes don't fingerprint pages
+        assert(len(page_trees) == 1)
+        assert(page_trees[0]._fingerprints is None)
+
+        assert(len(pdf_doc.fingerprints) == 3)
+        assert(len(pdf_doc.fingerprints) == 3)
+        assert(len(page_trees) == 2)
+
+    def test_pdfinfo_fallback(self, tmpdir, monkeypatch):
+
+        def _check_output(args):
+            return PDFINFO_BOX
+
+        monkeypatch.setattr(PDFDocument.__module__ + '.check_output',
+                            _check_output)
+        pdf_doc = PDFDocument(write(tmpdir, 'not a pdf'))
+
+        assert(pdf_doc.num_pages == 2)
+        assert(pdf_doc.page_boxes[0]['crop'] == [10, 20, 600, 780])
+
+    def test_carry_over(self, tmpdir):
+
+        filename = write(tmpdir, build_pdf(OBJECTS)[0], 'previous.pdf')
+        previous = PDFDocument(filename)
+        for page_ix, fingerprint in enumerate(previous.fingerprints):
+            page = PDFPage()
+            page.page_num = page_ix + 1
+            page.fingerprint = fingerprint
+            previous.add_page(page_ix, page)
+
+        # change the first page, and swap the others
+        objects = dict(OBJECTS)
+        objects[6] = objects[6].replace('BT ET', 'BT 1 Tf ET')
+        objects[7] = '10'
+        objects[4] = objects[4].replace('[5 0 R 8 0 R]', '[8 0 R 5 0 R]')
+        pdf_doc = PDFDocument(write(tmpdir, build_pdf(objects)[0]))
+
+        assert(pdf_doc.carry_over(previous) == set([1, 2]))
+        assert(pdf_doc.pages[0] is None)
+        assert(pdf_doc.pages[1].fingerprint == previous.fingerprints[2])
+        assert(pdf_doc.pages[1].page_num == 2)
+        assert(pdf_doc.pages[2].fingerprint == previous.fingerprints[1])
+
+        pdf_doc = PDFDocument(pdf_doc.filename)
+        assert(pdf_doc.carry_over(previous, [0, 2]) == set([2]))
+
+        # pages at another scale aren't carried over
+        previous.extraction = PDFDocument.get_extraction('pdfjs', 2)
+        pdf_doc = PDFDocument(pdf_doc.filename)
+        pdf_doc.extraction = PDFDocument.get_extraction('pdfjs', 1)
+        assert(pdf_doc.carry_over(previous) == set())
+        assert(pdf_doc.pages == [])
+
+        pdf_doc.extraction = PDFDocument.get_extraction('pdfjs', 2.0)
+        assert(pdf_doc.carry_over(previous) == set([1, 2]))
+
+        pdf_doc = PDFDocument(write(tmpdir, 'not a pdf', 'bad.pdf'))
+        pdf_doc.extraction = previous.extraction
+        assert(pdf_doc.fingerprints is None)
+        assert(pdf_doc.carry_over(previous) == set())
@@ -0,0 +1,72 @@
+#!/usr/bin/env
+
+# standard library imports
+from StringIO import StringIO
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFDocument import PDFDocument
+from ..PDFDocumentReader import PDFDocumentReader
+from ..PDFDocumentWriter import PDFDocumentWriter
+from ..PDFPage import PDFPage
+
+
+def create_page(page_num, text):
+
+    ret = PDFPage()
+    ret.page_num = page_num
+    ret.width = 612
+    ret.height = 792
+    ret.data = [{'x': 10, 'y': 20, 'w': 30, 'h': 10, 't': text}]
+
+    return ret
+
+
+class TestPDFDocumentWriter(object):
+
+    def test_roundtrip(self):
+
+        pdf_doc = PDFDocument('foo.pdf')
+        pdf_doc._PDFDocument__num_pages = 5
+        pdf_doc.add_page(1, create_page(2, u'\u4e2d'))
+        pdf_doc.add_page(3, create_page(4, u'bar'))
+
+        f = StringIO()
+        writer = PDFDocumentWriter(f, pdf_doc)
+        writer.write_page(create_page(5, u'foo'))
+        writer.write_page(None, 2)
+        writer.write_document(pdf_doc)
+
+        lines = f.getvalue().splitlines()
+        assert(len(lines) == 4)
+        assert(writer.written == set([1, 3, 4]))
+
+        reader = PDFDocumentReader(StringIO(f.getvalue()))
+        assert(reader.header['page'] == 5)
+        assert([page_ix for page_ix, page_obj in reader] == [4, 1, 3])
+
+        unpacked = PDFDocumentReader(StringIO(f.getvalue())).read()
+        assert(unpacked.num_pages == 5)
+        assert(unpacked.pages[0] is None)
+        assert(unpacked.pages[1].data[0]['t'] == u'\u4e2d')
+        assert(unpacked.pages[4].__json__() ==
+               create_page(5, u'foo').__json__())
+
+    def test_bad_input(self):
+
+        with pytest.raises(ValueError):
+            PDFDocumentReader(StringIO(''))
+
+        pdf_doc = PDFDocument('foo.pdf')
+        pdf_doc._PDFDocument__num_pages = 1
+        pdf_doc.add_page(0, create_page(1, u'foo'))
+        with pytest.raises(ValueError):
+            PDFDocumentReader(StringIO(pdf_doc.serialize()))
+
+        f = StringIO()
+        PDFDocumentWriter(f, pdf_doc).write_document(pdf_doc)
+        reader = PDFDocumentReader(StringIO(f.getvalue()[:-10]))
+        with pytest.raises(ValueError):
+            list(reader)
@@ -0,0 +1,236 @@
+#!/usr/bin/env
+
+# standard library imports
+from StringIO import StringIO
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFPage import PDFPage
+
+
+BBOX_HTML = '''\
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" \
+"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<title></title>
+<meta name="Producer" content="pdfTeX-1.40.3"/>
+<meta http-equiv="Content-Type" content="text/html; charset=UTF-8"/>
+</head>
+<body>
+<doc>
+  <page width="612.000000" height="792.000000">
+    <word xMin="10.000000" yMin="20.000000" xMax="40.000000" \
+yMax="30.000000">R&amp;D</word>
+    <word xMin="50.000000" yMin="20.000000" xMax="60.000000" \
+yMax="32.000000">\xe4\xb8\xad</word>
+  </page>
+  <page width="792.000000" height="612.000000">
+  </page>
+</doc>
+</body>
+</html>
+'''
+
+
+BBOX_LAYOUT_HTML = '''\
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<title></title>
+</head>
+<body>
+<doc>
+  <page width="612.000000" height="792.000000">
+    <flow>
+      <block xMin="10.0" yMin="20.0" xMax="60.0" yMax="45.0">
+        <line xMin="10.0" yMin="20.0" xMax="60.0" yMax="30.0">
+          <word xMin="10.0" yMin="20.0" xMax="30.0" yMax="30.0">foo</word>
+          <word xMin="40.0" yMin="20.0" xMax="60.0" yMax="30.0">bar</word>
+        </line>
+        <line xMin="10.0" yMin="35.0" xMax="30.0" yMax="45.0">
+          <word xMin="10.0" yMin="35.0" xMax="30.0" yMax="45.0">baz</word>
+        </line>
+      </block>
+    </flow>
+    <flow>
+      <block xMin="100.0" yMin="20.0" xMax="120.0" yMax="30.0">
+        <line xMin="100.0" yMin="20.0" xMax="120.0" yMax="30.0">
+          <word xMin="100.0" yMin="20.0" xMax="120.0" yMax="30.0">qux</word>
+        </line>
+      </block>
+    </flow>
+  </page>
+</doc>
+</body>
+</html>
+'''
+
+
+class TestPDFPage(object):
+
+    def test_create_by_text_layer(self):
+
+        dom_text = (
+            '<div style="font-size: 20px; left: 10px; top: 5px; '
+            'transform: scale(0.9, 1);" data-canvas-width="50">foo</div>'
+            '<div style="font-size: 10px; left: 30px; top: 40px; '
+            '-webkit-transform: scale(1.1, 1);" '
+            'data-canvas-width="20">bar</div>'
+            '<div style="font-size: 10px; left: 300px; top: 40px; '
+            'transform: scale(1, 1);" data-canvas-width="20">out</div>'
+        )
+        blocks = [
+            [10, 5, 20, 50, 0.9, 1, u'foo'],
+            [30, 40, 10, 20, 1.1, 1, u'bar'],
+            [300, 40, 10, 20, 1, 1, u'out'],
+        ]
+
+        expected = PDFPage.create_by_pdfjs(1, 200, 100, dom_text)
+        page = PDFPage.create_by_text_layer(1, 200, 100, blocks)
+
+        assert(page.__json__() == expected.__json__())
+        assert(len(page.data) == 2)
+
+    def test_iter_bbox_pages(self):
+
+        pages = list(PDFPage.iter_bbox_pages(StringIO(BBOX_HTML)))
+
+        assert(len(pages) == 2)
+        assert(pages[0]['page'] == 1)
+        assert(pages[0]['width'] == 612)
+        assert(pages[0]['data'] == [
+            {'x': 10, 'y': 20, 'w': 30, 'h': 10, 't': 'R&D'},
+            {'x': 50, 'y': 20, 'w': 10, 'h': 12, 't': u'\u4e2d'},
+        ])
+        assert(pages[1]['page'] == 2)
+        assert(pages[1]['height'] == 612)
+        assert(pages[1]['data'] == [])
+
+    def test_layout(self):
+
+        pages = PDFPage.iter_bbox_pages(StringIO(BBOX_LAYOUT_HTML), True)
+        page = PDFPage.create_by_json(deserialized=next(pages))
+
+        assert([word['t'] for word in page.data] ==
+               ['foo', 'bar', 'baz', 'qux'])
+        assert(page.get_text_boxes('word') is page.data)
+        assert(page.get_text_boxes('line') == [
+            {'x': 10, 'y': 20, 'w': 50, 'h': 10, 't': 'foo bar'},
+            {'x': 10, 'y': 35, 'w': 20, 'h': 10, 't': 'baz'},
+            {'x': 100, 'y': 20, 'w': 20, 'h': 10, 't': 'qux'},
+        ])
+        assert(page.get_text_boxes('block') == [
+            {'x': 10, 'y': 20, 'w': 50, 'h': 25, 't': 'foo bar baz'},
+            {'x': 100, 'y': 20, 'w': 20, 'h': 10, 't': 'qux'},
+        ])
+
+        page.scale(2, 1)
+        assert(page.data[1]['x'] == 80)
+        assert(page.get_text_boxes('block')[0]['w'] == 100)
+
+        page = PDFPage.create_by_json(page.serialize())
+        assert(page.get_text_boxes('line')[2]['x'] == 200)
+
+    def test_no_layout(self):
+
+        pages = PDFPage.iter_bbox_pages(StringIO(BBOX_HTML))
+        page = PDFPage.create_by_json(deserialized=next(pages))
+
+        assert('layout' not in page.__json__())
+        with pytest.raises(ValueError):
+            page.get_text_boxes('line')
+        with pytest.raises(ValueError):
+            page.get_text_boxes('paragraph')
+
+    def test_binary(self):
+
+        pages = PDFPage.iter_bbox_pages(StringIO(BBOX_LAYOUT_HTML), True)
+        page = PDFPage.create_by_json(deserialized=next(pages))
+
+        page.fingerprint = '0123456789abcdef0123456789abcdef01234567'
+        serialized = page.serialize_binary()
+        assert(len(serialized) < len(page.serialize()))
+
+        unpacked = PDFPage.deserialize(serialized)
+        assert(unpacked.__json__() == page.__json__())
+        assert(PDFPage.deserialize(page.serialize()).__json__() ==
+               page.__json__())
+
+        empty = PDFPage.create_by_binary(PDFPage().serialize_binary())
+        assert(empty.data is None)
+        assert(empty.layout is None)
+
+        with pytest.raises(ValueError):
+            PDFPage.create_by_binary('PDFX' + serialized[4:])
+        with pytest.raises(ValueError):
+            PDFPage.create_by_binary(serialized[:-1])
+
+    def test_iter_by_xpdf(self, monkeypatch):
+
+        page_boxes = [{'media': [0, 0, 612, 792], 'crop': [0, 0, 612, 792]}
+                      for i in xrange(3)]
+        runs = []
+
+        def iter_xpdf_range(cls, filename, first, last, boxes, layout=False):
+            runs.append((first, last))
+            assert(len(boxes) == last - first + 1)
+            for page_num in xrange(first, last + 1):
+                page = PDFPage()
+                page.page_num = page_num
+                yield page
+
+        monkeypatch.setattr(PDFPage, '_iter_xpdf_range',
+                            classmethod(iter_xpdf_range))
+
+        # page numbers out of the document are skipped
+        pages = PDFPage.iter_by_xpdf('foo.pdf', [0, 1, 2], page_boxes)
+        assert([p.page_num for p in pages] == [1, 2])
+        assert(runs == [(1, 2)])
+
+        del runs[:]
+        pages = PDFPage.iter_by_xpdf('foo.pdf', range(1, 5), page_boxes)
+        assert([p.page_num for p in pages] == [1, 2, 3])
+        assert(runs == [(1, 3)])
+
+        with pytest.raises(RuntimeError):
+            PDFPage.create_by_xpdf('foo.pdf', [0, 1], page_boxes)
+
+    def test_data(self):
+
+        page = PDFPage.create_by_json(deserialized={
+                'page': 1, 'width': 100, 'height': 100,
+                'data': [{'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': None},
+                         {'x': 5, 'y': 6, 'w': 7, 'h': 8, 't': u'foo'}]})
+        assert(len(page.blocks) == 2)
+        assert(page.__json__()['data'][0]['t'] is None)
+        assert(PDFPage.deserialize(page.serialize_binary()).data ==
+               page.data)
+
+        # data is a list changed in place
+        page.data[1]['t'] = u'bar'
+        page.data.insert(0, {'x': 0, 'y': 0, 'w': 1, 'h': 1, 't': u'baz'})
+        page.data.sort(key=lambda block: block['x'], reverse=True)
+        del page.data[0]
+        assert([block['t'] for block in page.data] == [None, u'baz'])
+        assert(page.data + [] == page.data[:])
+        assert(page.blocks == page.data)
+        assert(PDFPage.deserialize(page.serialize()).data == page.data)
+
+        page.scale(2, 1)
+        assert(page.data[0]['x'] == 2)
+        assert(page.__json__()['data'][1]['w'] == 2)
+
+    def test_data_keys(self):
+
+        # blocks with other keys are kept as they are
+        page = PDFPage.create_by_json(
+                '{"data": [{"x": 1, "y": 2, "w": 3, "h": 4, "t": "a", '
+                '"font": "F1"}]}')
+        assert(page.data == [{'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': u'a',
+                              'font': u'F1'}])
+        assert(isinstance(page.data[0]['x'], int))
+
+        with pytest.raises(ValueError):
+            PDFPage.create_by_json('{"data": [{"x": 1, "y": 2, "t": "a"}]}')
@@ -0,0 +1,262 @@
+#!/usr/bin/env
+
+# standard library imports
+from contextlib import closing
+import zlib
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFPageTree import PDFName, PDFPageTree, PDFPageTreeError, PDFRef
+
+
+# A catalog, a page tree of 3 pages with inherited attributes, and a
+# content stream whose Length is a reference
+OBJECTS = {
+    1: '<< /Type /Catalog /Pages 2 0 R >>',
+    2: ('<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 3 '
+        '/MediaBox [0 0 612 792] /Rotate 90 >>'),
+    3: ('<< /Type /Page /Parent 2 0 R /CropBox [10 20 600 800] '
+        '/Contents 6 0 R /Title (a \\(nested\\) \\101 string) >>'),
+    4: ('<< /Type /Pages /Parent 2 0 R /Kids [5 0 R 8 0 R] /Count 2 '
+        '/MediaBox [792 612 0 0] >>'),
+    5: ('<< /Type /Page /Parent 4 0 R /Rotate -90 /TrimBox [0 0 100 100] '
+        '/Name /A#20B /Key <48656c6c6f> >>'),
+    6: '<< /Length 7 0 R >>\nstream\nBT ET\nendstream',
+    7: '5',
+    8: '<< /Type /Page /Parent 4 0 R /MediaBox [0 0 100 200.5] >>',
+}
+
+
+def build_pdf(objects, size=None):
+    """Build a pdf with an xref table.
+
+    Returns:
+        A (data, offsets) tuple, where offsets maps object numbers to
+        their offsets.
+
+    """
+
+    data = '%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(data)
+        data += '%d 0 obj\n%s\nendobj\n' % (num, objects[num])
+
+    size = size or max(objects) + 1
+    xref_offset = len(data)
+    data += 'xref\n0 %d\n0000000000 65535 f \n' % size
+    for num in xrange(1, size):
+        if num in offsets:
+            data += '%010d 00000 n \n' % offsets[num]
+        else:
+            data += '0000000000 65535 f \n'
+    data += 'trailer\n<< /Size %d /Root 1 0 R >>\n' % size
+    data += 'startxref\n%d\n%%%%EOF\n' % xref_offset
+
+    return data, offsets
+
+
+def encode_up_predictor(rows):
+    """Encode rows by the PNG up predictor."""
+
+    ret = []
+    prev = bytearray(len(rows[0]))
+    for row in rows:
+        row = bytearray(row)
+        ret.append('\x02' + str(bytearray((b - p) & 0xff
+                                          for b, p in zip(row, prev))))
+        prev = row
+
+    return ''.join(ret)
+
+
+def build_compressed_pdf(objects, compressed):
+    """Build a pdf with an xref stream and an object stream.
+
+    Args:
+        objects: A dict mapping object numbers to their source.
+        compressed: The numbers of the objects put in the object stream.
+
+    """
+
+    data = '%PDF-1.5\n'
+    offsets = {}
+    for num in sorted(objects):
+        if num not in compressed:
+            offsets[num] = len(data)
+            data += '%d 0 obj\n%s\nendobj\n' % (num, objects[num])
+
+    stream_num = max(objects) + 1
+    xref_num = stream_num + 1
+
+    header = []
+    body = ''
+    for num in sorted(compressed):
+        header.append('%d %d' % (num, len(body)))
+        body += objects[num] + '\n'
+    header = ' '.join(header) + '\n'
+    stream = zlib.compress(header + body)
+
+    offsets[stream_num] = len(data)
+    data += ('%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Length %d '
+             '/Filter /FlateDecode >>\nstream\n%s\nendstream\nendobj\n' %
+             (stream_num, len(compressed), len(header), len(stream),
+              stream))
+
+    rows = ['\x00\x00\x00\x00\x00\xff']
+    stream_ix = dict((num, ix) for ix, num in enumerate(sorted(compressed)))
+    for num in xrange(1, xref_num + 1):
+        if num in stream_ix:
+            row = '\x02%s%s' % (('%08x' % stream_num).decode('hex'),
+                                chr(stream_ix[num]))
+        elif num == xref_num:
+            row = '\x01%s\x00' % ('%08x' % len(data)).decode('hex')
+        elif num in offsets:
+            row = '\x01%s\x00' % ('%08x' % offsets[num]).decode('hex')
+        else:
+            row = '\x00\x00\x00\x00\x00\x00'
+        rows.append(row)
+
+    xref = zlib.compress(encode_up_predictor(rows))
+    xref_offset = len(data)
+    data += ('%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 1] /Root 1 0 R '
+             '/Filter /FlateDecode /DecodeParms << /Predictor 12 '
+             '/Columns 6 >> /Length %d >>\nstream\n%s\nendstream\n'
+             'endobj\n' % (xref_num, xref_num + 1, len(xref), xref))
+    data += 'startxref\n%d\n%%%%EOF\n' % xref_offset
+
+    return data
+
+
+EXPECTED_PAGES = [
+    {'media': [0, 0, 612, 792], 'crop': [10, 20, 600, 792],
+     'bleed': [10, 20, 600, 792], 'trim': [10, 20, 600, 792],
+     'art': [10, 20, 600, 792], 'rotate': 90},
+    {'media': [0, 0, 792, 612], 'crop': [0, 0, 792, 612],
+     'bleed': [0, 0, 792, 612], 'trim': [0, 0, 100, 100],
+     'art': [0, 0, 792, 612], 'rotate': 270},
+    {'media': [0, 0, 100, 200.5], 'crop': [0, 0, 100, 200.5],
+     'bleed': [0, 0, 100, 200.5], 'trim': [0, 0, 100, 200.5],
+     'art': [0, 0, 100, 200.5], 'rotate': 90},
+]
+
+
+def write(tmpdir, data, basename='foo.pdf'):
+
+    filename = str(tmpdir.join(basename))
+    with closing(open(filename, 'wb')) as f:
+        f.write(data)
+
+    return filename
+
+
+class TestPDFPageTree(object):
+
+    def test_xref_table(self, tmpdir):
+
+        filename = write(tmpdir, build_pdf(OBJECTS)[0])
+
+        with PDFPageTree(filename) as page_tree:
+            assert(page_tree.num_pages == 3)
+            assert(page_tree.pages == EXPECTED_PAGES)
+
+            page = page_tree.get_object(3)
+            assert(page['Title'] == 'a (nested) A string')
+            assert(page['Contents'] == PDFRef(6, 0))
+            assert(page_tree.get_object(6).data == 'BT ET')
+
+            page = page_tree.get_object(5)
+            assert(isinstance(page['Name'], PDFName))
+            assert(page['Name'] == 'A B')
+            assert(page['Key'] == 'Hello')
+
+    def test_xref_stream(self, tmpdir):
+
+        data = build_compressed_pdf(OBJECTS, set([2, 3, 4, 7]))
+        filename = write(tmpdir, data)
+
+        assert(PDFPageTree.read_pages(filename) == EXPECTED_PAGES)
+
+    def test_incremental_update(self, tmpdir):
+
+        data, offsets = build_pdf(OBJECTS)
+        prev = data.rindex('\nxref\n') + 1
+
+        # replace the media box of the last page
+        offset = len(data)
+        data += '8 0 obj\n<< /Type /Page /Parent 4 0 R >>\nendobj\n'
+        xref_offset = len(data)
+        data += ('xref\n8 1\n%010d 00000 n \ntrailer\n'
+                 '<< /Size 9 /Root 1 0 R /Prev %d >>\n'
+                 'startxref\n%d\n%%%%EOF\n' % (offset, prev, xref_offset))
+        filename = write(tmpdir, data)
+
+        pages = PDFPageTree.read_pages(filename)
+        assert(pages[:2] == EXPECTED_PAGES[:2])
+        assert(pages[2]['media'] == [0, 0, 792, 612])
+
+    def test_png_predictor(self):
+
+        rows = ['\x01\x02\x03', '\x04\x00\xff', '\x04\x00\xff']
+        assert(PDFPageTree._undo_png_predictor(encode_up_predictor(rows),
+                                               3, 1, 8) == ''.join(rows))
+
+        # sub, average and paeth of 2 bytes per pixel
+        data = '\x01\x01\x02\x01\x01' + '\x03\x01\x01\x01\x01' + \
+               '\x04\x00\x00\x01\x01'
+        assert(PDFPageTree._undo_png_predictor(data, 2, 1, 16) ==
+               '\x01\x02\x02\x03' + '\x01\x02\x02\x03' +
+               '\x01\x02\x03\x04')
+
+    def test_bad_pdf(self, tmpdir):
+
+        with pytest.raises(PDFPageTreeError):
+            PDFPageTree(write(tmpdir, 'not a pdf'))
+        with pytest.raises(PDFPageTreeError):
+            PDFPageTree(write(tmpdir, '', 'empty.pdf'))
+        with pytest.raises(PDFPageTreeError):
+            PDFPageTree(str(tmpdir.join('missing.pdf')))
+
+        # a cycle in the page tree
+        objects = dict(OBJECTS)
+        objects[4] = '<< /Type /Pages /Kids [2 0 R] /Count 1 >>'
+        filename = write(tmpdir, build_pdf(objects)[0])
+        with pytest.raises(PDFPageTreeError):
+            PDFPageTree.read_pages(filename)
+
+        # a page tree node which doesn't exist
+        objects = dict(OBJECTS)
+        del objects[8]
+        filename = write(tmpdir, build_pdf(objects, 9)[0])
+        with pytest.raises(PDFPageTreeError):
+            PDFPageTree.read_pages(filename)
+
+    def test_fingerprints(self, tmpdir):
+
+        fingerprints = PDFPageTree.read_fingerprints(
+                write(tmpdir, build_pdf(OBJECTS)[0]))
+        assert(len(fingerprints) == 3)
+        assert(len(set(fingerprints)) == 3)
+
+        # stored differently
+        data = build_compressed_pdf(OBJECTS, set([2, 3, 4, 7]))
+        assert(PDFPageTree.read_fingerprints(write(tmpdir, data)) ==
+               fingerprints)
+
+        # numbered differently
+        objects = dict(OBJECTS)
+        objects[3] = objects[3].replace('6 0 R', '9 0 R')
+        objects[9] = objects.pop(6)
+        assert(PDFPageTree.read_fingerprints(
+                write(tmpdir, build_pdf(objects)[0])) == fingerprints)
+
+        # another content of the first page
+        objects = dict(OBJECTS)
+        objects[6] = objects[6].replace('BT ET', 'BT 1 Tf ET')
+        objects[7] = '10'
+        changed = PDFPageTree.read_fingerprints(
+                write(tmpdir, build_pdf(objects)[0]))
+        assert(changed[0] != fingerprints[0])
+        assert(changed[1:] == fingerprints[1:])
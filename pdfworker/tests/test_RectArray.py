@@ -0,0 +1,100 @@
+#!/usr/bin/env
+
+# standard library imports
+import random
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..PDFPage import PDFPage
+from ..RectArray import RectArray
+from ..Rectangle import Rectangle, TextRectangle
+
+
+def create_rects(n, seed=42):
+    """Rectangles of integer geometry, so that some of them touch."""
+
+    rand = random.Random(seed)
+
+    return [Rectangle(rand.randint(-20, 100), rand.randint(-20, 100),
+                      rand.randint(1, 30), rand.randint(1, 30))
+            for i in xrange(n)]
+
+
+class TestRectArray(object):
+
+    def test_create(self):
+
+        rects = create_rects(10)
+        rect_array = RectArray.create(rects)
+        assert(len(rect_array) == 10)
+        assert(list(rect_array) == rects)
+        assert(rect_array[-1] == rects[-1])
+        assert(list(rect_array[2:5]) == rects[2:5])
+        assert(list(rect_array.take([3, 1])) == [rects[3], rects[1]])
+        assert(rect_array.t is None)
+        with pytest.raises(IndexError):
+            rect_array[10]
+
+        text_rects = [TextRectangle(1, 2, 3, 4, u'foo'),
+                      TextRectangle(5, 6, 7, 8, u'\u4e2d')]
+        rect_array = RectArray.create(text_rects)
+        assert(rect_array[1].t == u'\u4e2d')
+        assert(len(RectArray.create([])) == 0)
+
+        with pytest.raises(ValueError):
+            RectArray([1, 2], [1], [1], [1])
+
+    def test_blocks(self):
+
+        page = PDFPage()
+        page.data = [{'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': u'foo'},
+                     {'x': 5, 'y': 6, 'w': 7, 'h': 8, 't': u'\u4e2d'}]
+        rect_array = RectArray.create_by_blocks(page.data)
+        assert(list(rect_array) == [Rectangle(1, 2, 3, 4),
+                                    Rectangle(5, 6, 7, 8)])
+        assert(rect_array[1].t == u'\u4e2d')
+
+        page.data = rect_array.take([1]).to_blocks()
+        assert(page.data == [{'x': 5, 'y': 6, 'w': 7, 'h': 8,
+                              't': u'\u4e2d'}])
+        assert(RectArray([1], [2], [3], [4]).to_blocks().get_text(0) == u'')
+
+    def test_geometry(self):
+
+        rects = create_rects(60)
+        rect_array = RectArray.create(rects)
+
+        assert(list(rect_array.area) == [r.area for r in rects])
+
+        union = rects[0]
+        for r in rects[1:]:
+            union = union | r
+        assert(rect_array.union() == union)
+        assert(rect_array.union([4, 2]) == rects[4] | rects[2])
+        with pytest.raises(ValueError):
+            rect_array.union([])
+
+        distances = rect_array.distance_matrix()
+        x_distances = rect_array.x_distance_matrix()
+        y_distances = rect_array.y_distance_matrix()
+        for i, r1 in enumerate(rects):
+            for j, r2 in enumerate(rects):
+                assert(distances[i][j] == r1.distance(r2))
+                assert(x_distances[i][j] == r1.x_distance(r2))
+                assert(y_distances[i][j] == r1.y_distance(r2))
+
+        other = RectArray.create(create_rects(5, 7))
+        assert(rect_array.distance_matrix(other)[3] ==
+               other.distance(rects[3]))
+        assert(len(rect_array.x_distance_matrix(other)) == 60)
+
+    def test_intersect_pairs(self):
+
+        rects = create_rects(200)
+        expected = [(i, j) for i, r1 in enumerate(rects)
+                           for j, r2 in enumerate(rects)
+                           if i < j and r1.intersect(r2) is not None]
+        assert(RectArray.create(rects).intersect_pairs() == expected)
+        assert(RectArray().intersect_pairs() == [])
@@ -0,0 +1,127 @@
+#!/usr/bin/env
+
+# standard library imports
+import copy
+import pickle
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..TextBlocks import TextBlocks
+
+
+BLOCKS = [
+    {'x': 10., 'y': 20., 'w': 30., 'h': 10., 't': u'foo'},
+    {'x': -50., 'y': 20., 'w': 30., 'h': 10., 't': u'\u4e2d\u6587'},
+    {'x': 50., 'y': 190., 'w': 20., 'h': 12., 't': u''},
+]
+
+
+class TestTextBlocks(object):
+
+    def test_create(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+
+        assert(len(blocks) == 3)
+        assert(not blocks.has_scale)
+        assert(blocks[1] == BLOCKS[1])
+        assert(blocks[-1] == BLOCKS[2])
+        assert(list(blocks) == BLOCKS)
+        assert(blocks == BLOCKS)
+        assert(blocks.get_text(1) == u'\u4e2d\u6587')
+        assert(TextBlocks.create(blocks) is blocks)
+
+        with pytest.raises(IndexError):
+            blocks[3]
+
+    def test_none_text(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+        blocks.append({'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': None})
+        blocks.append({'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': u'bar'})
+
+        assert(blocks[3]['t'] is None)
+        assert(blocks[2]['t'] == u'')
+        assert(blocks.get_text(4) == u'bar')
+        assert(blocks[3:][0]['t'] is None)
+
+        unpacked, end = TextBlocks.create_by_binary(blocks.to_binary(), 0,
+                                                    len(blocks), False)
+        assert(unpacked == blocks)
+        assert(unpacked[3]['t'] is None)
+
+    def test_scale_columns(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+        blocks.append({'x': 1, 'y': 2, 'w': 3, 'h': 4, 't': u'bar',
+                       'sx': 0.5, 'sy': 2})
+
+        assert(blocks.has_scale)
+        assert(blocks[0]['sx'] == 1)
+        assert(blocks[3]['sy'] == 2)
+
+        blocks = TextBlocks.create_by_columns([1, 2], [3, 4], [5, 6], [7, 8],
+                                              ['a', None], [1, 2], [3, 4])
+        assert(blocks[1] == {'x': 2, 'y': 4, 'w': 6, 'h': 8, 't': None,
+                             'sx': 2, 'sy': 4})
+
+    def test_missing_geometry(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+        with pytest.raises(ValueError):
+            blocks.append({'x': 1, 'y': 2, 't': u'a'})
+
+        assert(blocks == BLOCKS)
+
+    def test_slice(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+
+        assert(blocks[1:] == BLOCKS[1:])
+        assert(blocks[::2] == BLOCKS[::2])
+        assert(blocks[5:] == [])
+
+    def test_scale(self):
+
+        blocks = TextBlocks.create_by_columns([10], [20], [30], [40], ['a'],
+                                              [1], [1])
+        blocks.scale(2, 0.5)
+
+        assert(blocks[0] == {'x': 20, 'y': 10, 'w': 60, 'h': 20, 't': u'a',
+                             'sx': 2, 'sy': 0.5})
+
+    def test_filter_in_bounds(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+
+        assert(blocks.filter_in_bounds(100, 200) == [BLOCKS[0], BLOCKS[2]])
+        assert(blocks.filter_in_bounds(100, 100) == [BLOCKS[0]])
+        assert(blocks.filter_in_bounds(0, 0) == [])
+
+    def test_copy(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+
+        assert(copy.deepcopy(blocks) == blocks)
+        assert(pickle.loads(pickle.dumps(blocks, 2)) == blocks)
+
+    def test_binary(self):
+
+        blocks = TextBlocks.create(BLOCKS)
+        data = 'head' + blocks.to_binary()
+
+        unpacked, end = TextBlocks.create_by_binary(data, 4, len(BLOCKS),
+                                                    False)
+        assert(unpacked == blocks)
+        assert(end == len(data))
+
+        blocks = TextBlocks.create_by_columns([1.5], [2], [3], [4], ['a'],
+                                              [0.5], [2])
+        unpacked, end = TextBlocks.create_by_binary(blocks.to_binary(), 0,
+                                                    1, True)
+        assert(unpacked == blocks)
+
+        with pytest.raises(ValueError):
+            TextBlocks.create_by_binary(data[:-1], 4, len(BLOCKS), False)
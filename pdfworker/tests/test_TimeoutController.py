@@ -0,0 +1,82 @@
+#!/usr/bin/env
+
+# standard library imports
+
+# third party related imports
+
+# local library imports
+from ..TimeoutController import TimeoutController
+
+
+class TestTimeoutController(object):
+
+    def test_initial_timeout(self):
+
+        ctrl = TimeoutController(15, min_samples=3)
+        assert(ctrl.get_timeout() == 15)
+
+        ctrl.record(1)
+        ctrl.record(1)
+        assert(ctrl.get_timeout() == 15)
+
+        ctrl.record(1)
+        assert(ctrl.get_timeout() == 3)
+
+    def test_percentile(self):
+
+        ctrl = TimeoutController(15, min_timeout=0, percentile=0.9,
+                                 factor=1, min_samples=1)
+        for latency in xrange(1, 11):
+            ctrl.record(latency)
+
+        assert(ctrl.get_percentile() == 9)
+        assert(ctrl.get_timeout() == 9)
+
+    def test_outlier_expires(self):
+
+        ctrl = TimeoutController(15, min_timeout=0, percentile=1,
+                                 factor=1, window=3, min_samples=1)
+        ctrl.record(30)
+        assert(ctrl.get_timeout() == 30)
+
+        for _ in xrange(3):
+            ctrl.record(2)
+
+        assert(len(ctrl) == 3)
+        assert(ctrl.get_timeout() == 2)
+
+    def test_clamp(self):
+
+        ctrl = TimeoutController(15, min_timeout=2, max_timeout=10,
+                                 min_samples=1)
+        ctrl.record(0.01)
+        assert(ctrl.get_timeout() == 2)
+
+        ctrl.record(100)
+        assert(ctrl.get_timeout() == 10)
+
+    def test_retry(self):
+
+        ctrl = TimeoutController(5, max_timeout=30, max_retries=5)
+        assert(ctrl.get_timeout(1) == 10)
+        assert(ctrl.get_timeout(2) == 20)
+        assert(ctrl.get_timeout(3) == 30)
+
+        assert(ctrl.can_retry(1))
+        assert(ctrl.can_retry(3))
+        # the third try already waited max_timeout
+        assert(not ctrl.can_retry(4))
+
+        ctrl = TimeoutController(1, max_timeout=60, max_retries=2)
+        assert(ctrl.can_retry(2))
+        assert(not ctrl.can_retry(3))
+
+    def test_reset(self):
+
+        ctrl = TimeoutController(15, min_samples=1)
+        ctrl.record(1)
+        ctrl.reset()
+
+        assert(len(ctrl) == 0)
+        assert(ctrl.get_percentile() is None)
+        assert(ctrl.get_timeout() == 15)
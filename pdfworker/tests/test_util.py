@@ -0,0 +1,309 @@
+#!/usr/bin/env
+
+# standard library imports
+import os
+import stat
+import subprocess
+import threading
+import time
+
+# third party related imports
+import pytest
+
+# local library imports
+from ..util import (atomic_write, call_with_time_limit, check_call,
+                    check_deadline, check_output, coalesce_ranges, deadline,
+                    get_process_tree_rss, kill_process_tree, open_output,
+                    remaining_time, split_ranges, time_limit,
+                    TimeLimitException)
+
+
+class TestDeadline(object):
+
+    def test_remaining_time(self):
+
+        assert(remaining_time() is None)
+        assert(remaining_time(5) == 5)
+
+        with deadline(10):
+            assert(9 < remaining_time() <= 10)
+
+            # an inner deadline never expires later than the outer one
+            with deadline(100):
+                assert(remaining_time() <= 10)
+
+            with deadline(1):
+                assert(remaining_time() <= 1)
+
+            assert(remaining_time() > 1)
+
+        assert(remaining_time() is None)
+
+    def test_check_deadline(self):
+
+        check_deadline()
+
+        with deadline(0.01):
+            check_deadline()
+            time.sleep(0.02)
+            with pytest.raises(TimeLimitException):
+                check_deadline()
+
+    def test_per_thread(self):
+
+        result = []
+        def run():
+            result.append(remaining_time())
+
+        with deadline(10):
+            t = threading.Thread(target=run)
+            t.start()
+            t.join()
+
+        assert(result == [None])
+
+
+class TestTimeLimit(object):
+
+    def test_sub_second(self):
+
+        start = time.time()
+        with pytest.raises(TimeLimitException):
+            with time_limit(0.1):
+                time.sleep(2)
+
+        assert(time.time() - start < 1)
+
+    def test_nested(self):
+
+        with time_limit(0.5):
+            with pytest.raises(TimeLimitException):
+                with time_limit(0.05):
+                    time.sleep(1)
+
+            # the outer limit is still in effect
+            start = time.time()
+            with pytest.raises(TimeLimitException):
+                time.sleep(2)
+
+            assert(time.time() - start < 1)
+
+    def test_no_limit(self):
+
+        with time_limit(0):
+            time.sleep(0.05)
+
+        with time_limit(0.5):
+            with time_limit(None):
+                with pytest.raises(TimeLimitException):
+                    time.sleep(2)
+
+    def test_thread(self):
+
+        result = []
+        def run():
+            try:
+                with time_limit(0.05):
+                    time.sleep(0.1)
+            except TimeLimitException:
+                result.append('timeout')
+
+            with time_limit(1):
+                result.append('ok')
+
+        t = threading.Thread(target=run)
+        t.start()
+        t.join()
+
+        assert(result == ['timeout', 'ok'])
+
+
+class TestCallWithTimeLimit(object):
+
+    def test_main_thread(self):
+
+        assert(call_with_time_limit(1, max, 1, 2) == 2)
+
+        with pytest.raises(TimeLimitException):
+            call_with_time_limit(0.05, time.sleep, 1)
+
+    def test_thread(self):
+
+        hung = threading.Event()
+        result = []
+        def run():
+            result.append(call_with_time_limit(1, max, 1, 2))
+
+            start = time.time()
+            try:
+                call_with_time_limit(0.05, hung.wait)
+            except TimeLimitException:
+                result.append(time.time() - start < 1)
+
+            try:
+                call_with_time_limit(1, int, 'x')
+            except ValueError:
+                result.append('error')
+
+        t = threading.Thread(target=run)
+        t.start()
+        t.join(5)
+        hung.set()
+
+        assert(result == [2, True, 'error'])
+
+
+class TestSubprocess(object):
+
+    def test_check_output(self):
+
+        assert(check_output(('echo', 'hello')) == 'hello\n')
+        assert(check_call(('true',)) == 0)
+
+        with pytest.raises(subprocess.CalledProcessError):
+            check_call(('false',))
+
+    def test_timeout(self):
+
+        start = time.time()
+        with pytest.raises(TimeLimitException):
+            check_output(('sleep', '5'), timeout=0.1)
+
+        with deadline(0.1):
+            with pytest.raises(TimeLimitException):
+                check_call(('sleep', '5'))
+
+        assert(time.time() - start < 2)
+
+    def test_interrupted(self, monkeypatch):
+
+        processes = []
+        popen = subprocess.Popen
+        def record(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+        monkeypatch.setattr(subprocess, 'Popen', record)
+
+        with pytest.raises(TimeLimitException):
+            with time_limit(0.1):
+                check_call(('sleep', '5'))
+
+        # the process is killed and reaped
+        assert(processes[0].returncode is not None)
+
+    def test_open_output(self):
+
+        with open_output(('printf', 'a\\nb\\n')) as output:
+            assert(list(output) == ['a\n', 'b\n'])
+
+        with pytest.raises(subprocess.CalledProcessError):
+            with open_output(('false',)) as output:
+                output.read()
+
+    def test_open_output_stop_early(self):
+
+        start = time.time()
+        with pytest.raises(ValueError):
+            with open_output(('yes',)) as output:
+                output.readline()
+                raise ValueError
+
+        with pytest.raises(TimeLimitException):
+            with open_output(('sleep', '5'), timeout=0.1) as output:
+                output.read()
+
+        assert(time.time() - start < 2)
+
+
+class TestProcessTreeRSS(object):
+
+    @pytest.mark.skipif(not os.path.isdir('/proc'), reason='requires /proc')
+    def test_get_process_tree_rss(self):
+
+        assert(get_process_tree_rss(os.getpid()) > 0)
+
+    def test_no_such_process(self):
+
+        assert(get_process_tree_rss(-1) == 0)
+
+    @pytest.mark.skipif(not os.path.isdir('/proc'), reason='requires /proc')
+    def test_kill_process_tree(self):
+
+        process = subprocess.Popen(('sh', '-c', 'sleep 5 & echo $!; wait'),
+                                   stdout=subprocess.PIPE)
+        child = int(process.stdout.readline())
+        kill_process_tree(process.pid)
+
+        assert(process.wait() == -9)
+
+        # the child is gone, or a zombie left to init
+        for _ in xrange(100):
+            try:
+                stat = open('/proc/%s/stat' % child).read()
+            except IOError:
+                break
+            if stat.split(') ')[1][0] == 'Z':
+                break
+            time.sleep(0.01)
+        else:
+            raise AssertionError('%s is still running' % child)
+
+
+class TestCoalesceRanges(object):
+
+    def test_coalesce(self):
+
+        assert(coalesce_ranges([]) == [])
+        assert(coalesce_ranges([4]) == [(4, 4)])
+        assert(coalesce_ranges(xrange(1, 301)) == [(1, 300)])
+        assert(coalesce_ranges([1, 2, 3, 5, 7, 8]) == [(1, 3), (5, 5), (7, 8)])
+
+    def test_unordered(self):
+
+        assert(coalesce_ranges([9, 3, 2, 8, 3, 1]) == [(1, 3), (8, 9)])
+
+    def test_split(self):
+
+        assert(split_ranges([], 3) == [])
+        assert(split_ranges([(1, 5), (8, 8)], 2) ==
+               [(1, 2), (3, 4), (5, 5), (8, 8)])
+        assert(split_ranges([(1, 6)], 3) == [(1, 3), (4, 6)])
+        assert(split_ranges([(1, 6)], 10) == [(1, 6)])
+
+
+class TestAtomicWrite(object):
+
+    def test_write(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.json'))
+        atomic_write(filename, 'foo')
+        atomic_write(filename, 'bar')
+
+        assert(tmpdir.join('foo.json').read() == 'bar')
+        assert(tmpdir.listdir() == [tmpdir.join('foo.json')])
+
+    def test_mode(self, tmpdir):
+
+        umask = os.umask(022)
+        try:
+            filename = str(tmpdir.join('foo.json'))
+            atomic_write(filename, 'foo')
+            assert(stat.S_IMODE(os.stat(filename).st_mode) == 0644)
+
+            # the mode of a replaced file is kept
+            os.chmod(filename, 0640)
+            atomic_write(filename, 'bar')
+            assert(stat.S_IMODE(os.stat(filename).st_mode) == 0640)
+        finally:
+            os.umask(umask)
+
+    def test_failure(self, tmpdir):
+
+        filename = str(tmpdir.join('foo.json'))
+        atomic_write(filename, 'foo')
+
+        with pytest.raises(TypeError):
+            atomic_write(filename, None)
+
+        assert(tmpdir.join('foo.json').read() == 'foo')
+        assert(tmpdir.listdir() == [tmpdir.join('foo.json')])
@@ -1,8 +1,16 @@
 #!/usr/bin/env python
 
 # standard library imports
-from contextlib import contextmanager
+from collections import defaultdict
+from contextlib import closing, contextmanager
+import os
 import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 
 # third party related imports
 
@@ -12,6 +20,105 @@ import signal
 class TimeLimitException(Exception): pass
 
 
+# Deadlines and armed timers of every thread
+_local = threading.local()
+
+
+class Deadline(object):
+    """A point in time by which some work should be done.
+
+    Attributes:
+        expires_at: A float indicating the time.time() at which the
+            deadline expires.
+
+    """
+
+    def __init__(self, seconds):
+
+        self.expires_at = time.time() + seconds
+
+    @property
+    def remaining(self):
+        """Seconds left before the deadline, 0 if it has expired."""
+
+        return max(self.expires_at - time.time(), 0.)
+
+    @property
+    def expired(self):
+        """Whether the deadline has expired."""
+
+        return time.time() >= self.expires_at
+
+
+def _get_thread_stack(name):
+    """Get a list stored on the current thread."""
+
+    if not hasattr(_local, name):
+        setattr(_local, name, [])
+
+    return getattr(_local, name)
+
+
+def _is_main_thread():
+    """Test whether it runs in the main thread, where signals work."""
+
+    return isinstance(threading.current_thread(), threading._MainThread)
+
+
+@contextmanager
+def deadline(seconds):
+    """Set a deadline for the current thread.
+
+    Nothing is interrupted when the deadline expires. Blocking calls
+    should take remaining_time() as their timeout, and loops should call
+    check_deadline(). Deadlines can be nested, an inner deadline never
+    expires later than the outer one.
+
+    >>> with deadline(2.5):
+            output = check_output(('pdfinfo', filename))
+    >>>
+
+    Args:
+        seconds: A number indicating how many seconds are allowed.
+
+    """
+
+    deadlines = _get_thread_stack('deadlines')
+
+    ret = Deadline(seconds)
+    if deadlines and deadlines[-1].expires_at < ret.expires_at:
+        ret.expires_at = deadlines[-1].expires_at
+
+    deadlines.append(ret)
+    try:
+        yield ret
+    finally:
+        deadlines.pop()
+
+
+def remaining_time(default=None):
+    """Seconds left before the deadline of the current thread.
+
+    Args:
+        default: The value returned if no deadline is set.
+
+    """
+
+    deadlines = _get_thread_stack('deadlines')
+    if not deadlines:
+        return default
+
+    return deadlines[-1].remaining
+
+
+def check_deadline():
+    """Raise TimeLimitException if the current deadline has expired."""
+
+    deadlines = _get_thread_stack('deadlines')
+    if deadlines and deadlines[-1].expired:
+        raise TimeLimitException("timeout")
+
+
 @contextmanager
 def time_limit(seconds):
     """Limit function execution time.
@@ -23,20 +130,407 @@ def time_limit(seconds):
             print "Timeout"
     >>>
 
+    In the main thread the function is interrupted by SIGALRM once the
+    time is up. Other threads can't receive signals, TimeLimitException
+    is raised there when the function returns late, see
+    call_with_time_limit() to give up blocking calls there. time_limit
+    can be nested and sets a deadline, see deadline().
+
     Args:
-        seconds: An integer indicating how long limit the function
-            execution time.
+        seconds: A number indicating how long limit the function
+            execution time. Fractions of a second are allowed. 0 or
+            None sets no limit, as signal.alarm(0) did, though an outer
+            time_limit still applies.
 
     """
 
     def signal_handler(signum, frame):
         raise TimeLimitException("timeout")
 
-    signal.signal(signal.SIGALRM, signal_handler)
-    signal.alarm(seconds)
+    if not seconds:
+        yield
+        return
+
+    with deadline(seconds) as dl:
+        if not _is_main_thread():
+            yield
+            check_deadline()
+            return
+
+        alarms = _get_thread_stack('alarms')
+        previous_handler = signal.signal(signal.SIGALRM, signal_handler)
+        alarms.append(dl)
+        # a zero interval disarms the timer
+        signal.setitimer(signal.ITIMER_REAL, max(dl.remaining, 1e-6))
+
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            alarms.pop()
+            signal.signal(signal.SIGALRM, previous_handler)
+
+            # re-arm the timer of the outer time_limit
+            if alarms:
+                signal.setitimer(signal.ITIMER_REAL,
+                                 max(alarms[-1].remaining, 1e-6))
+
+
+def call_with_time_limit(seconds, func, *args):
+    """Call func(*args) within time_limit(seconds), in any thread.
+
+    In the main thread it is the same as time_limit. Other threads
+    can't be interrupted by signals, so func runs in a helper thread,
+    which is given up once seconds or the deadline of the current thread
+    is over. func is then left running, and the caller should release
+    what it blocks on, e.g. kill the process it waits for.
+
+    Returns:
+        The return value of func.
+
+    Raises:
+        TimeLimitException: func doesn't return in time.
+
+    """
+
+    if _is_main_thread():
+        with time_limit(seconds):
+            return func(*args)
+
+    result = []
+    error = []
+    def run():
+        try:
+            result.append(func(*args))
+        except:
+            error.append(sys.exc_info())
+
+    with time_limit(seconds):
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        thread.join(_get_timeout(None))
+        if thread.is_alive():
+            raise TimeLimitException('%s takes more than %s seconds' %
+                                     (getattr(func, '__name__', func),
+                                      seconds))
+
+    if error:
+        raise error[0][0], error[0][1], error[0][2]
+
+    return result[0]
+
+
+def _get_timeout(timeout):
+    """Shorten a timeout to the deadline of the current thread."""
+
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if timeout is None:
+        return remaining
+
+    return min(timeout, remaining)
+
+
+def _kill_after(process, timeout):
+    """Kill a process if it still runs after timeout seconds.
+
+    Returns:
+        A (timer, killed) tuple. timer is None if timeout is None, and
+        killed is a list which is not empty once the process is killed.
+
+    """
+
+    killed = []
+    def kill():
+        killed.append(True)
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+
+    return timer, killed
+
+
+def _communicate(args, stdout=None, timeout=None):
+    """Run a command, kill it if it doesn't finish in time."""
+
+    timeout = _get_timeout(timeout)
+    process = subprocess.Popen(args, stdout=stdout)
+    timer, killed = _kill_after(process, timeout)
 
     try:
-        yield
+        output, _ = process.communicate()
+    except:
+        # e.g. interrupted by time_limit, don't leave the process running
+        try:
+            process.kill()
+        except OSError:
+            pass
+        process.wait()
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    if killed:
+        raise TimeLimitException('%s takes more than %s seconds' %
+                                 (args[0], timeout))
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args,
+                                            output)
+
+    return output
+
+
+def check_output(args, timeout=None):
+    """Run a command and return its output.
+
+    Like subprocess.check_output, but the command is killed and
+    TimeLimitException is raised if it runs over timeout or the deadline
+    of the current thread. Works in any thread.
+
+    Args:
+        args: A sequence of the program and its arguments.
+        timeout: A number of seconds, or None to only obey the deadline.
+
+    """
+
+    return _communicate(args, subprocess.PIPE, timeout)
+
+
+def check_call(args, timeout=None):
+    """Run a command, see check_output()."""
+
+    _communicate(args, None, timeout)
+
+    return 0
+
+
+@contextmanager
+def open_output(args, timeout=None):
+    """Run a command and read its output while it is running.
+
+    Like check_output(), but the output is streamed from a pipe instead
+    of being collected in memory. The command is killed if the with
+    block raises, and the exceptions of check_output() are raised after
+    the block if the command fails or runs over time. The time spent in
+    the block counts.
+
+    Args:
+        args: A sequence of the program and its arguments.
+        timeout: A number of seconds, or None to only obey the deadline.
+
+    Yields:
+        The stdout of the command as a file object.
+
+    """
+
+    timeout = _get_timeout(timeout)
+    process = subprocess.Popen(args, stdout=subprocess.PIPE)
+    timer, killed = _kill_after(process, timeout)
+
+    try:
+        yield process.stdout
+    except:
+        try:
+            process.kill()
+        except OSError:
+            pass
+        process.wait()
+        raise
     finally:
-        signal.alarm(0)
+        if timer is not None:
+            timer.cancel()
+        process.stdout.close()
+
+    process.wait()
+
+    if killed:
+        raise TimeLimitException('%s takes more than %s seconds' %
+                                 (args[0], timeout))
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+
+def _read_process_table():
+    """Read the parent and the resident set size of every process.
+
+    Returns:
+        A (children, rss) tuple, where children maps a process id to the
+        list of its child process ids, and rss maps a process id to its
+        resident set size in pages. Both are empty if /proc is not
+        available.
+
+    """
+
+    children = defaultdict(list)
+    rss = {}
+    if not os.path.isdir('/proc'):
+        return children, rss
+
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+
+        try:
+            with closing(open('/proc/%s/stat' % entry, 'rb')) as f:
+                stat = f.read()
+        except IOError:
+            continue
+
+        # the command name may contain spaces, so split after it
+        fields = stat[stat.rfind(')') + 2:].split()
+        children[int(fields[1])].append(int(entry))
+        rss[int(entry)] = int(fields[21])
+
+    return children, rss
+
+
+def _get_process_tree(pid, children):
+    """A process id followed by the ids of all its descendants."""
+
+    ret = []
+    queue = [pid]
+    while queue:
+        p = queue.pop()
+        ret.append(p)
+        queue.extend(children[p])
+
+    return ret
+
+
+def get_process_tree_rss(pid):
+    """Get the memory used by a process and all its descendants.
+
+    Read from /proc, so it works on Linux only.
+
+    Args:
+        pid: An integer indicating the root process id.
+
+    Returns:
+        An integer indicating the total resident set size in bytes. 0 is
+        returned if /proc is not available.
+
+    """
+
+    children, rss = _read_process_table()
+    total_pages = sum(rss.get(p, 0) for p in _get_process_tree(pid, children))
+
+    return total_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def kill_process_tree(pid):
+    """Kill a process and all its descendants.
+
+    The descendants are found in /proc, so only the process itself is
+    killed if /proc is not available. Processes which are gone are
+    skipped.
+
+    Args:
+        pid: An integer indicating the root process id.
+
+    """
+
+    # os.kill() takes 0 and negative ids as process groups
+    if pid <= 0:
+        return
+
+    children, _ = _read_process_table()
+    for p in _get_process_tree(pid, children):
+        try:
+            os.kill(p, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def coalesce_ranges(numbers):
+    """Collapse integers into runs of consecutive ones.
+
+    Args:
+        numbers: An iterable of integers in any order, duplicates are
+            allowed.
+
+    Returns:
+        A sorted list of (first, last) tuples, e.g. [1, 2, 3, 5, 2]
+        gives [(1, 3), (5, 5)].
+
+    """
+
+    ret = []
+    for number in sorted(set(numbers)):
+        if ret and ret[-1][1] + 1 == number:
+            ret[-1] = (ret[-1][0], number)
+        else:
+            ret.append((number, number))
+
+    return ret
+
+
+def split_ranges(ranges, size):
+    """Split (first, last) ranges into ranges of at most size integers.
+
+    Args:
+        ranges: A list of (first, last) tuples, e.g. from
+            coalesce_ranges().
+        size: A positive integer.
+
+    Returns:
+        A list of (first, last) tuples in the same order, e.g.
+        [(1, 5), (8, 8)] with size 2 gives [(1, 2), (3, 4), (5, 5),
+        (8, 8)].
+
+    """
+
+    ret = []
+    for first, last in ranges:
+        for start in xrange(first, last + 1, size):
+            ret.append((start, min(start + size - 1, last)))
+
+    return ret
+
+
+def atomic_write(filename, data):
+    """Write a file so that it is either complete or not written at all.
+
+    The data is written to a temporary file in the same directory, which
+    is then renamed to filename, so that a crash never leaves a
+    truncated file behind.
+
+    The file gets the mode of the file it replaces, or the mode open()
+    would create it with, rather than the 0600 of temporary files.
+
+    Args:
+        filename: A string indicating the path to write.
+        data: A string of bytes.
+
+    """
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0666 & ~umask
+
+    fd, tmp_filename = tempfile.mkstemp(suffix='.tmp', dir=dirname)
+
+    try:
+        with closing(os.fdopen(fd, 'wb')) as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
 
+        os.rename(tmp_filename, filename)
+    except:
+        if os.path.exists(tmp_filename):
+            os.unlink(tmp_filename)
+        raise
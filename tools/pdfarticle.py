@@ -17,6 +17,7 @@ import ujson
 import zhon
 
 # local library imports
+from LazyPDFDocument import LazyPDFDocument
 from PDFPage import PDFPage
 from hcluster.hcluster import create_dendrogram, TreeNode
 from hcluster.Rectangle import Rectangle
@@ -37,6 +38,21 @@ def create_argument_parser():
         help=('Set number of groups. '
               'If not set, groups will be decided automatically')
     )
+    parser.add_argument(
+        '--level',
+        choices=PDFPage.LEVELS,
+        default='word',
+        help=('Start from words, or from the lines or blocks of a page '
+              'extracted by pdftext.py --layout. Default is word.')
+    )
+    parser.add_argument(
+        '--page',
+        type=int,
+        default=None,
+        help=('Read this page (start from 1) out of a document stored by '
+              'pdftext.py, instead of a page JSON. Only this page is '
+              'read from an NDJSON or binary document.')
+    )
     parser.add_argument('page-json')
 
     return parser
@@ -96,11 +112,18 @@ def main():
     arg_parser = create_argument_parser()
     arg_dict = vars(arg_parser.parse_args())
 
-    # open page json
-    with closing(open(arg_dict['page-json'], 'rb')) as f:
-        page = PDFPage.create_by_json(f.read())
+    # open page json, or page in the binary format
+    if arg_dict['page'] is None:
+        with closing(open(arg_dict['page-json'], 'rb')) as f:
+            page = PDFPage.deserialize(f.read())
+    else:
+        with LazyPDFDocument(arg_dict['page-json']) as pdf_doc:
+            page = pdf_doc.get_page(arg_dict['page'] - 1)
+        if page is None:
+            sys.exit('Page %s is not in %s' % (arg_dict['page'],
+                                               arg_dict['page-json']))
 
-    leaf_nodes = map(create_treenode, page.data)
+    leaf_nodes = map(create_treenode, page.get_text_boxes(arg_dict['level']))
     if len(leaf_nodes) < 2:
         return map(lambda n: n.data, leaf_nodes)
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# standard library imports
+import argparse
+from contextlib import closing
+import os.path
+from StringIO import StringIO
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                    '..', 'pdfworker')
+)
+# third party related imports
+import ujson
+
+# local library imports
+from PDFDocument import PDFDocument
+from PDFDocumentReader import PDFDocumentReader
+from PDFDocumentWriter import PDFDocumentWriter
+from PDFPage import PDFPage
+
+
+FORMATS = ('json', 'ndjson', 'binary')
+
+
+def create_argument_parser():
+    """Create argument parser and register parameters."""
+
+    parser = argparse.ArgumentParser(description="""\
+Convert page or document JSON to the binary format, or back. Documents
+may also be converted from and to NDJSON.""")
+    parser.add_argument('--to', choices=FORMATS, default=None,
+                        help="""\
+Convert to this format. Default is the other format of the input.""")
+    parser.add_argument('input')
+    parser.add_argument('output')
+
+    return parser
+
+def load(serialized):
+    """Load a PDFPage or a PDFDocument in either format."""
+
+    if serialized.startswith(PDFDocument.BINARY_MAGIC):
+        return PDFDocument.create_by_binary(serialized)
+    if serialized.startswith(PDFPage.BINARY_MAGIC):
+        return PDFPage.create_by_binary(serialized)
+
+    first_line, _, rest = serialized.partition('\n')
+    deserialized = ujson.loads(first_line)
+    # only a document names its pdf, and NDJSON puts its pages after
+    if 'file' in deserialized and 'data' not in deserialized:
+        return PDFDocumentReader(StringIO(serialized)).read()
+    if 'file' in deserialized:
+        return PDFDocument.create_by_json(deserialized=deserialized)
+
+    return PDFPage.create_by_json(deserialized=deserialized)
+
+def main():
+
+    arg_parser = create_argument_parser()
+    arg_dict = vars(arg_parser.parse_args())
+
+    with closing(open(arg_dict['input'], 'rb')) as f:
+        serialized = f.read()
+
+    obj = load(serialized)
+
+    to = arg_dict['to']
+    if to is None:
+        is_binary = serialized.startswith((PDFDocument.BINARY_MAGIC,
+                                           PDFPage.BINARY_MAGIC))
+        to = 'json' if is_binary else 'binary'
+
+    if to == 'ndjson' and not isinstance(obj, PDFDocument):
+        arg_parser.error('Only a document can be converted to NDJSON')
+
+    writer = None
+    with closing(open(arg_dict['output'], 'wb')) as f:
+        if to == 'binary':
+            f.write(obj.serialize_binary())
+        elif to == 'ndjson':
+            writer = PDFDocumentWriter(f, obj)
+            writer.write_document(obj)
+        else:
+            f.write(obj.serialize())
+
+    if writer is not None:
+        writer.write_index(arg_dict['output'] + PDFDocumentWriter.INDEX_EXT)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -15,6 +15,7 @@ sys.path.insert(
 import ujson
 
 # local library imports
+from PDFPage import PDFPage
 from Rectangle import TextRectangle as TextRect
 
 MIN_DIST = 3.
@@ -167,10 +168,11 @@ def normalize_coordinate(width, height, blocks, new_width=1000):
 
     return new_width, height * r, ret_blocks
 
-def merge_blocks(data):
+def merge_blocks(data, level='word'):
 
-    width, height, blocks = normalize_coordinate(data['width'], data['height'],
-                                                 data['data'])
+    page = PDFPage.create_by_json(deserialized=data)
+    width, height, blocks = normalize_coordinate(page.width, page.height,
+                                                 page.get_text_boxes(level))
     blocks = map(lambda b: TextRect(b['x'], b['y'], b['w'], b['h'], b['t']),
                  blocks)
     before_merge = len(blocks)
@@ -186,15 +188,16 @@ def merge_blocks(data):
 
 def main(argv):
 
-    if len(argv) != 2:
-        print 'usage: python %s [text-json]' % argv[0]
+    if len(argv) not in (2, 3):
+        print 'usage: python %s [text-json] [word|line|block]' % argv[0]
         exit(1)
 
     data = None
     with closing(open(argv[1], 'rb')) as f:
         data = ujson.loads(f.read())
 
-    data = merge_blocks(data)
+    level = argv[2] if len(argv) == 3 else 'word'
+    data = merge_blocks(data, level)
 
     with closing(open('output.json', 'wb')) as f:
         f.write(ujson.dumps(data, ensure_ascii=False))
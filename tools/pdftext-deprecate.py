@@ -16,11 +16,16 @@ sys.path.insert(
 )
 
 # third party related imports
+import ujson
 
 # local library imports
-from hcluster.Point import Point
-from hcluster.Rectangle import Rectangle
+from CrossValidator import CrossValidator
+from ExtractionCache import ExtractionCache
+from LazyPDFDocument import LazyPDFDocument
 from PDFBrowser import PDFBrowser
+from PDFBrowserPool import PDFBrowserPool
+from PDFDocument import PDFDocument
+from PDFDocumentWriter import PDFDocumentWriter
 from PDFPage import PDFPage
 
 
@@ -46,8 +51,51 @@ def create_argument_parser():
                         help=('Output every page JSON in this directory'))
     parser.add_argument('--output', type=str, default=None,
                         help=('PDF document output JSON'))
+    parser.add_argument('--format', choices=('json', 'ndjson'),
+                        default='json',
+                        help=('Output JSON, or NDJSON written page by page '
+                              'as pages are rendered. Default is json.'))
     parser.add_argument('--browser', type=str, default='chrome',
                         help=('Either firefox or chrome. Default is chrome.'))
+    parser.add_argument('--text-only', action='store_true',
+                        help=('Compute text geometry without painting '
+                              'PDF pages.'))
+    parser.add_argument('--recycle-pages', type=int, default=None,
+                        help=('Restart the browser after rendering such '
+                              'number of pages.'))
+    parser.add_argument('--recycle-rss', type=int, default=None,
+                        help=('Restart the browser once it takes more than '
+                              'such MB of memory.'))
+    parser.add_argument('--workers', type=int, default=1,
+                        help=('Render pages in this number of browsers '
+                              'at the same time. Default is 1.'))
+    parser.add_argument('--render-ahead', type=int, default=0,
+                        help=('Render up to such number of pages ahead '
+                              'while the rendered ones are validated. '
+                              'Only used with one worker. Default is 0.'))
+    parser.add_argument('--checkpoint-dir', type=str, default=None,
+                        help=('Store finished pages in this directory and '
+                              'resume from them if the run is restarted.'))
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help=('Cache extracted pages in this directory.'))
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help=('Evict least recently used pages once the '
+                              'cache takes more than such MB. Default is '
+                              '1024.'))
+    parser.add_argument('--previous', type=str, default=None,
+                        help=('The output of an earlier version of the PDF. '
+                              'Its pages whose fingerprints are unchanged '
+                              'are carried over, and only the others are '
+                              'rendered.'))
+    parser.add_argument('--report', type=str, default=None,
+                        help=('Output the agreement of rendered pages with '
+                              'xpdf as JSON in this file. Default is to '
+                              'print the document summary.'))
+    parser.add_argument('--max-offset', type=float,
+                        default=CrossValidator.MAX_OFFSET,
+                        help=('Text boxes farther than such offset from '
+                              'the xpdf ones never match. Default is %s.' %
+                              CrossValidator.MAX_OFFSET))
     parser.add_argument('PDF-file')
 
     return parser
@@ -86,30 +134,35 @@ def output_page_json(page, dirname):
         f.write(page.serialize())
 
 
-def cross_validate(page, pdf_filename=None):
+def cross_validate(pdf_doc, page_nums, pdf_filename=None,
+                   page_boxes=None, jobs=1,
+                   max_offset=CrossValidator.MAX_OFFSET):
+    """Compare rendered pages with the ones by xpdf.
 
-    bbox_pages = PDFPage.create_by_xpdf(pdf_filename, (page.page_num,))
-    bbox_page = bbox_pages[0]
-    scale_x = 1.0 * page.width / bbox_page.width
-    scale_y = 1.0 * page.height / bbox_page.height
-    bbox_page.scale(scale_x, scale_y)
+    The xpdf pages are extracted in one batch and compared one at a time
+    as they are parsed.
 
-    cross_validate_results = [[]] * len(page.data)
-    for i, text_box1 in enumerate(page.data):
-        rect1 = Rectangle(text_box1['x'], text_box1['y'],
-                          text_box1['w'], text_box1['h'])
-        for j, text_box2 in enumerate(bbox_page.data):
-            rect2 = Rectangle(text_box2['x'], text_box2['y'],
-                              text_box2['w'], text_box2['h'])
+    Args:
+        pdf_doc: The PDFDocument of rendered pages.
+        page_nums: The page numbers to compare. (Start from 1)
+        pdf_filename: The path of the pdf.
+        page_boxes: The page_boxes of the pdf.
+        jobs: The number of pdftotext processes.
+        max_offset: See CrossValidator.
 
-            offset = 0
-            for v1, v2 in zip(rect1.vertices, rect2.vertices):
-                offset += v1.square_dist(v2) ** 0.5
+    Returns:
+        A CrossValidator with the metrics of the pages.
 
-            if offset < 100:
-                print 'box1[%s](%s) to box2[%s](%s) = %s' % (i, text_box1['t'],
-                                                             j, text_box2['t'],
-                                                             offset)
+    """
+
+    validator = CrossValidator(max_offset)
+    page_nums = [p for p in page_nums if pdf_doc.pages[p - 1] is not None]
+    for bbox_page in PDFPage.iter_by_xpdf(pdf_filename, page_nums,
+                                          page_boxes, jobs):
+        validator.validate_page(pdf_doc.pages[bbox_page.page_num - 1],
+                                bbox_page)
+
+    return validator
 
 
 def main():
@@ -118,6 +171,11 @@ def main():
     arg_dict = vars(arg_parser.parse_args())
 
     PDFBrowser.GLOBAL_TIMEOUT = arg_dict['timeout']
+    PDFBrowser.RECYCLE_PAGES = arg_dict['recycle_pages']
+    PDFBrowser.RECYCLE_RSS = arg_dict['recycle_rss']
+    if arg_dict['cache_dir'] is not None:
+        ExtractionCache.DIRNAME = arg_dict['cache_dir'].decode('utf8')
+        ExtractionCache.MAX_BYTES = arg_dict['cache_size'] << 20
 
     # determine what pages to be parsed
     pages = parse_pages(arg_dict['pages'])
@@ -132,21 +190,96 @@ def main():
     #    page_cb = lambda x: output_page_json(x, dirname=dirname)
 
     pdf_filename = arg_dict['PDF-file'].decode('utf8')
-    pdf_browser = PDFBrowser(pdf_filename, arg_dict['browser'])
-    page_cb = lambda x: cross_validate(x, pdf_filename)
-    pdf_doc = pdf_browser.run(pages=pages, scale=arg_dict['scale'],
-                              page_rendered_cb=page_cb)
+    if arg_dict['workers'] > 1:
+        pdf_browser = PDFBrowserPool(pdf_filename, arg_dict['browser'],
+                                     arg_dict['workers'],
+                                     arg_dict['text_only'])
+    else:
+        pdf_browser = PDFBrowser(pdf_filename, arg_dict['browser'],
+                                 arg_dict['text_only'])
+    checkpoint_dir = arg_dict['checkpoint_dir']
+    if checkpoint_dir is not None:
+        checkpoint_dir = checkpoint_dir.decode('utf8')
 
-    # write output
+    # determine the output filename
     if arg_dict['output'] is None:
         basename = os.path.basename(pdf_filename)
         (basename, ext) = os.path.splitext(basename)
-        output = basename + '.json'
+        output = basename + '.' + arg_dict['format']
     else:
         output = arg_dict['output'].decode('utf8')
 
-    with closing(open(output, 'wb')) as f:
-        f.write(pdf_doc.serialize())
+    # read page boxes once rather than for every validated page
+    box_doc = PDFDocument(pdf_filename)
+    box_doc.extraction = PDFDocument.get_extraction('pdfjs',
+                                                    arg_dict['scale'])
+
+    # carry over unchanged pages before the output may be overwritten
+    if arg_dict['previous'] is not None:
+        with LazyPDFDocument(arg_dict['previous'].decode('utf8')) as previous:
+            carried = box_doc.carry_over(previous, pages)
+
+        if pages is None:
+            pages = xrange(box_doc.num_pages)
+        pages = [page_ix for page_ix in pages if page_ix not in carried]
+
+    # NDJSON is written as pages are rendered
+    writer = None
+    if arg_dict['format'] == 'ndjson':
+        output_file = open(output, 'wb')
+        writer = PDFDocumentWriter(output_file, box_doc)
+
+    def page_cb(page):
+        if page is None:
+            return
+
+        page.fingerprint = box_doc.get_fingerprint(page.page_num - 1)
+        if writer is not None:
+            writer.write_page(page)
+
+    if arg_dict['workers'] > 1:
+        pdf_doc = pdf_browser.run(pages=pages, scale=arg_dict['scale'],
+                                  page_rendered_cb=page_cb,
+                                  checkpoint_dir=checkpoint_dir)
+    else:
+        pdf_doc = pdf_browser.run(pages=pages, scale=arg_dict['scale'],
+                                  page_rendered_cb=page_cb,
+                                  depth=arg_dict['render_ahead'],
+                                  checkpoint_dir=checkpoint_dir)
+
+    pdf_doc.extraction = box_doc.extraction
+
+    # add the carried pages, and fingerprint pages restored from the
+    # checkpoint, which skip page_cb
+    for page_ix, page in enumerate(box_doc.pages):
+        if page is not None:
+            pdf_doc.add_page(page_ix, page)
+    for page_ix, page in enumerate(pdf_doc.pages):
+        if page is not None and page.fingerprint is None:
+            page.fingerprint = box_doc.get_fingerprint(page_ix)
+
+    # write output
+    if writer is not None:
+        # pages restored from the checkpoint skip page_cb
+        writer.write_document(pdf_doc)
+        output_file.close()
+        writer.write_index(output + PDFDocumentWriter.INDEX_EXT)
+    else:
+        with closing(open(output, 'wb')) as f:
+            f.write(pdf_doc.serialize())
+
+    # validate the rendered pages against xpdf, carried ones aren't rendered
+    if pages is None:
+        pages = xrange(box_doc.num_pages)
+    validator = cross_validate(pdf_doc, [page_ix + 1 for page_ix in pages
+                                         if page_ix < len(pdf_doc.pages)],
+                               pdf_filename, box_doc.page_boxes,
+                               arg_dict['workers'], arg_dict['max_offset'])
+    if arg_dict['report'] is not None:
+        with closing(open(arg_dict['report'].decode('utf8'), 'wb')) as f:
+            f.write(ujson.dumps(validator.__json__()))
+    else:
+        print ujson.dumps(validator.get_summary())
 
     # clean up
     if os.path.exists('chromedriver.log'):
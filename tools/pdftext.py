@@ -15,7 +15,10 @@ sys.path.insert(
 # third party related imports
 
 # local library imports
+from ExtractionCache import ExtractionCache
+from LazyPDFDocument import LazyPDFDocument
 from PDFDocument import PDFDocument
+from PDFDocumentWriter import PDFDocumentWriter
 from PDFPage import PDFPage
 
 
@@ -33,6 +36,28 @@ Output every page JSON in this directory.""")
     parser.add_argument('--output', type=str, default=None,
                         help="""\
 PDF document output JSON.""")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="""\
+Extract chunks of pages in this number of processes. Default is 1.""")
+    parser.add_argument('--layout', action='store_true',
+                        help="""\
+Keep the flows, blocks and lines found by pdftotext -bbox-layout.""")
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help="""\
+Cache extracted pages in this directory.""")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="""\
+Evict least recently used pages once the cache takes more than such MB.
+Default is 1024.""")
+    parser.add_argument('--format', choices=('json', 'ndjson', 'binary'),
+                        default='json',
+                        help="""\
+Output JSON, NDJSON written page by page as pages are extracted, or the
+compact binary format of PDFDocument.serialize_binary(). Default is json.""")
+    parser.add_argument('--previous', type=str, default=None,
+                        help="""\
+The output of an earlier version of the PDF. Its pages whose fingerprints
+are unchanged are carried over, and only the others are extracted.""")
     parser.add_argument('PDF-file')
 
     return parser
@@ -56,7 +81,7 @@ def parse_pages(user_input):
             continue
 
         start, end = match_obj.group(1), match_obj.group(2)
-        ret.extend(range(int(start) - 1, int(end)))
+        ret.extend(range(int(start), int(end) + 1))
 
     return ret if len(ret) != 0 else None
 
@@ -78,9 +103,17 @@ def main():
     arg_parser = create_argument_parser()
     arg_dict = vars(arg_parser.parse_args())
 
+    binary = arg_dict['format'] == 'binary'
+    ndjson = arg_dict['format'] == 'ndjson'
+
     # determine what pages to be parsed
     page_nums = parse_pages(arg_dict['pages'])
 
+    # set up extraction cache
+    if arg_dict['cache_dir'] is not None:
+        ExtractionCache.DIRNAME = arg_dict['cache_dir'].decode('utf8')
+        ExtractionCache.MAX_BYTES = arg_dict['cache_size'] << 20
+
     # determine whether or not to dump JSON page by page
     page_dir = arg_dict['pagedir']
     if page_dir is not None:
@@ -94,23 +127,56 @@ def main():
     if output_filename is None:
         basename = os.path.basename(pdf_filename)
         base, ext = os.path.splitext(basename)
-        output_filename = '%s.json' % base
+        output_filename = '%s.%s' % (base, 'bin' if binary else
+                                     'ndjson' if ndjson else 'json')
 
-    # main logic
     pdf_doc = PDFDocument(pdf_filename)
-    pages = PDFPage.create_by_xpdf(pdf_filename, page_nums)
-    map(lambda (ix, page): pdf_doc.add_page(page.page_num, page),
-        enumerate(pages))
+    pdf_doc.extraction = PDFDocument.get_extraction(
+            'xpdf', layout=arg_dict['layout'])
+
+    # carry over unchanged pages before the output may be overwritten
+    if arg_dict['previous'] is not None:
+        with LazyPDFDocument(arg_dict['previous'].decode('utf8')) as previous:
+            carried = pdf_doc.carry_over(
+                    previous,
+                    None if page_nums is None else [p - 1 for p in page_nums])
+
+        if page_nums is None:
+            page_nums = range(1, pdf_doc.num_pages + 1)
+        page_nums = [p for p in page_nums if p - 1 not in carried]
+
+    # NDJSON is written as pages come, so that they aren't kept
+    writer = None
+    if ndjson:
+        doc_file = open(output_filename, 'wb')
+        writer = PDFDocumentWriter(doc_file, pdf_doc)
 
-    if page_dir is not None:
-        for p in pages:
-            output_file = os.path.join(page_dir, '%03d.json' % p.page_num)
+    # main logic
+    for p in PDFPage.iter_by_xpdf(pdf_filename, page_nums,
+                                  pdf_doc.page_boxes, arg_dict['jobs'],
+                                  arg_dict['layout']):
+        p.fingerprint = pdf_doc.get_fingerprint(p.page_num - 1)
+        if writer is not None:
+            writer.write_page(p)
+        else:
+            pdf_doc.add_page(p.page_num - 1, p)
+
+        if page_dir is not None:
+            output_file = os.path.join(page_dir, '%03d.%s' % (
+                    p.page_num, 'bin' if binary else 'json'))
             with closing(open(output_file, 'wb')) as f:
-                f.write(p.serialize())
+                f.write(p.serialize_binary() if binary else p.serialize())
 
     # output
+    if writer is not None:
+        writer.write_document(pdf_doc)
+        doc_file.close()
+        writer.write_index(output_filename + PDFDocumentWriter.INDEX_EXT)
+        return
+
     with closing(open(output_filename, 'wb')) as f:
-        f.write(pdf_doc.serialize())
+        f.write(pdf_doc.serialize_binary() if binary
+                else pdf_doc.serialize())
 
 
 if __name__ == "__main__":